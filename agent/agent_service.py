@@ -0,0 +1,136 @@
+import asyncio
+import time
+import uuid
+from typing import AsyncIterator, Callable, Optional
+
+from agent.clients.dial_client import DialClient
+from agent.models.message import Message, Role
+from agent.tool_result_cache import ToolResultCache
+
+
+class ConversationBusyError(Exception):
+    pass
+
+
+class Conversation:
+    """History and tool result cache of one conversation, turns of a conversation run one at a time"""
+
+    def __init__(self, conversation_id: str, system_prompt: str):
+        self.conversation_id = conversation_id
+        self.messages: list[Message] = [Message(role=Role.SYSTEM, content=system_prompt)]
+        self.tool_cache = ToolResultCache()
+        self.lock = asyncio.Lock()
+        self.queued_turns = 0
+        self.last_active = time.monotonic()
+
+
+class AgentService:
+    """
+    Hosts many concurrent conversations on one DialClient (and so one OpenAI client and one set of
+    MCP clients). Every conversation has its own history and tool result cache.
+
+    Turns of one conversation are serialized, at most `max_queued_turns` may wait behind the running
+    one. At most `max_concurrent_turns` turns run at once across all conversations, the rest wait.
+    Conversations idle for `idle_ttl` seconds are dropped, and beyond `max_conversations` the least
+    recently active idle ones are dropped as well.
+    """
+
+    def __init__(
+            self,
+            dial_client: DialClient,
+            system_prompt: str,
+            max_concurrent_turns: int = 16,
+            max_queued_turns: int = 1,
+            max_conversations: int = 1000,
+            idle_ttl: float = 3600.0,
+    ):
+        self.dial_client = dial_client
+        self.system_prompt = system_prompt
+        self.max_queued_turns = max_queued_turns
+        self.max_conversations = max_conversations
+        self.idle_ttl = idle_ttl
+        self._turns = asyncio.Semaphore(max_concurrent_turns)
+        self._conversations: dict[str, Conversation] = {}
+        self.running_turns = 0
+
+    def get_conversation(self, conversation_id: Optional[str] = None) -> Conversation:
+        """Existing conversation or a new one, a new id is generated when not given"""
+        conversation_id = conversation_id or str(uuid.uuid4())
+        if conversation := self._conversations.get(conversation_id):
+            return conversation
+
+        self._evict()
+        conversation = Conversation(conversation_id, self.system_prompt)
+        self._conversations[conversation_id] = conversation
+        return conversation
+
+    def end_conversation(self, conversation_id: str) -> None:
+        self._conversations.pop(conversation_id, None)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        idle = sorted(
+            (c for c in self._conversations.values() if not c.lock.locked() and not c.queued_turns),
+            key=lambda c: c.last_active
+        )
+        over_limit = len(self._conversations) + 1 - self.max_conversations
+        for conversation in idle:
+            if now - conversation.last_active < self.idle_ttl and over_limit <= 0:
+                break
+            del self._conversations[conversation.conversation_id]
+            over_limit -= 1
+
+    async def send(
+            self,
+            conversation_id: str,
+            content: str,
+            on_token: Optional[Callable[[str], None]] = None
+    ) -> Message:
+        """Run one turn of the conversation, content tokens of the answer are passed to `on_token`"""
+        conversation = self.get_conversation(conversation_id)
+        if conversation.queued_turns > self.max_queued_turns:
+            raise ConversationBusyError(f"Conversation {conversation_id} already has a turn in progress")
+
+        conversation.queued_turns += 1
+        try:
+            async with conversation.lock, self._turns:
+                conversation.last_active = time.monotonic()
+                self.running_turns += 1
+                history_length = len(conversation.messages)
+                conversation.messages.append(Message(role=Role.USER, content=content))
+                try:
+                    ai_message = await self.dial_client.get_completion(
+                        conversation.messages,
+                        conversation.tool_cache,
+                        on_token=on_token
+                    )
+                except BaseException:
+                    # Don't leave a half-finished turn (e.g. tool calls without results) in the history
+                    del conversation.messages[history_length:]
+                    raise
+                finally:
+                    self.running_turns -= 1
+                    conversation.last_active = time.monotonic()
+                conversation.messages.append(ai_message)
+                return ai_message
+        finally:
+            conversation.queued_turns -= 1
+
+    async def stream(self, conversation_id: str, content: str) -> AsyncIterator[str]:
+        """Content tokens of the answer as they are generated, the turn is cancelled if the caller stops reading"""
+        queue: asyncio.Queue[Optional[str]] = asyncio.Queue()
+        turn = asyncio.create_task(self.send(conversation_id, content, on_token=queue.put_nowait))
+        turn.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (token := await queue.get()) is not None:
+                yield token
+            await turn
+        finally:
+            turn.cancel()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "conversations": len(self._conversations),
+            "running_turns": self.running_turns,
+            "waiting_turns": sum(c.queued_turns for c in self._conversations.values()) - self.running_turns,
+        }
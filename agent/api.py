@@ -0,0 +1,75 @@
+import json
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse, JSONResponse
+
+from agent.agent_service import AgentService
+from agent.app import create_agent_service
+from agent.models.chat_request import ChatRequest
+
+service: AgentService | None = None
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """One set of MCP clients and one DialClient for all conversations of the process"""
+    global service
+    registry, service = await create_agent_service()
+    yield
+    service.dial_client.metrics.close()
+    await registry.close()
+
+
+app = FastAPI(title="MCP Agent Service", version="1.0.0", lifespan=lifespan)
+
+
+async def _create_token_stream(conversation_id: str, content: str):
+    """SSE stream of answer tokens, an error ends the stream with an `error` event"""
+    try:
+        async for token in service.stream(conversation_id, content):
+            yield f"data: {json.dumps({'token': token})}\n\n".encode('utf-8')
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n".encode('utf-8')
+    yield b"data: [DONE]\n\n"
+
+
+@app.post("/conversations")
+async def create_conversation():
+    return {"conversation_id": service.get_conversation().conversation_id}
+
+
+@app.post("/conversations/{conversation_id}/messages")
+async def send_message(conversation_id: str, request: ChatRequest):
+    """Run a turn of the conversation, the answer is streamed as Server-Sent Events"""
+    conversation = service.get_conversation(conversation_id)
+    if conversation.queued_turns > service.max_queued_turns:
+        return JSONResponse(status_code=429, content={"error": "Conversation already has a turn in progress"})
+
+    return StreamingResponse(
+        content=_create_token_stream(conversation_id, request.content),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
+    )
+
+
+@app.delete("/conversations/{conversation_id}")
+async def end_conversation(conversation_id: str):
+    service.end_conversation(conversation_id)
+    return Response(status_code=204)
+
+
+@app.get("/stats")
+async def stats():
+    """Conversations and in-process latency percentiles (TTFT, tokens/s, tool round trips)"""
+    return {**service.stats(), "metrics": service.dial_client.metrics.summary()}
+
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "agent.api:app",
+        host="0.0.0.0",
+        port=8010,
+        log_level="info"
+    )
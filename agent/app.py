@@ -2,10 +2,41 @@ import asyncio
 import json
 import os
 
-from agent.clients.custom_mcp_client import CustomMCPClient
+from agent.agent_service import AgentService
 from agent.clients.dial_client import DialClient
-from agent.clients.mcp_client import MCPClient
-from agent.models.message import Message, Role
+from agent.clients.http_pool import shared_http_pool
+from agent.history_manager import HistoryManager
+from agent.metrics import AgentMetrics
+from agent.models.mcp_server_config import MCPServerConfig, MCPClientType
+from agent.tool_catalog_cache import ToolCatalogCache
+from agent.tool_registry import ToolRegistry, connect_servers
+from agent.tool_selector import ToolSelector
+
+MCP_SERVERS = [
+    # Add more `ums` entries to balance over several replicas of the UMS MCP server
+    MCPServerConfig(url="http://localhost:8006/mcp", name="ums", client=MCPClientType.SDK),
+    MCPServerConfig(url="https://remote.mcpservers.org/fetch/mcp", name="fetch", client=MCPClientType.CUSTOM),
+]
+
+SYSTEM_PROMPT = "You are an advanced AI agent. Your goal is to assist user with his questions."
+
+
+async def create_agent_service() -> tuple[ToolRegistry, AgentService]:
+    """MCP clients and the DialClient are created once and shared by all conversations"""
+    registry = await connect_servers(MCP_SERVERS, catalog_cache=ToolCatalogCache())
+    for tool in registry.tools:
+        print(f"{json.dumps(tool, indent=2)}")
+
+    dial_client = DialClient(
+        api_key=os.getenv("DIAL_API_KEY"),
+        endpoint="https://ai-proxy.lab.epam.com",
+        tools=registry.tools,
+        tool_name_client_map=registry.tool_name_client_map,
+        history_manager=HistoryManager(),
+        tool_selector=ToolSelector(),
+        metrics=AgentMetrics(labels={"model": "gpt-4o"})
+    )
+    return registry, AgentService(dial_client, system_prompt=SYSTEM_PROMPT)
 
 
 async def main():
@@ -19,54 +50,29 @@ async def main():
     # 7. Create DialClient, endpoint is `https://ai-proxy.lab.epam.com`
     # 8. Create array with Messages and add there System message with simple instructions for LLM that it should help to handle user request
     # 9. Create simple console chat (as we done in previous tasks)
-    tools = []
-    tool_dict = {}
-    mcp_client= await MCPClient.create(mcp_server_url='http://localhost:8006/mcp')
-    custom_mcp_client = await CustomMCPClient.create(mcp_server_url='https://remote.mcpservers.org/fetch/mcp')
-    for tool in await mcp_client.get_tools():
-       tools.append(tool)
-       tool_dict[tool.get('function', {}).get('name')] = mcp_client
-       print(f"{json.dumps(tool, indent=2)}")
-
-    for tool in await custom_mcp_client.get_tools():
-        tools.append(tool)
-        tool_dict[tool.get('function', {}).get('name')] = custom_mcp_client
-        print(f"{json.dumps(tool, indent=2)}")
-
-    for tool in await mcp_client.get_tools():
-       tools.append(tool)
-       tool_dict[tool.get('function', {}).get('name')] = mcp_client
-       print(f"{json.dumps(tool, indent=2)}")
-
-    dial_client = DialClient(
-        api_key=os.getenv("DIAL_API_KEY"),
-        endpoint="https://ai-proxy.lab.epam.com",
-        tools=tools,
-        tool_name_client_map=tool_dict
-    )
-
-    messages: list[Message] = [
-        Message(
-            role=Role.SYSTEM,
-            content="You are an advanced AI agent. Your goal is to assist user with his questions."
-        )
-    ]
+    registry, service = await create_agent_service()
+    conversation = service.get_conversation()
 
     print("MCP-based Agent is ready! Type your query or 'exit' to exit.")
-    while True:
-        user_input = input("\n> ").strip()
-        if user_input.lower() == 'exit':
-            break
+    try:
+        while True:
+            # Read input in a thread, blocking the loop would stall MCP sessions and background tasks
+            user_input = (await asyncio.to_thread(input, "\n> ")).strip()
+            if user_input.lower() == 'exit':
+                break
 
-        messages.append(
-            Message(
-                role=Role.USER,
-                content=user_input
+            print("🤖: ", end="", flush=True)
+            await service.send(
+                conversation.conversation_id,
+                user_input,
+                on_token=lambda token: print(token, end="", flush=True)
             )
-        )
-
-        ai_message: Message = await dial_client.get_completion(messages)
-        messages.append(ai_message)
+            print()
+    finally:
+        print(f"HTTP pool: {json.dumps(shared_http_pool.stats())}")
+        print(f"Agent metrics: {json.dumps(service.dial_client.metrics.summary(), indent=2)}")
+        service.dial_client.metrics.close()
+        await registry.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import json
+import socket
+import time
+from typing import Any, Optional
+
+import uvicorn
+from fastapi import FastAPI
+
+from agent.agent_service import AgentService
+from agent.bench import llm_stub, mcp_cassette
+from agent.bench.llm_stub import DEFAULT_SCENARIOS_PATH, ScriptBook
+from agent.bench.mcp_cassette import Cassette
+from agent.bench.scenarios import Scenario, load_scenarios
+from agent.clients.dial_client import DialClient
+from agent.metrics import AgentMetrics, Series
+from agent.models.mcp_server_config import MCPServerConfig, MCPClientType
+from agent.tool_registry import ToolRegistry, connect_servers
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _serve(app: FastAPI) -> tuple[str, uvicorn.Server, asyncio.Task]:
+    """App served from the same event loop"""
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server, task
+
+
+async def _run_conversation(
+        service: AgentService,
+        scenario: Scenario,
+        run: int,
+        turn_latency: Series,
+        first_token_latency: Series
+) -> int:
+    conversation = service.get_conversation(f"{scenario.name}-{run}")
+    for turn in scenario.turns:
+        started = time.perf_counter()
+        first_token_at: list[float] = []
+
+        def on_token(_: str):
+            if not first_token_at:
+                first_token_at.append(time.perf_counter())
+
+        await service.send(conversation.conversation_id, turn.user, on_token=on_token)
+        turn_latency.record(time.perf_counter() - started)
+        if first_token_at:
+            first_token_latency.record(first_token_at[0] - started)
+    service.end_conversation(conversation.conversation_id)
+    return len(scenario.turns)
+
+
+async def run_benchmark(
+        scenarios: list[Scenario],
+        mcp_servers: list[MCPServerConfig],
+        llm_url: Optional[str] = None,
+        repeat: int = 5,
+        concurrency: int = 4,
+        token_rate: float = 50.0,
+        latency: float = 0.3,
+        metrics_export: Optional[str] = None,
+        labels: Optional[dict[str, Any]] = None,
+        cassette: Optional[Cassette] = None,
+        cassette_speed: float = 1.0
+) -> dict[str, Any]:
+    """
+    Run every scenario `repeat` times, at most `concurrency` conversations at once, against the LLM stub
+    (started in process unless `llm_url` is given) and the MCP servers. Returns end-to-end turn latency,
+    throughput and the agent metrics summary.
+
+    With a `cassette` the single MCP server is reached through the cassette proxy, recording its traffic
+    or replaying it at `cassette_speed`, so MCP clients can be compared without the network.
+    """
+    servers = []
+    if not llm_url:
+        llm_url, server, task = await _serve(llm_stub.create_app(ScriptBook(scenarios), token_rate, latency))
+        servers.append((server, task))
+    if cassette:
+        if len(mcp_servers) != 1:
+            raise ValueError("A cassette records a single MCP server")
+        upstream = mcp_servers[0]
+        proxy_url, server, task = await _serve(mcp_cassette.create_app(cassette, upstream.url, cassette_speed))
+        servers.append((server, task))
+        mcp_servers = [upstream.model_copy(update={"url": f"{proxy_url}/mcp"})]
+
+    try:
+        registry = await connect_servers(mcp_servers)
+        try:
+            _check_tools(scenarios, registry)
+            return await _run(scenarios, registry, llm_url, repeat, concurrency, metrics_export, labels)
+        finally:
+            await registry.close()
+    finally:
+        for server, _ in servers:
+            server.should_exit = True
+        await asyncio.gather(*(task for _, task in servers))
+
+
+def _check_tools(scenarios: list[Scenario], registry: ToolRegistry) -> None:
+    """A run against missing tools would benchmark "MCP client not found" errors"""
+    if registry.failures and not registry.clients:
+        raise RuntimeError(f"No MCP server is reachable: {registry.failures}")
+    scripted = {
+        tool_call.name
+        for scenario in scenarios for turn in scenario.turns for step in turn.steps for tool_call in step.tool_calls
+    }
+    if missing := scripted - set(registry.tool_name_client_map):
+        raise RuntimeError(f"Scripted tools are not provided by the MCP servers: {sorted(missing)}")
+
+
+async def _run(
+        scenarios: list[Scenario],
+        registry: ToolRegistry,
+        llm_url: str,
+        repeat: int,
+        concurrency: int,
+        metrics_export: Optional[str],
+        labels: Optional[dict[str, Any]]
+) -> dict[str, Any]:
+    metrics = AgentMetrics(export_path=metrics_export, labels=labels)
+    dial_client = DialClient(
+        api_key="stub",
+        endpoint=llm_url,
+        tools=registry.tools,
+        tool_name_client_map=registry.tool_name_client_map,
+        metrics=metrics
+    )
+    service = AgentService(dial_client, system_prompt="You are a benchmark agent.", max_concurrent_turns=concurrency)
+
+    turn_latency, first_token_latency = Series(100_000), Series(100_000)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def run_one(scenario: Scenario, run: int) -> int:
+        async with limit:
+            return await _run_conversation(service, scenario, run, turn_latency, first_token_latency)
+
+    started = time.perf_counter()
+    try:
+        turns = await asyncio.gather(*(run_one(scenario, run) for run in range(repeat) for scenario in scenarios))
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.close()
+
+    completion_tokens = metrics.total("llm_step.completion_tokens")
+    return {
+        "conversations": len(turns),
+        "turns": sum(turns),
+        "seconds": round(elapsed, 3),
+        "turns_per_second": round(sum(turns) / elapsed, 2),
+        "completion_tokens_per_second": round(completion_tokens / elapsed, 1),
+        "turn_latency": turn_latency.summary() if turn_latency.count else None,
+        "first_token_latency": first_token_latency.summary() if first_token_latency.count else None,
+        "metrics": metrics.summary(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline agent benchmark against the LLM stub and local MCP servers")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS_PATH)
+    parser.add_argument("--mcp-url", default="http://localhost:8006/mcp")
+    parser.add_argument("--mcp-client", choices=[t.value for t in MCPClientType], default=MCPClientType.CUSTOM.value)
+    parser.add_argument("--llm-url", help="running stub or other OpenAI-compatible endpoint, by default a stub is started")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--token-rate", type=float, default=50.0)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--export", help="JSONL file for agent metric events")
+    parser.add_argument("--cassette", help="MCP cassette file, see agent.bench.mcp_cassette")
+    parser.add_argument("--cassette-mode", choices=["record", "replay"], default="replay")
+    parser.add_argument("--cassette-speed", type=float, default=1.0, help="replay pace, 0 replays without delays")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(
+        scenarios=load_scenarios(args.scenarios),
+        mcp_servers=[MCPServerConfig(url=args.mcp_url, name="ums", client=MCPClientType(args.mcp_client))],
+        llm_url=args.llm_url,
+        repeat=args.repeat,
+        concurrency=args.concurrency,
+        token_rate=args.token_rate,
+        latency=args.latency,
+        metrics_export=args.export,
+        labels={"mcp_client": args.mcp_client, "token_rate": args.token_rate, "latency": args.latency},
+        cassette=Cassette(args.cassette, args.cassette_mode) if args.cassette else None,
+        cassette_speed=args.cassette_speed
+    ))
+    print(json.dumps(report, indent=2))
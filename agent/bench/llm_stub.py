@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import json
+import re
+import time
+import uuid
+from typing import Any, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse, JSONResponse
+
+from agent.bench.scenarios import Scenario, ScriptedStep, load_scenarios
+
+DEFAULT_SCENARIOS_PATH = "agent/bench/scenarios.json"
+# Roughly one token: a word with its trailing whitespace
+_TOKEN = re.compile(r"\S+\s*|\s+")
+
+
+class ScriptBook:
+    """
+    Scripted LLM responses looked up by the last user message of the request and the number of
+    assistant messages after it (the step of the turn), so concurrent conversations replay independently.
+    """
+
+    def __init__(self, scenarios: list[Scenario], fallback: str = "OK."):
+        self.fallback = ScriptedStep(content=fallback)
+        self._turns: dict[str, list[ScriptedStep]] = {
+            turn.user: turn.steps for scenario in scenarios for turn in scenario.turns
+        }
+
+    def next_step(self, messages: list[dict[str, Any]]) -> ScriptedStep:
+        user_index = max((i for i, message in enumerate(messages) if message.get("role") == "user"), default=None)
+        if user_index is None:
+            return self.fallback
+        steps = self._turns.get(messages[user_index].get("content") or "")
+        if not steps:
+            return self.fallback
+        step = sum(1 for message in messages[user_index + 1:] if message.get("role") == "assistant")
+        return steps[min(step, len(steps) - 1)]
+
+
+def _chunk(completion_id: str, model: str, delta: dict[str, Any], finish_reason: Optional[str] = None) -> bytes:
+    body = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(body, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+async def _stream_step(
+        step: ScriptedStep,
+        model: str,
+        token_rate: float,
+        latency: float,
+        argument_chunk_chars: int
+):
+    """Chat completion chunks as AsyncAzureOpenAI expects them, tool call arguments are split across deltas"""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    interval = 1 / token_rate if token_rate > 0 else 0
+    await asyncio.sleep(latency)
+
+    yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+    for token in _TOKEN.findall(step.content):
+        await asyncio.sleep(interval)
+        yield _chunk(completion_id, model, {"content": token})
+
+    for index, tool_call in enumerate(step.tool_calls):
+        await asyncio.sleep(interval)
+        yield _chunk(completion_id, model, {"tool_calls": [{
+            "index": index,
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": tool_call.name, "arguments": ""},
+        }]})
+        arguments = json.dumps(tool_call.arguments)
+        for start in range(0, len(arguments), argument_chunk_chars):
+            await asyncio.sleep(interval)
+            yield _chunk(completion_id, model, {"tool_calls": [{
+                "index": index,
+                "function": {"arguments": arguments[start:start + argument_chunk_chars]},
+            }]})
+
+    yield _chunk(completion_id, model, {}, "tool_calls" if step.tool_calls else "stop")
+    yield b"data: [DONE]\n\n"
+
+
+def create_app(
+        script_book: ScriptBook,
+        token_rate: float = 50.0,
+        latency: float = 0.3,
+        argument_chunk_chars: int = 8
+) -> FastAPI:
+    """
+    OpenAI-compatible chat completions stub, served on the Azure deployment path used by DialClient.
+    `latency` is the delay before the first chunk, `token_rate` the chunks per second after it.
+    """
+    app = FastAPI(title="Chat Completions Stub", version="1.0.0")
+    app.state.requests = 0
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat_completions(deployment: str, request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        if not body.get("stream"):
+            return JSONResponse(status_code=400, content={"error": {"message": "Only streaming is supported"}})
+
+        step = script_book.next_step(body.get("messages", []))
+        return StreamingResponse(
+            content=_stream_step(step, body.get("model") or deployment, token_rate, latency, argument_chunk_chars),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"}
+        )
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible streaming stub")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS_PATH)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--token-rate", type=float, default=50.0, help="chunks per second")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first chunk")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(ScriptBook(load_scenarios(args.scenarios)), args.token_rate, args.latency),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning"
+    )
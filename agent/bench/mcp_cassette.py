@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse, JSONResponse
+
+from agent.clients.http_pool import shared_http_pool
+from agent.clients.sse import SSEDecoder
+
+FORWARDED_REQUEST_HEADERS = ("content-type", "accept", "mcp-session-id", "mcp-protocol-version", "traceparent")
+RECORDED_RESPONSE_HEADERS = ("content-type", "mcp-session-id")
+
+
+def request_key(http_method: str, body: Any) -> str:
+    """JSON-RPC method and params, without ids and `_meta` (trace context, idempotency keys) that vary per run"""
+    def strip(message: Any) -> Any:
+        if not isinstance(message, dict):
+            return message
+        params = {key: value for key, value in (message.get("params") or {}).items() if key != "_meta"}
+        return {"method": message.get("method"), "params": params}
+
+    stripped = [strip(message) for message in body] if isinstance(body, list) else strip(body)
+    return f"{http_method} {json.dumps(stripped, sort_keys=True, separators=(',', ':'))}"
+
+
+def _request_ids(body: Any) -> list[Any]:
+    messages = body if isinstance(body, list) else [body]
+    return [message.get("id") if isinstance(message, dict) else None for message in messages]
+
+
+def _rewrite_ids(data: str, id_map: dict[str, Any]) -> str:
+    """Recorded JSON-RPC response ids replaced with the ids of the replayed request"""
+    try:
+        payload = json.loads(data)
+    except json.JSONDecodeError:
+        return data
+    for message in payload if isinstance(payload, list) else [payload]:
+        if isinstance(message, dict) and (key := json.dumps(message.get("id"))) in id_map:
+            message["id"] = id_map[key]
+    return json.dumps(payload)
+
+
+def _frame(event: dict[str, Any], id_map: dict[str, Any]) -> bytes:
+    lines = []
+    if event["event"] != "message":
+        lines.append(f"event: {event['event']}")
+    if event["id"] is not None:
+        lines.append(f"id: {event['id']}")
+    lines.extend(f"data: {line}" for line in _rewrite_ids(event["data"], id_map).split("\n"))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+class Cassette:
+    """
+    Recorded MCP HTTP exchanges, one JSON line per exchange: the request key, its JSON-RPC ids, the response
+    status and headers, and SSE events (or the plain body) with their offsets from the request start.
+    Recording starts a new file. On replay exchanges with the same key are served in recorded order,
+    the last one is repeated once they run out, so a recording of one run can be replayed many times.
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+        self.path = path
+        self.mode = mode
+        self._exchanges: dict[str, deque[dict[str, Any]]] = {}
+        self._last: dict[str, dict[str, Any]] = {}
+        if mode == "record":
+            open(path, "w", encoding="utf-8").close()
+        else:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        exchange = json.loads(line)
+                        self._exchanges.setdefault(exchange["request"]["key"], deque()).append(exchange)
+
+    def record(self, exchange: dict[str, Any]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(exchange, separators=(",", ":")) + "\n")
+
+    def find(self, key: str) -> Optional[dict[str, Any]]:
+        if recorded := self._exchanges.get(key):
+            self._last[key] = recorded.popleft()
+        return self._last.get(key)
+
+
+async def _sleep_until(started: float, offset: float, speed: float) -> None:
+    if speed > 0 and (delay := started + offset / speed - time.perf_counter()) > 0:
+        await asyncio.sleep(delay)
+
+
+def create_app(cassette: Cassette, upstream_url: Optional[str] = None, speed: float = 1.0) -> FastAPI:
+    """
+    MCP proxy on `/mcp`. In record mode requests are forwarded to `upstream_url` and the exchanges are written
+    to the cassette, in replay mode they are served from it at `speed` times the recorded pace (0 = no delays).
+    Works for any MCP client, point it to the proxy instead of the server.
+    """
+    if cassette.mode == "record" and not upstream_url:
+        raise ValueError("Recording needs the upstream MCP server URL")
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        app.state.http_session = await shared_http_pool.acquire() if cassette.mode == "record" else None
+        yield
+        if app.state.http_session:
+            await shared_http_pool.release()
+
+    app = FastAPI(title="MCP Cassette Proxy", version="1.0.0", lifespan=lifespan)
+
+    async def record(request: Request, raw_body: bytes, key: str, ids: list[Any]) -> Response:
+        started = time.perf_counter()
+        headers = {name: value for name in FORWARDED_REQUEST_HEADERS if (value := request.headers.get(name))}
+        upstream = await app.state.http_session.request(request.method, upstream_url, data=raw_body, headers=headers)
+        response_headers = {name: value for name in RECORDED_RESPONSE_HEADERS if (value := upstream.headers.get(name))}
+        exchange = {
+            "request": {"key": key, "ids": ids},
+            "response": {
+                "status": upstream.status,
+                "headers": response_headers,
+                "headers_at": time.perf_counter() - started,
+            },
+        }
+
+        if "text/event-stream" not in upstream.headers.get("content-type", ""):
+            body = await upstream.read()
+            upstream.release()
+            exchange["response"]["body"] = body.decode("utf-8", errors="replace")
+            cassette.record(exchange)
+            return Response(content=body, status_code=upstream.status, headers=response_headers)
+
+        async def stream():
+            decoder, events = SSEDecoder(), []
+            try:
+                async for chunk in upstream.content.iter_any():
+                    offset = time.perf_counter() - started
+                    events.extend(
+                        {"t": offset, "event": event.event, "id": event.id, "data": event.data}
+                        for event in decoder.feed(chunk)
+                    )
+                    yield chunk
+                offset = time.perf_counter() - started
+                events.extend(
+                    {"t": offset, "event": event.event, "id": event.id, "data": event.data}
+                    for event in decoder.finish()
+                )
+            finally:
+                upstream.release()
+                exchange["response"]["events"] = events
+                cassette.record(exchange)
+
+        return StreamingResponse(content=stream(), status_code=upstream.status, headers=response_headers)
+
+    async def replay(key: str, ids: list[Any]) -> Response:
+        started = time.perf_counter()
+        exchange = cassette.find(key)
+        if not exchange:
+            return JSONResponse(
+                status_code=500,
+                content={"jsonrpc": "2.0", "id": None, "error": {"code": -32603, "message": f"Not in cassette: {key[:200]}"}}
+            )
+
+        recorded = exchange["response"]
+        id_map = {json.dumps(old): new for old, new in zip(exchange["request"]["ids"], ids)}
+        await _sleep_until(started, recorded["headers_at"], speed)
+
+        if "events" not in recorded:
+            return Response(
+                content=_rewrite_ids(recorded["body"], id_map) if recorded["body"] else b"",
+                status_code=recorded["status"],
+                headers=recorded["headers"]
+            )
+
+        async def stream():
+            for event in recorded["events"]:
+                await _sleep_until(started, event["t"], speed)
+                yield _frame(event, id_map)
+
+        return StreamingResponse(content=stream(), status_code=recorded["status"], headers=recorded["headers"])
+
+    @app.api_route("/mcp", methods=["POST", "GET", "DELETE"])
+    async def proxy(request: Request):
+        if request.method == "GET":
+            # No server-initiated stream, the spec allows servers to decline it
+            return Response(status_code=405)
+
+        raw_body = await request.body()
+        body = json.loads(raw_body) if raw_body else None
+        key = request_key(request.method, body)
+        ids = _request_ids(body)
+        if cassette.mode == "record":
+            return await record(request, raw_body, key, ids)
+        return await replay(key, ids)
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or replay MCP traffic through a local proxy")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--cassette", required=True)
+    parser.add_argument("--upstream", help="MCP server URL to record from")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay pace, 0 replays without delays")
+    parser.add_argument("--port", type=int, default=8095)
+    args = parser.parse_args()
+
+    print(f"MCP cassette proxy ({args.mode}) on http://127.0.0.1:{args.port}/mcp")
+    uvicorn.run(
+        create_app(Cassette(args.cassette, args.mode), args.upstream, args.speed),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning"
+    )
@@ -0,0 +1,31 @@
+import json
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class ScriptedToolCall(BaseModel):
+    name: str
+    arguments: dict[str, Any] = {}
+
+
+class ScriptedStep(BaseModel):
+    """One LLM response: text content and/or tool calls"""
+    content: str = ""
+    tool_calls: list[ScriptedToolCall] = []
+
+
+class ScriptedTurn(BaseModel):
+    """A user message and the LLM responses of each step of the turn, the last one answers in text"""
+    user: str
+    steps: list[ScriptedStep]
+
+
+class Scenario(BaseModel):
+    name: str
+    turns: list[ScriptedTurn]
+
+
+def load_scenarios(path: str) -> list[Scenario]:
+    with open(path, encoding="utf-8") as f:
+        return [Scenario.model_validate(scenario) for scenario in json.load(f)["scenarios"]]
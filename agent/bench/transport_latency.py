@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from agent.clients.custom_mcp_client import CustomMCPClient
+from agent.metrics import Series
+
+SERVER_START_TIMEOUT = 30.0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _start_server(workdir: str, name: str, *args: str) -> asyncio.subprocess.Process:
+    """Single-worker MCP server, its logs go to stderr"""
+    return await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "mcp_server.launcher", "--workers", "1", *args,
+        stdout=sys.stderr,
+        env={**os.environ, "MCP_SESSION_SNAPSHOT_PATH": os.path.join(workdir, f"{name}-sessions.json")}
+    )
+
+
+async def _connect(client: CustomMCPClient) -> CustomMCPClient:
+    """Retry until the server is up"""
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while True:
+        try:
+            return await client.__aenter__()
+        except RuntimeError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def _measure(call: Callable[[], Awaitable[Any]], calls: int, concurrency: int) -> dict[str, Any]:
+    for _ in range(min(calls, 10)):
+        await call()
+
+    latency = Series(calls)
+    for _ in range(calls):
+        started = time.perf_counter()
+        await call()
+        latency.record(time.perf_counter() - started)
+
+    limit = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with limit:
+            await call()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(calls)))
+    elapsed = time.perf_counter() - started
+    return {
+        "sequential_latency": latency.summary(),
+        "concurrent_calls_per_second": round(calls / elapsed, 1),
+    }
+
+
+async def compare_transports(
+        calls: int = 200,
+        concurrency: int = 8,
+        tool: Optional[str] = None,
+        tool_args: Optional[dict[str, Any]] = None
+) -> dict[str, Any]:
+    """
+    Latency of the same MCP round trip over HTTP on TCP, HTTP on a Unix domain socket and stdio, all served
+    by a local `mcp_server`. The round trip is `tools/list` unless a `tool` to call is given.
+    """
+    port = _free_port()
+    workdir = tempfile.mkdtemp()
+    uds = os.path.join(workdir, "mcp.sock")
+    servers = [
+        await _start_server(workdir, "tcp", "--host", "127.0.0.1", "--port", str(port)),
+        await _start_server(workdir, "uds", "--uds", uds),
+    ]
+    clients = {
+        "http_tcp": CustomMCPClient(f"http://127.0.0.1:{port}/mcp"),
+        "http_uds": CustomMCPClient("http://localhost/mcp", unix_socket=uds),
+        "stdio": CustomMCPClient("stdio://mcp_server", command=[sys.executable, "-m", "mcp_server.stdio"]),
+    }
+
+    report = {}
+    try:
+        for transport, client in clients.items():
+            await _connect(client)
+            if tool:
+                call = lambda c=client: c.call_tool(tool, tool_args or {})
+            else:
+                call = client.get_tools
+            report[transport] = await _measure(call, calls, concurrency)
+    finally:
+        for client in clients.values():
+            await client.close()
+        for server in servers:
+            server.terminate()
+            await server.wait()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare MCP round trip latency over TCP, Unix socket and stdio")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tool", help="tool to call instead of listing tools")
+    parser.add_argument("--args", default="{}", help="JSON arguments of the tool")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(compare_transports(args.calls, args.concurrency, args.tool, json.loads(args.args))), indent=2))
@@ -1,26 +1,98 @@
+import asyncio
 import json
+import random
 import uuid
-from typing import Optional, Any
+from typing import Optional, Any, Callable, AsyncIterator
 
 import aiohttp
 
+from agent.clients.http_pool import HttpPool, shared_http_pool, unix_socket_pool
+from agent.clients.jsonrpc_batcher import JsonRpcBatcher
+from agent.clients.schema_compactor import compact_tool_catalog
+from agent.clients.sse import iter_sse_events
+from agent.clients.stdio_transport import StdioTransport
+from tracing.tracer import Tracer, inject_headers, inject_meta
+
 MCP_SESSION_ID_HEADER = "Mcp-Session-Id"
+# Bodies of HTTP 400 responses the server sends for unknown or not initialized sessions
+SESSION_LOST_MARKERS = ("No valid session ID", "Missing session ID")
+# 404 bodies of servers that dropped the session (the MCP SDK server), other 404s are a wrong URL or a proxy
+SESSION_NOT_FOUND_MARKERS = ("Session has been terminated", "Invalid or expired session ID", "Session not found")
 
+tracer = Tracer("agent")
 
-class CustomMCPClient:
-    """Pure Python MCP client without external MCP libraries"""
 
-    def __init__(self, mcp_server_url: str) -> None:
+class SessionLostError(Exception):
+    pass
+
+
+class CustomMCPClient:
+    """
+    Pure Python MCP client without external MCP libraries. Streamable HTTP by default, for a server on the
+    same host HTTP over `unix_socket` (the URL host is then ignored) or stdio of a server subprocess
+    started with `command`, e.g. `["python", "-m", "mcp_server.stdio"]`.
+    """
+
+    def __init__(
+            self,
+            mcp_server_url: str,
+            http_pool: HttpPool = shared_http_pool,
+            batching: bool = False,
+            unix_socket: Optional[str] = None,
+            command: Optional[list[str]] = None,
+            max_concurrent_calls: int = 4
+    ) -> None:
         self.server_url = mcp_server_url
         self.session_id: Optional[str] = None
         self.http_session: Optional[aiohttp.ClientSession] = None
+        self.http_pool = unix_socket_pool(unix_socket) if unix_socket else http_pool
+        self.command = command
+        self.stdio: Optional[StdioTransport] = None
+        self.tool_annotations: dict[str, dict[str, Any]] = {}
+        self.server_info: dict[str, Any] = {}
+        self.on_tools_list_changed: Optional[Callable[[], None]] = None
+        self.max_recovery_attempts = 3
+        self.recovery_backoff = 0.2
+        self._session_generation = 0
+        self._recovery_lock = asyncio.Lock()
+        # Bounds the tool calls in flight on this endpoint
+        self._call_limit = asyncio.Semaphore(max_concurrent_calls)
+        # tools/call requests issued concurrently are sent as one JSON-RPC batch, pointless without HTTP requests
+        self.batcher: Optional[JsonRpcBatcher] = (
+            JsonRpcBatcher(self._post_batch) if batching and not command else None
+        )
 
     @classmethod
-    async def create(cls, mcp_server_url: str) -> 'CustomMCPClient':
+    async def create(cls, mcp_server_url: str, batching: bool = False) -> 'CustomMCPClient':
         """Async factory method to create and connect CustomMCPClient"""
-        instance = cls(mcp_server_url)
-        await instance.connect()
-        return instance
+        instance = cls(mcp_server_url, batching=batching)
+        return await instance.__aenter__()
+
+    @property
+    def connected(self) -> bool:
+        return self.http_session is not None or self.stdio is not None
+
+    async def __aenter__(self) -> 'CustomMCPClient':
+        if not self.connected:
+            try:
+                await self.connect()
+            except BaseException:
+                await self.close()
+                raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Release the pooled HTTP session, the connections stay open for other clients"""
+        if self.stdio:
+            stdio, self.stdio = self.stdio, None
+            await stdio.close()
+        if self.http_session:
+            self.http_session = None
+            self.session_id = None
+            await self.http_pool.release()
 
     async def _send_request(self, method: str, params: Optional[dict[str, Any]] = None) -> dict[str, Any]:
         """Send JSON-RPC request to MCP server"""
@@ -42,7 +114,7 @@ class CustomMCPClient:
         #         Otherwise call `await response.json()` and assign to `response_data`
         #       - If "error" in `response_data`, extract `error = response_data["error"]` and raise RuntimeError(f"MCP Error {error['code']}: {error['message']}")
         #       - Return `response_data`
-        if not self.http_session:
+        if not self.connected:
             raise Exception("No session present")
 
         request_body: dict[str, Any] = {
@@ -54,6 +126,20 @@ class CustomMCPClient:
         if params:
             request_body["params"] = params
 
+        if method == "initialize":
+            return await self._post_request(request_body)
+
+        generation = self._session_generation
+        try:
+            return await self._post_request(request_body)
+        except SessionLostError as e:
+            print(f"MCP session of {self.server_url} lost ({e}), re-initializing")
+            await self._recover_session(generation)
+        # The server rejects requests of unknown sessions before executing them, replay exactly once
+        return await self._post_request(request_body)
+
+    async def _post_request(self, request_body: dict[str, Any]) -> dict[str, Any]:
+        method = request_body["method"]
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json,text/event-stream"
@@ -62,26 +148,107 @@ class CustomMCPClient:
         if method != "initialize" and self.session_id:
             headers["mcp-session-id"] = self.session_id
 
-        async with self.http_session.post(
-                url=self.server_url,
-                json=request_body,
-                headers=headers
-        ) as response:
-            if not self.session_id and response.headers.get(MCP_SESSION_ID_HEADER):
-                self.session_id = response.headers.get(MCP_SESSION_ID_HEADER)
+        with tracer.span("mcp.client.request", method=method, server=self.server_url):
+            if method == "tools/call":
+                request_body = {**request_body, "params": inject_meta(request_body["params"])}
+                if self.batcher:
+                    return self._raise_for_error(await self.batcher.submit(request_body))
+            if self.stdio:
+                return self._raise_for_error(await self.stdio.request(request_body))
+            inject_headers(headers)
+
+            async with self.http_session.post(
+                    url=self.server_url,
+                    json=request_body,
+                    headers=headers
+            ) as response:
+                if method != "initialize":
+                    await self._check_session(response, "mcp-session-id" in headers)
+                if response.status == 404:
+                    raise RuntimeError(f"MCP endpoint {self.server_url} not found (HTTP 404)")
+                if not self.session_id and response.headers.get(MCP_SESSION_ID_HEADER):
+                    self.session_id = response.headers.get(MCP_SESSION_ID_HEADER)
+                if response.status == 202:
+                    return {}
+                content_type = response.content_type
+                if 'text/event-stream' in content_type.lower():
+                    response_data = await self._parse_sse_response_streaming(response)
+                else:
+                    response_data = await response.json()
+
+                return self._raise_for_error(response_data)
+
+    async def _post_batch(self, request_bodies: list[dict[str, Any]]) -> AsyncIterator[dict[str, Any]]:
+        """Send requests as one JSON-RPC batch, responses are yielded as the server streams them"""
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json,text/event-stream"
+        }
+        if self.session_id:
+            headers["mcp-session-id"] = self.session_id
+        inject_headers(headers)
+
+        body = request_bodies[0] if len(request_bodies) == 1 else request_bodies
+        async with self.http_session.post(url=self.server_url, json=body, headers=headers) as response:
+            await self._check_session(response, "mcp-session-id" in headers)
             if response.status == 202:
-                return {}
-            content_type = response.content_type
-            if 'text/event-stream' in content_type.lower():
-                response_data = await self._parse_sse_response_streaming(response)
+                return
+            if 'text/event-stream' in response.content_type.lower():
+                async for message in self._iter_sse_messages(response):
+                    yield message
             else:
                 response_data = await response.json()
+                for message in response_data if isinstance(response_data, list) else [response_data]:
+                    yield message
+
+    @staticmethod
+    def _raise_for_error(response_data: dict[str, Any]) -> dict[str, Any]:
+        if "error" in response_data:
+            error = response_data["error"]
+            raise RuntimeError(f"MCP Error {error['code']}: {error['message']}")
+        return response_data
+
+    @staticmethod
+    async def _check_session(response: aiohttp.ClientResponse, sent_session_id: bool) -> None:
+        """
+        Raises SessionLostError when the server no longer knows the session (restart, eviction). Only requests
+        that carried a session id can lose it, and the error body must say so.
+        """
+        if not sent_session_id:
+            return
+        if response.status == 404:
+            body = await response.text()
+            if any(marker in body for marker in SESSION_NOT_FOUND_MARKERS):
+                raise SessionLostError(body)
+        if response.status == 400:
+            body = await response.text()
+            if any(marker in body for marker in SESSION_LOST_MARKERS):
+                raise SessionLostError(body)
+
+    async def _recover_session(self, generation: int) -> None:
+        """
+        Re-run the handshake with jittered backoff. Concurrent callers that lost the same session
+        share one handshake: whoever comes after it sees a newer generation and returns.
+        """
+        async with self._recovery_lock:
+            if self._session_generation != generation:
+                return
+
+            last_error: Exception | None = None
+            for attempt in range(self.max_recovery_attempts):
+                await asyncio.sleep(random.uniform(0, self.recovery_backoff * 2 ** attempt))
+                self.session_id = None
+                try:
+                    await self._initialize()
+                except Exception as e:
+                    last_error = e
+                    print(f"MCP session recovery attempt {attempt + 1} for {self.server_url} failed: {e}")
+                    continue
+                self._session_generation += 1
+                print(f"MCP session of {self.server_url} re-established: {self.session_id}")
+                return
 
-            if "error" in response_data:
-                error = response_data["error"]
-                raise RuntimeError(f"MCP Error {error['code']}: {error['message']}")
-
-            return response_data
+            raise RuntimeError(f"Unable to re-establish MCP session with {self.server_url}: {last_error}")
 
     async def _parse_sse_response_streaming(self, response: aiohttp.ClientResponse) -> dict[str, Any]:
         """Parse Server-Sent Events response with streaming"""
@@ -109,22 +276,33 @@ class CustomMCPClient:
         #           - If `data_part != '[DONE]'`, then `return json.loads(data_part)` (we just need first chunk since MCP tool returns response with 1 chunk)
         # 2. raise RuntimeError("No valid data found in SSE response")
 
-        async for line in response.content:
-            line_str = line.decode('utf-8').strip()
-            if not line_str or line_str.startswith(":"):
-                continue
-            if line_str.startswith("data:"):
-                data_part = line_str[6:].strip()
-                if data_part in ('[DONE]', ''):
-                    continue
-                try:
-                    return json.loads(data_part)
-                except json.JSONDecodeError:
-                    continue
+        async for message in self._iter_sse_messages(response):
+            return message
 
-        RuntimeError("No valid data found in SSE response")
+        raise RuntimeError("No valid data found in SSE response")
 
-        raise NotImplementedError()
+    async def _iter_sse_messages(self, response: aiohttp.ClientResponse) -> AsyncIterator[dict[str, Any]]:
+        """JSON-RPC responses of an SSE stream as they arrive, notifications are handled on the way"""
+        async for event in iter_sse_events(response.content):
+            if event.data == "[DONE]":
+                continue
+            try:
+                message = json.loads(event.data)
+            except json.JSONDecodeError:
+                print(f"Skipping malformed SSE event: {event.data[:200]}")
+                continue
+            if isinstance(message, dict) and "method" in message and "id" not in message:
+                # Server notification sent ahead of the response
+                self._handle_notification(message)
+                continue
+            yield message
+
+    def _handle_notification(self, notification: dict[str, Any]) -> None:
+        if notification["method"] == "notifications/tools/list_changed" and self.on_tools_list_changed:
+            self.on_tools_list_changed()
+        elif notification["method"] == "notifications/progress":
+            params = notification.get("params") or {}
+            print(f"    Progress: {params.get('progress')}/{params.get('total', '?')} {params.get('message', '')}")
 
     async def connect(self) -> None:
         """Connect to MCP server and initialize session"""
@@ -141,29 +319,36 @@ class CustomMCPClient:
         #       - Call `await self._send_notification("notifications/initialized")`
         #       - Print capabilities (from init request)
         # 4. Catch Exception as `e` and raise RuntimeError(f"Failed to connect to MCP server: {e}")
-        timeout = aiohttp.ClientTimeout(total=30, connect=10)
-        connector = aiohttp.TCPConnector(limit=100, limit_per_host=10)
-
-        self.http_session = aiohttp.ClientSession(timeout=timeout, connector=connector)
+        if self.command:
+            if not self.stdio:
+                self.stdio = StdioTransport(self.command, on_notification=self._handle_notification)
+                await self.stdio.start()
+        elif not self.http_session:
+            self.http_session = await self.http_pool.acquire()
 
         try:
-            init_params = {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {
-                    "tools": {},
-                },
-                "clientInfo": {
-                    "name": "my-custom-mcp-client",
-                    "version": "1.0.0"
-                }
-            }
-
-            init_result = await self._send_request("initialize", init_params)
-            await self._send_notification("notifications/initialized")
+            init_result = await self._initialize()
             print(json.dumps(init_result, indent=2))
         except Exception as e:
             raise RuntimeError(f"Failed to connect to MCP server: {e}")
 
+    async def _initialize(self) -> dict[str, Any]:
+        init_params = {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {
+                "tools": {},
+            },
+            "clientInfo": {
+                "name": "my-custom-mcp-client",
+                "version": "1.0.0"
+            }
+        }
+
+        init_result = await self._send_request("initialize", init_params)
+        self.server_info = init_result.get("result", {}).get("serverInfo", {})
+        await self._send_notification("notifications/initialized")
+        return init_result
+
     async def _send_notification(self, method: str) -> None:
         """Send notification (no response expected)"""
         # TODO:
@@ -180,7 +365,7 @@ class CustomMCPClient:
         #       - json: request_data
         #       - headers: headers
         #    If MCP_SESSION_ID_HEADER exists in `response.headers`, set `self.session_id = response.headers[MCP_SESSION_ID_HEADER]` and print session ID
-        if not self.http_session:
+        if not self.connected:
             raise RuntimeError("HTTP session not initialized")
 
         request_data = {
@@ -188,6 +373,10 @@ class CustomMCPClient:
             "method": method
         }
 
+        if self.stdio:
+            await self.stdio.send(request_data)
+            return
+
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json, text/event-stream"
@@ -205,6 +394,12 @@ class CustomMCPClient:
                 self.session_id = response.headers[MCP_SESSION_ID_HEADER]
                 print(f"Session ID: {self.session_id}")
 
+    async def ping(self) -> None:
+        """Round trip to the MCP server, raises if it does not answer"""
+        if not self.connected:
+            raise RuntimeError("MCP client not connected. Call connect() first.")
+        await self._send_request("ping")
+
     async def get_tools(self) -> list[dict[str, Any]]:
         """Get available tools from MCP server"""
         # TODO:
@@ -213,12 +408,13 @@ class CustomMCPClient:
         # 3. Extract tools from response. See response sample in postman
         # 4. Return list with dicts with tool schemas. It should be provided according to DIAL specification
         # https://dialx.ai/dial_api#operation/sendChatCompletionRequest (request -> tools)
-        if not self.http_session:
+        if not self.connected:
             raise RuntimeError("MCP client not connected. Call connect() first.")
 
         response = await self._send_request("tools/list")
         tools = response["result"]["tools"]
-        return [
+        self.tool_annotations = {tool["name"]: tool.get("annotations") or {} for tool in tools}
+        return compact_tool_catalog([
             {
                 "type": "function",
                 "function": {
@@ -228,10 +424,13 @@ class CustomMCPClient:
                 }
             }
             for tool in tools
-        ]
+        ])
 
-    async def call_tool(self, tool_name: str, tool_args: dict[str, Any]) -> Any:
-        """Call a specific tool on the MCP server"""
+    async def call_tool(self, tool_name: str, tool_args: dict[str, Any], idempotency_key: Optional[str] = None) -> Any:
+        """
+        Call a specific tool on the MCP server. An `idempotency_key` is sent as `_meta.idempotencyKey`,
+        the server replays the stored result for a repeated key and forwards it to the tool backend
+        """
         # TODO:
         # 1. Check if `self.http_session` is None, raise RuntimeError("MCP client not connected. Call connect() first.") if so
         # 2. print(f"    Calling `{tool_name}` with {tool_args}")
@@ -258,7 +457,7 @@ class CustomMCPClient:
         # 8. print(f"    ⚙️: {text_result}\n")
         # 9. Return `text_result`
         # 10. If no content found, return "Unexpected error occurred!"
-        if not self.http_session:
+        if not self.connected:
             raise RuntimeError("MCP client not connected. Call connect() first.")
 
         print(f"    Calling `{tool_name}` with {tool_args}")
@@ -266,7 +465,10 @@ class CustomMCPClient:
             "name": tool_name,
             "arguments": tool_args
         }
-        response = await self._send_request("tools/call", params)
+        if idempotency_key:
+            params["_meta"] = {"idempotencyKey": idempotency_key}
+        async with self._call_limit:
+            response = await self._send_request("tools/call", params)
 
         if content := response["result"].get("content", []):
             if item := content[0]:
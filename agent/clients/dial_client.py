@@ -1,12 +1,35 @@
+import asyncio
+import contextlib
 import json
-from collections import defaultdict
-from typing import Any
+import time
+from typing import Any, Callable, Optional
 
 from openai import AsyncAzureOpenAI
 
 from agent.clients.custom_mcp_client import CustomMCPClient
+from agent.clients.tool_call_assembler import ToolCallAssembler
+from agent.history_manager import HistoryManager, estimate_tokens
+from agent.mcp_router import MCPRouter
+from agent.metrics import AgentMetrics
+from agent.tool_selector import ToolSelector
+from agent.tool_result_cache import ToolResultCache
+from agent.models.agent_budget import AgentBudget
 from agent.models.message import Message, Role
+from agent.models.step_record import StepRecord
 from agent.clients.mcp_client import MCPClient
+from tracing.tracer import Tracer
+
+tracer = Tracer("agent")
+
+
+def _call_signature(tool_call: dict[str, Any]) -> str:
+    """Tool name and canonical arguments, to detect repeated calls"""
+    arguments = tool_call["function"]["arguments"] or "{}"
+    try:
+        arguments = json.dumps(json.loads(arguments), sort_keys=True, separators=(",", ":"))
+    except json.JSONDecodeError:
+        pass
+    return f"{tool_call['function']['name']}:{arguments}"
 
 
 class DialClient:
@@ -17,105 +40,362 @@ class DialClient:
             api_key: str,
             endpoint: str,
             tools: list[dict[str, Any]],
-            tool_name_client_map: dict[str, MCPClient | CustomMCPClient]
+            tool_name_client_map: dict[str, MCPClient | CustomMCPClient | MCPRouter],
+            serialize_write_tools: bool = False,
+            early_tool_dispatch: bool = True,
+            history_manager: Optional[HistoryManager] = None,
+            tool_selector: Optional[ToolSelector] = None,
+            budget: Optional[AgentBudget] = None,
+            metrics: Optional[AgentMetrics] = None
     ):
         self.tools = tools
         self.tool_name_client_map = tool_name_client_map
+        # Independent tool calls from one assistant message run concurrently,
+        # each MCP endpoint client bounds the calls in flight on it (MCPServerConfig.max_concurrent_calls)
+        # Optionally run tools that declare side effects one at a time
+        self.serialize_write_tools = serialize_write_tools
+        self._write_lock = asyncio.Lock()
+        # Start read-only tool calls as soon as their arguments are complete, while the model is still streaming
+        self.early_tool_dispatch = early_tool_dispatch
+        # Keeps the prompt within a token budget, the full history is sent when not set
+        self.history_manager = history_manager
+        # Sends only the tools relevant to the conversation, all tools are sent when not set
+        self.tool_selector = tool_selector
+        # Limits of the agent loop within one turn
+        self.budget = budget or AgentBudget()
+        # Per step, per tool call and per turn latencies, nothing is recorded when not set
+        self.metrics = metrics
         self.openai = AsyncAzureOpenAI(
             api_key=api_key,
             azure_endpoint=endpoint,
             api_version=""
         )
 
-    def _collect_tool_calls(self, tool_deltas):
-        """Convert streaming tool call deltas to complete tool calls"""
-        tool_dict = defaultdict(lambda: {"id": None, "function": {"arguments": "", "name": None}, "type": None})
-
-        for delta in tool_deltas:
-            idx = delta.index
-            if delta.id: tool_dict[idx]["id"] = delta.id
-            if delta.function.name: tool_dict[idx]["function"]["name"] = delta.function.name
-            if delta.function.arguments: tool_dict[idx]["function"]["arguments"] += delta.function.arguments
-            if delta.type: tool_dict[idx]["type"] = delta.type
-
-        return list(tool_dict.values())
-
-    async def _stream_response(self, messages: list[Message]) -> Message:
-        """Stream OpenAI response and handle tool calls"""
-        stream = await self.openai.chat.completions.create(
-            **{
-                "model": "gpt-4o",
-                "messages": [msg.to_dict() for msg in messages],
-                "tools": self.tools,
-                "temperature": 0.0,
-                "stream": True
-            }
-        )
+    async def _stream_response(
+            self,
+            messages: list[Message],
+            on_tool_call: Optional[Callable[[dict[str, Any]], None]] = None,
+            on_token: Optional[Callable[[str], None]] = None,
+            step: Optional[StepRecord] = None,
+            allow_tools: bool = True
+    ) -> Message:
+        """
+        Stream OpenAI response and handle tool calls, `on_tool_call` is called for every completed tool call.
+        Content tokens go to `on_token`, or are printed to the console when it is not set.
+        Estimated token counts are written to `step`. With `allow_tools=False` the model must answer in text.
+        """
+        if self.history_manager:
+            messages = self.history_manager.compact(messages)
 
-        content = ""
-        tool_deltas = []
+        tools = self.tools
+        selected_tools = None
+        if self.tool_selector:
+            selected_tools = self.tool_selector.select(self.tools, messages)
+            if not self.tool_selector.recall_check:
+                tools = selected_tools
 
-        print("🤖: ", end="", flush=True)
+        request = {
+            "model": "gpt-4o",
+            "messages": [msg.to_dict() for msg in messages],
+            "tools": tools,
+            "temperature": 0.0,
+            "stream": True
+        }
+        if not allow_tools and tools:
+            # Tools stay in the request, the history references them
+            request["tool_choice"] = "none"
+        if step:
+            step.prompt_tokens = (
+                sum(HistoryManager.estimate_message_tokens(msg) for msg in messages)
+                + estimate_tokens(json.dumps(tools))
+            )
 
-        async for chunk in stream:
-            delta = chunk.choices[0].delta
+        with tracer.span("llm.stream", model="gpt-4o", messages=len(messages), tools=len(tools)):
+            request_started = time.perf_counter()
+            first_delta_at = first_tool_delta_at = None
+            deltas = 0
+            stream = await self.openai.chat.completions.create(**request)
 
-            # Stream content
-            if delta.content:
-                print(delta.content, end="", flush=True)
-                content += delta.content
+            content = ""
+            assembler = ToolCallAssembler(on_complete=on_tool_call)
 
-            if delta.tool_calls:
-                tool_deltas.extend(delta.tool_calls)
+            if not on_token:
+                print("🤖: ", end="", flush=True)
 
-        print()
-        return Message(
-            role=Role.AI,
-            content=content,
-            tool_calls=self._collect_tool_calls(tool_deltas) if tool_deltas else []
-        )
+            async for chunk in stream:
+                delta = chunk.choices[0].delta
+                if delta.content or delta.tool_calls:
+                    deltas += 1
+                    if first_delta_at is None:
+                        first_delta_at = time.perf_counter()
+
+                # Stream content
+                if delta.content:
+                    if on_token:
+                        on_token(delta.content)
+                    else:
+                        print(delta.content, end="", flush=True)
+                    content += delta.content
+
+                if delta.tool_calls:
+                    if first_tool_delta_at is None:
+                        first_tool_delta_at = time.perf_counter()
+                    for tool_delta in delta.tool_calls:
+                        assembler.add(tool_delta)
+            stream_finished = time.perf_counter()
+
+            if not on_token:
+                print()
+            tool_calls = assembler.finish()
+            if selected_tools is not None and self.tool_selector.recall_check:
+                self.tool_selector.record_calls(selected_tools, tool_calls)
+            if step:
+                step.completion_tokens = estimate_tokens(content) + (estimate_tokens(json.dumps(tool_calls)) if tool_calls else 0)
+                if first_delta_at is not None:
+                    step.ttft_seconds = first_delta_at - request_started
+                    if deltas > 1:
+                        # Throughput is undefined for a completion that arrived in one delta
+                        step.tokens_per_second = step.completion_tokens / (stream_finished - first_delta_at)
+                if first_tool_delta_at is not None:
+                    step.tool_assembly_seconds = stream_finished - first_tool_delta_at
+
+            return Message(
+                role=Role.AI,
+                content=content,
+                tool_calls=tool_calls
+            )
 
-    async def get_completion(self, messages: list[Message]) -> Message:
-        """Process user query with streaming and tool calling"""
-        ai_message: Message = await self._stream_response(messages)
+    async def get_completion(
+            self,
+            messages: list[Message],
+            tool_cache: Optional[ToolResultCache] = None,
+            on_token: Optional[Callable[[str], None]] = None,
+            on_step: Optional[Callable[[StepRecord], None]] = None
+    ) -> Message:
+        """
+        Process user query with streaming and tool calling.
+        `tool_cache` memoizes read-only tool results, it should live as long as the conversation.
+        `on_token` receives content tokens as they stream, the client holds no per-conversation state,
+        so one instance serves concurrent conversations. `on_step` receives the timing of every step.
+        """
+        started = time.perf_counter()
+        steps: list[StepRecord] = []
+
+        def report_step(record: StepRecord):
+            steps.append(record)
+            if on_step:
+                on_step(record)
 
-        # Check if any tool calls are present and perform them
-        if ai_message.tool_calls:
-            messages.append(ai_message)
-            await self._call_tools(ai_message, messages)
-            # recursively calling agent with tool messages
-            return await self.get_completion(messages)
+        with tracer.span("agent.turn"):
+            ai_message = await self._complete(messages, tool_cache, on_token, report_step)
 
+        if self.metrics:
+            self.metrics.observe(
+                "turn",
+                seconds=time.perf_counter() - started,
+                steps=len(steps),
+                llm_seconds=sum(step.llm_seconds for step in steps),
+                tool_seconds=sum(step.tool_seconds for step in steps),
+                stop_reason=next((step.stop_reason for step in steps if step.stop_reason), None)
+            )
         return ai_message
 
-    async def _call_tools(self, ai_message: Message, messages: list[Message]):
-        """Execute tool calls using MCP client"""
-        for tool_call in ai_message.tool_calls:
-            tool_name = tool_call["function"]["name"]
-            tool_args = json.loads(tool_call["function"]["arguments"])
+    async def _complete(
+            self,
+            messages: list[Message],
+            tool_cache: Optional[ToolResultCache] = None,
+            on_token: Optional[Callable[[str], None]] = None,
+            on_step: Optional[Callable[[StepRecord], None]] = None
+    ) -> Message:
+        """
+        Agent loop: LLM call, tool calls, repeat until the model answers in text. When a budget is exhausted,
+        or the model repeats the tool calls of the previous step, it gets one more call without tools.
+        """
+        started = time.perf_counter()
+        used_tokens = 0
+        previous_calls: set[str] = set()
+        stop_reason: Optional[str] = None
+        step = 0
+
+        while True:
+            step += 1
+            record = StepRecord(step=step)
+            # tool_call id -> (signature of the call it was started with, task)
+            dispatched: dict[str, tuple[str, asyncio.Task[Message]]] = {}
 
+            def dispatch(tool_call: dict[str, Any]):
+                if not self._is_read_only_tool(tool_call["function"]["name"], tool_cache):
+                    # A write started on arguments that keep streaming could not be taken back
+                    return
+                signature = _call_signature(tool_call)
+                if signature in previous_calls:
+                    # Possibly a repeated call, it is decided once the whole message is in
+                    return
+                snapshot = {**tool_call, "function": dict(tool_call["function"])}
+                dispatched[tool_call["id"]] = (signature, asyncio.create_task(self._call_tool(snapshot, tool_cache)))
+
+            llm_started = time.perf_counter()
             try:
-                client = self.tool_name_client_map.get(tool_name)
-                if not client:
-                    raise Exception(f"Unable to call {tool_name}. MCP client not found.")
-
-                tool_result = await client.call_tool(tool_name, tool_args)
-
-                # Add tool result to history
-                messages.append(
-                    Message(
-                        role=Role.TOOL,
-                        content=str(tool_result),
-                        tool_call_id=tool_call["id"],
-                    )
+                ai_message: Message = await self._stream_response(
+                    messages,
+                    on_tool_call=dispatch if self.early_tool_dispatch and not stop_reason else None,
+                    on_token=on_token,
+                    step=record,
+                    allow_tools=not stop_reason
                 )
-            except Exception as e:
-                error_msg = f"Error: {e}"
-                print(f"Error: {error_msg}")
-                messages.append(
-                    Message(
-                        role=Role.TOOL,
-                        content=error_msg,
-                        tool_call_id=tool_call["id"],
-                    )
+            except BaseException:
+                for _, task in dispatched.values():
+                    task.cancel()
+                raise
+            record.llm_seconds = time.perf_counter() - llm_started
+            used_tokens += record.prompt_tokens + record.completion_tokens
+
+            if not ai_message.tool_calls or stop_reason:
+                self._report_step(record, on_step)
+                if ai_message.tool_calls:
+                    # Calls that will never run must not end up in the history
+                    ai_message = ai_message.model_copy(update={
+                        "tool_calls": None,
+                        "content": ai_message.content or f"Unable to complete the request ({stop_reason})."
+                    })
+                return ai_message
+
+            record.tool_calls = [tool_call["function"]["name"] for tool_call in ai_message.tool_calls]
+            calls = {_call_signature(tool_call) for tool_call in ai_message.tool_calls}
+            if calls <= previous_calls:
+                for _, task in dispatched.values():
+                    task.cancel()
+                stop_reason = record.stop_reason = "duplicate_tool_calls"
+            else:
+                previous_calls = calls
+                messages.append(ai_message)
+                tools_started = time.perf_counter()
+                await self._call_tools(ai_message, messages, dispatched, tool_cache)
+                record.tool_seconds = time.perf_counter() - tools_started
+
+                if step >= self.budget.max_steps:
+                    stop_reason = record.stop_reason = "max_steps"
+                elif self.budget.max_seconds and time.perf_counter() - started >= self.budget.max_seconds:
+                    stop_reason = record.stop_reason = "max_seconds"
+                elif self.budget.max_tokens and used_tokens >= self.budget.max_tokens:
+                    stop_reason = record.stop_reason = "max_tokens"
+
+            self._report_step(record, on_step)
+            if stop_reason:
+                print(f"Agent turn stopped after {step} step(s) ({stop_reason}), asking for an answer without tools")
+
+    def _report_step(self, record: StepRecord, on_step: Optional[Callable[[StepRecord], None]]) -> None:
+        print(
+            f"Step {record.step}: llm {record.llm_seconds:.2f}s, tools {record.tool_seconds:.2f}s, "
+            f"~{record.prompt_tokens}+{record.completion_tokens} tokens, calls {record.tool_calls}"
+        )
+        if self.metrics:
+            self.metrics.observe("llm_step", model="gpt-4o", **record.model_dump(exclude={"step"}))
+        if on_step:
+            on_step(record)
+
+    async def _call_tools(
+            self,
+            ai_message: Message,
+            messages: list[Message],
+            dispatched: Optional[dict[str, tuple[str, asyncio.Task[Message]]]] = None,
+            tool_cache: Optional[ToolResultCache] = None
+    ):
+        """
+        Execute tool calls concurrently, tool messages are appended in the original tool_call order.
+        Calls that were already started during streaming are awaited instead of being called again.
+        """
+        dispatched = dispatched or {}
+        pending = []
+        for tool_call in ai_message.tool_calls:
+            early_call = dispatched.pop(tool_call["id"], None)
+            if early_call and early_call[0] == _call_signature(tool_call):
+                pending.append(early_call[1])
+            else:
+                if early_call:
+                    # Arguments kept streaming after they looked complete
+                    early_call[1].cancel()
+                pending.append(self._call_tool(tool_call, tool_cache))
+
+        for _, task in dispatched.values():
+            task.cancel()
+
+        messages.extend(await asyncio.gather(*pending))
+
+    def _is_read_only_tool(self, tool_name: str, tool_cache: Optional[ToolResultCache] = None) -> bool:
+        if not (client := self.tool_name_client_map.get(tool_name)):
+            return False
+        if tool_cache:
+            return tool_cache.is_read_only(client, tool_name)
+        return client.tool_annotations.get(tool_name, {}).get("readOnlyHint") is True
+
+    def _is_write_tool(self, client: MCPClient | CustomMCPClient, tool_name: str) -> bool:
+        """Tool declares that it is not read-only or that it is destructive"""
+        annotations = client.tool_annotations.get(tool_name, {})
+        return annotations.get("readOnlyHint") is False or annotations.get("destructiveHint") is True
+
+    async def _call_tool(self, tool_call: dict[str, Any], tool_cache: Optional[ToolResultCache] = None) -> Message:
+        """Execute tool call using MCP client"""
+        tool_name = tool_call["function"]["name"]
+
+        try:
+            tool_args = json.loads(tool_call["function"]["arguments"] or "{}")
+            client = self.tool_name_client_map.get(tool_name)
+            if not client:
+                raise Exception(f"Unable to call {tool_name}. MCP client not found.")
+
+            read_only = tool_cache.is_read_only(client, tool_name) if tool_cache else False
+            if read_only and (cached_result := tool_cache.get(client, tool_name, tool_args)) is not None:
+                print(f"    Using cached result of `{tool_name}` with {tool_args}")
+                if self.metrics:
+                    self.metrics.observe("tool_cache_hit", key=tool_name, hits=1)
+                return Message(
+                    role=Role.TOOL,
+                    content=str(cached_result),
+                    tool_call_id=tool_call["id"],
                 )
+
+            generation = tool_cache.generation(client) if tool_cache else None
+            if self.serialize_write_tools and self._is_write_tool(client, tool_name):
+                write_lock = self._write_lock
+            else:
+                write_lock = contextlib.nullcontext()
+            queued = time.perf_counter()
+            started = None
+            failed = True
+            try:
+                async with write_lock:
+                    started = time.perf_counter()
+                    with tracer.span("tool.call", tool=tool_name):
+                        tool_result = await client.call_tool(tool_name, tool_args)
+                    failed = False
+            finally:
+                if self.metrics and started is not None:
+                    self.metrics.observe(
+                        "tool_call",
+                        key=tool_name,
+                        seconds=time.perf_counter() - started,
+                        wait_seconds=started - queued,
+                        server=client.server_url,
+                        failed=failed
+                    )
+                if tool_cache and not read_only:
+                    # A write may have changed anything the server returned before
+                    tool_cache.invalidate(client)
+
+            if read_only:
+                tool_cache.put(client, tool_name, tool_args, tool_result, generation)
+
+            return Message(
+                role=Role.TOOL,
+                content=str(tool_result),
+                tool_call_id=tool_call["id"],
+            )
+        except Exception as e:
+            error_msg = f"Error: {e}"
+            print(f"Error: {error_msg}")
+            return Message(
+                role=Role.TOOL,
+                content=error_msg,
+                tool_call_id=tool_call["id"],
+            )
@@ -0,0 +1,95 @@
+from typing import Any, Optional
+
+import aiohttp
+
+
+class HttpPool:
+    """
+    One aiohttp session and connector shared by all CustomMCPClient instances: keep-alive connections
+    and DNS lookups are reused across clients. The session is created on first `acquire()` and closed
+    when the last holder calls `release()`.
+
+    With `unix_socket` connections go to that socket whatever the host of the URL, for servers on the same host.
+    """
+
+    def __init__(
+            self,
+            limit: int = 100,
+            limit_per_host: int = 10,
+            keepalive_timeout: float = 60.0,
+            dns_cache_ttl: int = 300,
+            total_timeout: float = 30.0,
+            connect_timeout: float = 10.0,
+            unix_socket: Optional[str] = None,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.unix_socket = unix_socket
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._connector: Optional[aiohttp.BaseConnector] = None
+        self._holders = 0
+
+    async def acquire(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            if self.unix_socket:
+                self._connector = aiohttp.UnixConnector(
+                    path=self.unix_socket,
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                )
+            else:
+                self._connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                )
+            self._session = aiohttp.ClientSession(timeout=self.timeout, connector=self._connector)
+        self._holders += 1
+        return self._session
+
+    async def release(self) -> None:
+        self._holders = max(self._holders - 1, 0)
+        if not self._holders and self._session and not self._session.closed:
+            await self._session.close()
+            self._session = None
+            self._connector = None
+
+    def stats(self) -> dict[str, Any]:
+        """Pool utilization, for tuning limits (reads aiohttp connector internals)"""
+        connector = self._connector
+        if not connector or connector.closed:
+            return {"open": False, "holders": self._holders}
+
+        acquired_per_host = getattr(connector, "_acquired_per_host", {})
+        idle_per_host = getattr(connector, "_conns", {})
+        return {
+            "open": True,
+            "holders": self._holders,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "in_use": len(getattr(connector, "_acquired", ())),
+            "idle": sum(len(conns) for conns in idle_per_host.values()),
+            "per_host": {
+                f"{key.host}:{key.port}": {
+                    "in_use": len(acquired_per_host.get(key, ())),
+                    "idle": len(idle_per_host.get(key, ())),
+                }
+                for key in set(acquired_per_host) | set(idle_per_host)
+            },
+        }
+
+
+shared_http_pool = HttpPool()
+_unix_socket_pools: dict[str, HttpPool] = {}
+
+
+def unix_socket_pool(path: str) -> HttpPool:
+    """Pool shared by all clients of the Unix domain socket"""
+    if path not in _unix_socket_pools:
+        _unix_socket_pools[path] = HttpPool(unix_socket=path)
+    return _unix_socket_pools[path]
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Optional
+
+
+class JsonRpcBatcher:
+    """
+    Collects JSON-RPC requests issued within a short `window` into one batch POST. The window restarts
+    with every new request but a batch never waits longer than `max_wait` for its first request, and is
+    sent right away once it has `max_batch_size` requests. `send_batch` yields responses as they arrive
+    and each caller's future is resolved by the response id, so a slow call does not hold back the
+    others in the batch.
+    """
+
+    def __init__(
+            self,
+            send_batch: Callable[[list[dict[str, Any]]], AsyncIterator[dict[str, Any]]],
+            window: float = 0.002,
+            max_wait: float = 0.01,
+            max_batch_size: int = 16,
+    ):
+        self.send_batch = send_batch
+        self.window = window
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+
+        self._pending: list[tuple[dict[str, Any], asyncio.Future]] = []
+        self._first_at = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+        self.batches_sent = 0
+        self.requests_sent = 0
+
+    async def submit(self, request_body: dict[str, Any]) -> dict[str, Any]:
+        """Response to the request, sent with whatever else is submitted within the window"""
+        future = self._enqueue(request_body)
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        else:
+            self._schedule()
+        return await future
+
+    async def submit_many(self, request_bodies: list[dict[str, Any]]) -> list[dict[str, Any] | BaseException]:
+        """Explicit group: the requests are sent right away in as few batches as possible"""
+        futures = []
+        for request_body in request_bodies:
+            futures.append(self._enqueue(request_body))
+            if len(self._pending) >= self.max_batch_size:
+                self.flush()
+        self.flush()
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    def _enqueue(self, request_body: dict[str, Any]) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        if not self._pending:
+            self._first_at = time.monotonic()
+        self._pending.append((request_body, future))
+        return future
+
+    def _schedule(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+        delay = min(self.window, self._first_at + self.max_wait - time.monotonic())
+        self._timer = asyncio.get_running_loop().call_later(max(delay, 0), self.flush)
+
+    def flush(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list[tuple[dict[str, Any], asyncio.Future]]) -> None:
+        waiting = {request_body["id"]: future for request_body, future in batch}
+        self.batches_sent += 1
+        self.requests_sent += len(batch)
+        try:
+            async for message in self.send_batch([request_body for request_body, _ in batch]):
+                future = waiting.pop(message.get("id"), None)
+                if future and not future.done():
+                    future.set_result(message)
+            error: BaseException = RuntimeError("No response for the request in JSON-RPC batch")
+        except BaseException as e:
+            error = e
+
+        cancelled = isinstance(error, asyncio.CancelledError)
+        for future in waiting.values():
+            if future.done():
+                continue
+            if cancelled:
+                future.cancel()
+            else:
+                future.set_exception(error)
+        if cancelled:
+            raise error
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "batches": self.batches_sent,
+            "requests": self.requests_sent,
+            "avg_batch_size": round(self.requests_sent / self.batches_sent, 2) if self.batches_sent else None,
+        }
@@ -1,18 +1,30 @@
-from typing import Optional, Any
+import asyncio
+from typing import Optional, Any, Callable
 
 from mcp import ClientSession
 from mcp.client.streamable_http import streamablehttp_client
-from mcp.types import CallToolResult, TextContent
+from mcp.types import (
+    CallToolResult, TextContent, CallToolRequest, CallToolRequestParams, ClientRequest, ServerNotification,
+    ToolListChangedNotification
+)
+
+from agent.clients.schema_compactor import compact_tool_catalog
+from tracing.tracer import current_traceparent, TRACEPARENT_HEADER
 
 
 class MCPClient:
     """Handles MCP server connection and tool execution"""
 
-    def __init__(self, mcp_server_url: str) -> None:
+    def __init__(self, mcp_server_url: str, max_concurrent_calls: int = 4) -> None:
         self.server_url = mcp_server_url
         self.session: Optional[ClientSession] = None
-        self._streams_context = None
-        self._session_context = None
+        self._runner: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+        self.tool_annotations: dict[str, dict[str, Any]] = {}
+        self.server_info: dict[str, Any] = {}
+        self.on_tools_list_changed: Optional[Callable[[], None]] = None
+        # Bounds the tool calls in flight on this endpoint
+        self._call_limit = asyncio.Semaphore(max_concurrent_calls)
 
     @classmethod
     async def create(cls, mcp_server_url: str) -> 'MCPClient':
@@ -21,16 +33,64 @@ class MCPClient:
         await instance.connect()
         return instance
 
-    async def connect(self):
-        """Connect to MCP server"""
-        self._streams_context = streamablehttp_client(self.server_url)
-        read_stream, write_stream, _ = await self._streams_context.__aenter__()
+    async def __aenter__(self) -> 'MCPClient':
+        if not self.session:
+            await self.connect()
+        return self
 
-        self._session_context = ClientSession(read_stream, write_stream)
-        self.session: ClientSession = await self._session_context.__aenter__()
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
 
-        init_result = await self.session.initialize()
-        print(init_result.model_dump_json(indent=2))
+    async def connect(self):
+        """Connect to MCP server"""
+        # SDK contexts are anyio task groups, they must be entered and exited in the same task,
+        # so they are owned by a dedicated task that lives until `close()`
+        connected = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._runner = asyncio.create_task(self._run(connected))
+        try:
+            await connected
+        except BaseException:
+            self._runner.cancel()
+            self._runner = None
+            raise
+
+    async def _run(self, connected: asyncio.Future) -> None:
+        try:
+            async with streamablehttp_client(self.server_url) as (read_stream, write_stream, _):
+                async with ClientSession(read_stream, write_stream, message_handler=self._handle_message) as session:
+                    init_result = await session.initialize()
+                    self.session = session
+                    self.server_info = init_result.serverInfo.model_dump(exclude_none=True)
+                    print(init_result.model_dump_json(indent=2))
+                    connected.set_result(None)
+
+                    await self._stop.wait()
+        except Exception as e:
+            if not connected.done():
+                connected.set_exception(e)
+            else:
+                print(f"MCP connection to {self.server_url} closed with error: {e}")
+        finally:
+            self.session = None
+
+    async def close(self) -> None:
+        """Close the MCP session and the underlying HTTP connection"""
+        if self._runner:
+            self._stop.set()
+            await self._runner
+            self._runner = None
+
+    async def _handle_message(self, message: Any) -> None:
+        if isinstance(message, ServerNotification) and isinstance(message.root, ToolListChangedNotification):
+            if self.on_tools_list_changed:
+                self.on_tools_list_changed()
+
+    async def ping(self) -> None:
+        """Round trip to the MCP server, raises if it does not answer"""
+        if not self.session:
+            raise RuntimeError("MCP client not connected. Call connect() first.")
+        await self.session.send_ping()
 
     async def get_tools(self) -> list[dict[str, Any]]:
         """Get available tools from MCP server"""
@@ -38,7 +98,11 @@ class MCPClient:
             raise RuntimeError("MCP client not connected. Call connect() first.")
 
         tools = await self.session.list_tools()
-        return [
+        self.tool_annotations = {
+            tool.name: tool.annotations.model_dump(exclude_none=True) if tool.annotations else {}
+            for tool in tools.tools
+        }
+        return compact_tool_catalog([
             {
                 "type": "function",
                 "function": {
@@ -48,7 +112,7 @@ class MCPClient:
                 }
             }
             for tool in tools.tools
-        ]
+        ])
 
     async def call_tool(self, tool_name: str, tool_args: dict[str, Any]) -> Any:
         """Call a specific tool on the MCP server"""
@@ -57,7 +121,20 @@ class MCPClient:
 
         print(f"    Calling `{tool_name}` with {tool_args}")
 
-        tool_result: CallToolResult = await self.session.call_tool(tool_name, tool_args)
+        async with self._call_limit:
+            if traceparent := current_traceparent():
+                # Propagate trace context to the server in JSON-RPC `_meta`
+                request = CallToolRequest(
+                    method="tools/call",
+                    params=CallToolRequestParams(
+                        name=tool_name,
+                        arguments=tool_args,
+                        **{"_meta": {TRACEPARENT_HEADER: traceparent}}
+                    )
+                )
+                tool_result: CallToolResult = await self.session.send_request(ClientRequest(request), CallToolResult)
+            else:
+                tool_result: CallToolResult = await self.session.call_tool(tool_name, tool_args)
         content = tool_result.content
 
         print(f"    ⚙️: {content}\n")
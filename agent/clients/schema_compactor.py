@@ -0,0 +1,172 @@
+import copy
+import json
+from collections import Counter
+from typing import Any
+
+from agent.history_manager import estimate_tokens
+
+# Keys whose values map names to schemas, the names themselves are not schema keywords
+_SCHEMA_MAPS = ("properties", "patternProperties", "$defs", "definitions")
+# Keys whose values are a schema or a list of schemas
+_SCHEMA_VALUES = ("items", "additionalProperties", "not", "if", "then", "else", "contains")
+_SCHEMA_LISTS = ("anyOf", "oneOf", "allOf", "prefixItems")
+# Referenced more than once and bigger than this, a definition is kept once in root `$defs` instead of inlined
+DEDUPLICATE_MIN_CHARS = 300
+
+
+def _size(schema: Any) -> int:
+    return len(json.dumps(schema, separators=(",", ":")))
+
+
+def _ref_name(ref: str) -> str | None:
+    for prefix in ("#/$defs/", "#/definitions/"):
+        if ref.startswith(prefix):
+            return ref[len(prefix):]
+    return None
+
+
+def _collect_defs(schema: Any, defs: dict[str, Any]) -> None:
+    """Definitions from every `$defs` in the schema, pydantic nests them when a model is embedded"""
+    if isinstance(schema, dict):
+        for key in ("$defs", "definitions"):
+            for name, definition in (schema.get(key) or {}).items():
+                defs.setdefault(name, definition)
+        for value in schema.values():
+            _collect_defs(value, defs)
+    elif isinstance(schema, list):
+        for item in schema:
+            _collect_defs(item, defs)
+
+
+def _count_refs(schema: Any, counts: Counter) -> None:
+    if isinstance(schema, dict):
+        if isinstance(ref := schema.get("$ref"), str) and (name := _ref_name(ref)):
+            counts[name] += 1
+        for value in schema.values():
+            _count_refs(value, counts)
+    elif isinstance(schema, list):
+        for item in schema:
+            _count_refs(item, counts)
+
+
+class _Compactor:
+
+    def __init__(self, defs: dict[str, Any], ref_counts: Counter):
+        self.defs = defs
+        self.ref_counts = ref_counts
+        self.hoisted: dict[str, Any] = {}
+        self._resolving: set[str] = set()
+        # Definitions that reference themselves, directly or through others, can't be inlined
+        self._recursive: set[str] = set()
+
+    def _resolve_ref(self, name: str) -> dict[str, Any]:
+        if name not in self.defs or name in self.hoisted:
+            return {"$ref": f"#/$defs/{name}"}
+
+        if name in self._resolving:
+            self._recursive.add(name)
+            return {"$ref": f"#/$defs/{name}"}
+
+        self._resolving.add(name)
+        definition = self.compact(self.defs[name])
+        self._resolving.discard(name)
+
+        if name in self._recursive or (self.ref_counts[name] > 1 and _size(definition) >= DEDUPLICATE_MIN_CHARS):
+            self.hoisted[name] = definition
+            return {"$ref": f"#/$defs/{name}"}
+        return definition
+
+    @staticmethod
+    def _collapse_optional(schema: dict[str, Any]) -> dict[str, Any]:
+        """`anyOf: [X, {type: null}]` -> X, arguments can simply be omitted instead of passing null"""
+        variants = schema.get("anyOf")
+        if not isinstance(variants, list):
+            return schema
+        non_null = [variant for variant in variants if variant != {"type": "null"}]
+        if len(non_null) != 1 or len(non_null) == len(variants):
+            return schema
+
+        collapsed = {key: value for key, value in schema.items() if key != "anyOf"}
+        for key, value in non_null[0].items():
+            collapsed.setdefault(key, value)
+        return collapsed
+
+    def compact(self, schema: Any) -> Any:
+        if not isinstance(schema, dict):
+            return schema
+
+        if isinstance(ref := schema.get("$ref"), str) and (name := _ref_name(ref)):
+            resolved = self._resolve_ref(name)
+            siblings = {key: value for key, value in schema.items() if key != "$ref"}
+            return self.compact({**resolved, **siblings}) if siblings else resolved
+
+        result: dict[str, Any] = {}
+        for key, value in schema.items():
+            if key in ("$defs", "definitions"):
+                continue
+            if key == "title" and isinstance(value, str):
+                continue
+            if key == "default" and value is None:
+                continue
+            if key in _SCHEMA_MAPS and isinstance(value, dict):
+                result[key] = {name: self.compact(item) for name, item in value.items()}
+            elif key in _SCHEMA_VALUES and isinstance(value, dict):
+                result[key] = self.compact(value)
+            elif key in _SCHEMA_LISTS and isinstance(value, list):
+                result[key] = [self.compact(item) for item in value]
+            else:
+                result[key] = value
+        return self._collapse_optional(result)
+
+
+def _drop_nested_descriptions(schema: Any, depth: int = 0) -> Any:
+    """Keeps descriptions of top-level properties only"""
+    if isinstance(schema, dict):
+        return {
+            key: _drop_nested_descriptions(value, depth + 1)
+            for key, value in schema.items()
+            if not (key == "description" and isinstance(value, str) and depth > 2)
+        }
+    if isinstance(schema, list):
+        return [_drop_nested_descriptions(item, depth) for item in schema]
+    return schema
+
+
+def compact_schema(schema: dict[str, Any], max_chars: int | None = None) -> dict[str, Any]:
+    """
+    Inlines refs (definitions used several times are deduplicated into root `$defs`), strips titles,
+    null defaults and Optional unions. Over `max_chars`, nested descriptions are dropped as well.
+    """
+    defs: dict[str, Any] = {}
+    _collect_defs(schema, defs)
+    ref_counts: Counter = Counter()
+    _count_refs(schema, ref_counts)
+
+    compactor = _Compactor(defs, ref_counts)
+    compacted = compactor.compact(copy.deepcopy(schema))
+    if compactor.hoisted:
+        compacted["$defs"] = compactor.hoisted
+
+    if max_chars and _size(compacted) > max_chars:
+        compacted = _drop_nested_descriptions(compacted)
+        if _size(compacted) > max_chars:
+            print(f"Tool schema is still {_size(compacted)} chars after compaction (cap {max_chars})")
+    return compacted
+
+
+def compact_tool_catalog(tools: list[dict[str, Any]], max_schema_chars: int = 4000) -> list[dict[str, Any]]:
+    """Compacts parameters of DIAL tool schemas and reports the size before and after"""
+    before = estimate_tokens(json.dumps(tools, separators=(",", ":")))
+    compacted = [
+        {
+            **tool,
+            "function": {
+                **tool["function"],
+                "parameters": compact_schema(tool["function"].get("parameters") or {}, max_schema_chars),
+            },
+        }
+        for tool in tools
+    ]
+    after = estimate_tokens(json.dumps(compacted, separators=(",", ":")))
+    print(f"Tool schemas compacted: ~{before} -> ~{after} tokens ({len(tools)} tools)")
+    return compacted
@@ -0,0 +1,128 @@
+from typing import AsyncIterator, Optional
+
+import aiohttp
+
+_LF = 0x0A
+_CR = 0x0D
+
+
+class SSEEvent:
+    """One dispatched Server-Sent Event"""
+
+    __slots__ = ("data", "event", "id", "retry")
+
+    def __init__(self, data: str, event: str = "message", id: Optional[str] = None, retry: Optional[int] = None):
+        self.data = data
+        self.event = event
+        self.id = id
+        self.retry = retry
+
+    def __repr__(self) -> str:
+        return f"SSEEvent(event={self.event!r}, id={self.id!r}, data={self.data!r})"
+
+
+class SSEDecoder:
+    """
+    Incremental SSE decoder (https://html.spec.whatwg.org/multipage/server-sent-events.html) working on
+    raw byte chunks: lines are split in a single bytearray buffer without decoding, only field values
+    are decoded, and only when an event is dispatched. Handles CR, LF and CRLF line endings, also when
+    split across chunks, and multi-line `data:` fields.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data: list[bytes] = []
+        self._event: Optional[bytes] = None
+        self.last_event_id: Optional[str] = None
+        self.retry: Optional[int] = None
+
+    def feed(self, chunk: bytes) -> list[SSEEvent]:
+        """Events completed by `chunk`"""
+        buffer = self._buffer
+        buffer += chunk
+        events = []
+        start = 0
+        while True:
+            lf = buffer.find(b"\n", start)
+            cr = buffer.find(b"\r", start, lf if lf != -1 else len(buffer))
+            if cr != -1:
+                if cr + 1 == len(buffer):
+                    # CR may be the first half of a CRLF that arrives with the next chunk
+                    break
+                end, next_start = cr, cr + 2 if buffer[cr + 1] == _LF else cr + 1
+            elif lf != -1:
+                end, next_start = lf, lf + 1
+            else:
+                break
+
+            if event := self._process_line(buffer[start:end]):
+                events.append(event)
+            start = next_start
+
+        if start:
+            del buffer[:start]
+        return events
+
+    def finish(self) -> list[SSEEvent]:
+        """
+        Flush at the end of the stream. Unlike browsers, an event without the terminating blank line
+        is still dispatched, some servers close the stream right after the last `data:` line.
+        """
+        events = []
+        if self._buffer and self._buffer[-1] == _CR:
+            self._buffer.pop()
+        if self._buffer:
+            if event := self._process_line(bytes(self._buffer)):
+                events.append(event)
+            self._buffer.clear()
+        if event := self._process_line(b""):
+            events.append(event)
+        return events
+
+    def _process_line(self, line: bytes | bytearray) -> Optional[SSEEvent]:
+        if not line:
+            return self._dispatch()
+        if line[0] == 0x3A:  # ":" comment, used for keep-alive pings
+            return None
+
+        colon = line.find(b":")
+        if colon == -1:
+            field, value = bytes(line), b""
+        else:
+            field = bytes(line[:colon])
+            value_start = colon + 2 if colon + 1 < len(line) and line[colon + 1] == 0x20 else colon + 1
+            value = bytes(line[value_start:])
+
+        if field == b"data":
+            self._data.append(value)
+        elif field == b"event":
+            self._event = value
+        elif field == b"id":
+            if b"\0" not in value:
+                self.last_event_id = value.decode("utf-8")
+        elif field == b"retry":
+            if value.isdigit():
+                self.retry = int(value)
+        return None
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        data, event_type = self._data, self._event
+        self._data, self._event = [], None
+        if not data:
+            return None
+        return SSEEvent(
+            data=(data[0] if len(data) == 1 else b"\n".join(data)).decode("utf-8"),
+            event=event_type.decode("utf-8") if event_type else "message",
+            id=self.last_event_id,
+            retry=self.retry,
+        )
+
+
+async def iter_sse_events(content: aiohttp.StreamReader) -> AsyncIterator[SSEEvent]:
+    """Events of a streamed response as they arrive"""
+    decoder = SSEDecoder()
+    async for chunk in content.iter_any():
+        for event in decoder.feed(chunk):
+            yield event
+    for event in decoder.finish():
+        yield event
@@ -0,0 +1,97 @@
+import asyncio
+import json
+from typing import Any, Callable, Optional
+
+# Same limit as the server side, tool results can be large
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+
+class StdioTransport:
+    """
+    JSON-RPC over the stdin/stdout of an MCP server subprocess (e.g. `python -m mcp_server.stdio`),
+    one message per line. Responses are matched to requests by id, so calls can be in flight concurrently.
+    The server's stderr is inherited, its logs show up in the agent's output.
+    """
+
+    def __init__(
+            self,
+            command: list[str],
+            on_notification: Optional[Callable[[dict[str, Any]], None]] = None,
+            close_timeout: float = 5.0
+    ):
+        self.command = command
+        self.on_notification = on_notification
+        self.close_timeout = close_timeout
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._waiting: dict[Any, asyncio.Future] = {}
+
+    async def start(self) -> None:
+        self._process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=MAX_LINE_BYTES
+        )
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        error = RuntimeError(f"MCP server process `{' '.join(self.command)}` closed its output")
+        try:
+            while line := await self._process.stdout.readline():
+                try:
+                    payload = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Skipping malformed stdio message: {line[:200]!r}")
+                    continue
+                for message in payload if isinstance(payload, list) else [payload]:
+                    self._dispatch(message)
+        except Exception as e:
+            error = RuntimeError(f"Reading from MCP server process failed: {e}")
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._waiting.clear()
+
+    def _dispatch(self, message: dict[str, Any]) -> None:
+        if "method" in message and "id" not in message:
+            if self.on_notification:
+                self.on_notification(message)
+            return
+        if (future := self._waiting.pop(message.get("id"), None)) and not future.done():
+            future.set_result(message)
+
+    async def send(self, message: dict[str, Any] | list[dict[str, Any]]) -> None:
+        if not self._process or self._process.stdin.is_closing():
+            raise RuntimeError("MCP server process is not running")
+        self._process.stdin.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+        await self._process.stdin.drain()
+
+    async def request(self, request_body: dict[str, Any]) -> dict[str, Any]:
+        """Response to the request"""
+        if self._reader is None or self._reader.done():
+            raise RuntimeError("MCP server process is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_body["id"]] = future
+        try:
+            await self.send(request_body)
+            return await future
+        finally:
+            self._waiting.pop(request_body["id"], None)
+
+    async def close(self) -> None:
+        """EOF on stdin lets the server finish calls in flight, it is killed after `close_timeout`"""
+        if not self._process:
+            return
+        process, self._process = self._process, None
+        if not process.stdin.is_closing():
+            process.stdin.close()
+        try:
+            await asyncio.wait_for(process.wait(), self.close_timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+        if self._reader:
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
@@ -0,0 +1,63 @@
+import json
+from typing import Any, Callable, Optional
+
+
+class ToolCallAssembler:
+    """
+    Builds complete tool calls from streaming tool call deltas and reports every call
+    as soon as it is complete, while the rest of the stream is still being generated.
+
+    A call is complete when its arguments parse as a JSON object, when a delta for the
+    next index starts, or when the stream is finished.
+    """
+
+    def __init__(self, on_complete: Optional[Callable[[dict[str, Any]], None]] = None):
+        self.on_complete = on_complete
+        self._calls: dict[int, dict[str, Any]] = {}
+        self._completed: set[int] = set()
+
+    def add(self, delta) -> None:
+        idx = delta.index
+        if idx not in self._calls:
+            # Models emit tool calls one after another, a new index closes the previous ones
+            for prev_idx in self._calls:
+                self._complete(prev_idx)
+            self._calls[idx] = {"id": None, "function": {"arguments": "", "name": None}, "type": None}
+
+        tool_call = self._calls[idx]
+        if delta.id: tool_call["id"] = delta.id
+        if delta.type: tool_call["type"] = delta.type
+        if delta.function:
+            if delta.function.name: tool_call["function"]["name"] = delta.function.name
+            if delta.function.arguments: tool_call["function"]["arguments"] += delta.function.arguments
+
+        if idx not in self._completed and self._arguments_complete(tool_call):
+            self._complete(idx)
+
+    @staticmethod
+    def _arguments_complete(tool_call: dict[str, Any]) -> bool:
+        arguments = tool_call["function"]["arguments"].rstrip()
+        # Cheap check first, parsing on every delta would be quadratic for long arguments
+        if not arguments.endswith("}"):
+            return False
+        try:
+            return isinstance(json.loads(arguments), dict)
+        except json.JSONDecodeError:
+            return False
+
+    def _complete(self, idx: int) -> None:
+        if idx in self._completed:
+            return
+
+        tool_call = self._calls[idx]
+        if not (tool_call["id"] and tool_call["function"]["name"]):
+            return
+        self._completed.add(idx)
+        if self.on_complete:
+            self.on_complete(tool_call)
+
+    def finish(self) -> list[dict[str, Any]]:
+        """Complete the remaining calls and return all calls in index order"""
+        for idx in self._calls:
+            self._complete(idx)
+        return [self._calls[idx] for idx in sorted(self._calls)]
@@ -0,0 +1,84 @@
+import json
+
+from agent.models.message import Message, Role
+
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local estimate, ~4 characters per token for English text and JSON"""
+    return (len(text) + 3) // 4
+
+
+class HistoryManager:
+    """
+    Keeps the history sent to the LLM within a token budget.
+
+    System messages and the latest `keep_recent_turns` turns (a turn starts with a user message)
+    are always sent as is. When the history is over budget, tool outputs of older turns are
+    replaced with short stubs, then the oldest turns are dropped as a whole, so every assistant
+    tool call still has its tool message.
+    """
+
+    def __init__(self, token_budget: int = 16_000, keep_recent_turns: int = 2, tool_stub_chars: int = 200):
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.tool_stub_chars = tool_stub_chars
+
+    @staticmethod
+    def estimate_message_tokens(message: Message) -> int:
+        tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.content or "")
+        if message.tool_calls:
+            tokens += estimate_tokens(json.dumps(message.tool_calls))
+        return tokens
+
+    def estimate_history_tokens(self, messages: list[Message]) -> int:
+        return sum(self.estimate_message_tokens(message) for message in messages)
+
+    def _stub(self, message: Message) -> Message:
+        content = message.content or ""
+        if len(content) <= self.tool_stub_chars:
+            return message
+        elided = len(content) - self.tool_stub_chars
+        return message.model_copy(
+            update={"content": f"{content[:self.tool_stub_chars]}... [{elided} chars of stale tool output elided]"}
+        )
+
+    def _split_turns(self, messages: list[Message]) -> tuple[list[Message], list[list[Message]]]:
+        """System messages and the rest grouped into turns"""
+        system, turns = [], []
+        for message in messages:
+            if message.role == Role.SYSTEM:
+                system.append(message)
+            elif message.role == Role.USER or not turns:
+                turns.append([message])
+            else:
+                turns[-1].append(message)
+        return system, turns
+
+    def compact(self, messages: list[Message]) -> list[Message]:
+        """History to send, the stored conversation is not modified"""
+        total = self.estimate_history_tokens(messages)
+        if total <= self.token_budget:
+            return messages
+
+        system, turns = self._split_turns(messages)
+        recent = turns[-self.keep_recent_turns:] if self.keep_recent_turns else []
+        stale = [
+            [self._stub(message) if message.role == Role.TOOL else message for message in turn]
+            for turn in turns[:len(turns) - len(recent)]
+        ]
+
+        fixed_tokens = self.estimate_history_tokens(system) + sum(self.estimate_history_tokens(t) for t in recent)
+        stale_tokens = [self.estimate_history_tokens(turn) for turn in stale]
+        while stale and fixed_tokens + sum(stale_tokens) > self.token_budget:
+            stale.pop(0)
+            stale_tokens.pop(0)
+
+        compacted = system + [message for turn in stale + recent for message in turn]
+        print(
+            f"History compacted: ~{total} -> ~{self.estimate_history_tokens(compacted)} tokens "
+            f"({len(messages)} -> {len(compacted)} messages)"
+        )
+        return compacted
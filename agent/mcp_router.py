@@ -0,0 +1,198 @@
+import asyncio
+import random
+import time
+from typing import Any, Callable, Optional
+
+from agent.clients.custom_mcp_client import CustomMCPClient
+from agent.clients.mcp_client import MCPClient
+
+NAMESPACE_SEPARATOR = "__"
+
+
+class Endpoint:
+    """One replica of an MCP server with its load and health"""
+
+    def __init__(self, client: MCPClient | CustomMCPClient):
+        self.client = client
+        self.outstanding = 0
+        self.latency_ewma: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.calls = 0
+        self.failures = 0
+
+    @property
+    def url(self) -> str:
+        return self.client.server_url
+
+    def available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+
+class MCPRouter:
+    """
+    Routes the calls of one logical MCP server over its replicas. Exposes the client interface used by
+    DialClient (`call_tool`, `get_tools`, `tool_annotations`), with tool names prefixed by `name`.
+
+    Calls go to the replica with the least outstanding requests, ties are broken by the lowest latency
+    EWMA (replicas without samples first), then at random. A replica that fails `max_consecutive_failures`
+    calls in a row is ejected for `base_ejection_time`, doubled on every further ejection up to
+    `max_ejection_time`. While ejected it is pinged every `probe_interval`, the first answered ping brings
+    it back before the ejection ends. When all replicas are ejected, calls still go to one of them rather
+    than fail outright. Failed read-only calls are retried on the other replicas.
+    """
+
+    def __init__(
+            self,
+            clients: list[MCPClient | CustomMCPClient],
+            name: Optional[str] = None,
+            max_consecutive_failures: int = 3,
+            base_ejection_time: float = 10.0,
+            max_ejection_time: float = 300.0,
+            latency_alpha: float = 0.2,
+            probe_interval: float = 2.0,
+            probe_timeout: float = 2.0,
+    ):
+        if not clients:
+            raise ValueError("MCPRouter needs at least one client")
+        self.name = name
+        self.endpoints = [Endpoint(client) for client in clients]
+        self.max_consecutive_failures = max_consecutive_failures
+        self.base_ejection_time = base_ejection_time
+        self.max_ejection_time = max_ejection_time
+        self.latency_alpha = latency_alpha
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self._probes: dict[Endpoint, asyncio.Task] = {}
+
+        self.tool_annotations: dict[str, dict[str, Any]] = {}
+        self.on_tools_list_changed: Optional[Callable[[], None]] = None
+        for endpoint in self.endpoints:
+            endpoint.client.on_tools_list_changed = self._on_endpoint_tools_list_changed
+
+    @property
+    def server_url(self) -> str:
+        return self.endpoints[0].url
+
+    @property
+    def server_info(self) -> dict[str, Any]:
+        return self.endpoints[0].client.server_info
+
+    def qualify(self, tool_name: str) -> str:
+        return f"{self.name}{NAMESPACE_SEPARATOR}{tool_name}" if self.name else tool_name
+
+    def unqualify(self, tool_name: str) -> str:
+        prefix = f"{self.name}{NAMESPACE_SEPARATOR}" if self.name else ""
+        return tool_name[len(prefix):] if prefix and tool_name.startswith(prefix) else tool_name
+
+    def _on_endpoint_tools_list_changed(self) -> None:
+        if self.on_tools_list_changed:
+            self.on_tools_list_changed()
+
+    def _pick(self, exclude: set[Endpoint]) -> Endpoint:
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e not in exclude and e.available(now)]
+        if not candidates:
+            # Every replica is ejected, trying one beats failing the call
+            candidates = [e for e in self.endpoints if e not in exclude]
+        least = min(e.outstanding for e in candidates)
+        candidates = [e for e in candidates if e.outstanding == least]
+        fastest = min(e.latency_ewma or 0.0 for e in candidates)
+        return random.choice([e for e in candidates if (e.latency_ewma or 0.0) == fastest])
+
+    def _record_success(self, endpoint: Endpoint, duration: float) -> None:
+        endpoint.calls += 1
+        endpoint.consecutive_failures = 0
+        endpoint.ejections = 0
+        if endpoint.latency_ewma is None:
+            endpoint.latency_ewma = duration
+        else:
+            endpoint.latency_ewma += self.latency_alpha * (duration - endpoint.latency_ewma)
+
+    def _record_failure(self, endpoint: Endpoint) -> None:
+        endpoint.calls += 1
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures >= self.max_consecutive_failures:
+            ejection_time = min(self.base_ejection_time * 2 ** endpoint.ejections, self.max_ejection_time)
+            endpoint.ejected_until = time.monotonic() + ejection_time
+            endpoint.ejections += 1
+            endpoint.consecutive_failures = 0
+            print(f"MCP endpoint {endpoint.url} ejected for {ejection_time:.0f}s after repeated failures")
+            if endpoint not in self._probes:
+                self._probes[endpoint] = asyncio.create_task(self._probe(endpoint))
+
+    async def _probe(self, endpoint: Endpoint) -> None:
+        """Ping an ejected replica until it answers or its ejection ends"""
+        try:
+            while not endpoint.available(time.monotonic()):
+                await asyncio.sleep(self.probe_interval)
+                try:
+                    async with asyncio.timeout(self.probe_timeout):
+                        await endpoint.client.ping()
+                except Exception:
+                    continue
+                endpoint.ejected_until = 0.0
+                print(f"MCP endpoint {endpoint.url} answered a health probe, back in rotation")
+        finally:
+            self._probes.pop(endpoint, None)
+
+    async def _route(self, call: Callable[[MCPClient | CustomMCPClient], Any], retryable: bool) -> Any:
+        tried: set[Endpoint] = set()
+        while True:
+            endpoint = self._pick(tried)
+            tried.add(endpoint)
+            endpoint.outstanding += 1
+            started = time.perf_counter()
+            try:
+                result = await call(endpoint.client)
+            except Exception as e:
+                self._record_failure(endpoint)
+                if not retryable or len(tried) == len(self.endpoints):
+                    raise
+                print(f"Call to {endpoint.url} failed ({e}), retrying on another replica")
+                continue
+            finally:
+                endpoint.outstanding -= 1
+            self._record_success(endpoint, time.perf_counter() - started)
+            return result
+
+    async def get_tools(self) -> list[dict[str, Any]]:
+        """Catalog of a healthy replica, tool names qualified with the router name"""
+        async def fetch(client: MCPClient | CustomMCPClient):
+            return await client.get_tools(), client.tool_annotations
+
+        tools, annotations = await self._route(fetch, retryable=True)
+        self.tool_annotations = {self.qualify(name): value for name, value in annotations.items()}
+        return [
+            {**tool, "function": {**tool["function"], "name": self.qualify(tool["function"]["name"])}}
+            for tool in tools
+        ]
+
+    async def call_tool(self, tool_name: str, tool_args: dict[str, Any]) -> Any:
+        read_only = self.tool_annotations.get(tool_name, {}).get("readOnlyHint") is True
+        return await self._route(
+            lambda client: client.call_tool(self.unqualify(tool_name), tool_args),
+            retryable=read_only
+        )
+
+    async def close(self) -> None:
+        for probe in list(self._probes.values()):
+            probe.cancel()
+        await asyncio.gather(*(endpoint.client.close() for endpoint in self.endpoints), return_exceptions=True)
+
+    def stats(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "url": endpoint.url,
+                "healthy": endpoint.available(now),
+                "outstanding": endpoint.outstanding,
+                "latency_ewma": round(endpoint.latency_ewma, 4) if endpoint.latency_ewma is not None else None,
+                "calls": endpoint.calls,
+                "failures": endpoint.failures,
+                "ejections": endpoint.ejections,
+            }
+            for endpoint in self.endpoints
+        ]
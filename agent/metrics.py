@@ -0,0 +1,81 @@
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Optional
+
+METRICS_EXPORT_PATH = os.getenv("AGENT_METRICS_EXPORT")
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+class Series:
+    """Latest values of one metric, for percentiles"""
+
+    def __init__(self, window_size: int):
+        self.count = 0
+        self.total = 0.0
+        self._samples: deque[float] = deque(maxlen=window_size)
+
+    def record(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self._samples.append(value)
+
+    def percentile(self, p: float) -> float:
+        ordered = sorted(self._samples)
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4),
+            **{f"p{round(p * 100)}": round(self.percentile(p), 4) for p in PERCENTILES},
+        }
+
+
+class AgentMetrics:
+    """
+    In-process agent metrics. `observe()` takes an event with numeric fields (durations, rates, counts),
+    each field is aggregated into a series `{event}.{field}`, or `{event}[{key}].{field}` when a key
+    such as the tool name is given, and percentiles over the latest `window_size` values are kept.
+
+    With `export_path` every event is also appended as a JSON line together with `labels`, to compare
+    runs with different models, MCP transports or caching settings offline.
+    """
+
+    def __init__(
+            self,
+            export_path: Optional[str] = METRICS_EXPORT_PATH,
+            labels: Optional[dict[str, Any]] = None,
+            window_size: int = 10_000
+    ):
+        self.labels = labels or {}
+        self.window_size = window_size
+        self._series: dict[str, Series] = {}
+        self._export = open(export_path, "a", encoding="utf-8", buffering=1) if export_path else None
+
+    def observe(self, event: str, key: Optional[str] = None, **fields: Any) -> None:
+        prefix = f"{event}[{key}]" if key else event
+        for name, value in fields.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                series_name = f"{prefix}.{name}"
+                if not (series := self._series.get(series_name)):
+                    series = self._series[series_name] = Series(self.window_size)
+                series.record(value)
+
+        if self._export:
+            line = {"ts": time.time(), "event": event, **({"key": key} if key else {}), **self.labels, **fields}
+            self._export.write(json.dumps(line, separators=(",", ":"), default=str) + "\n")
+
+    def total(self, series_name: str) -> float:
+        """Sum of all values of a series, e.g. `llm_step.completion_tokens`"""
+        series = self._series.get(series_name)
+        return series.total if series else 0.0
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {name: series.summary() for name, series in sorted(self._series.items())}
+
+    def close(self) -> None:
+        if self._export:
+            self._export.close()
+            self._export = None
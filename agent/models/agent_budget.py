@@ -0,0 +1,11 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class AgentBudget(BaseModel):
+    """Limits of one agent turn, when one is reached the model answers without further tool calls"""
+    max_steps: int = 10
+    max_seconds: Optional[float] = 120.0
+    # Prompt plus completion tokens of all LLM calls of the turn (local estimate)
+    max_tokens: Optional[int] = None
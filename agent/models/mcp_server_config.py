@@ -0,0 +1,26 @@
+from enum import StrEnum
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class MCPClientType(StrEnum):
+    SDK = "sdk"
+    CUSTOM = "custom"
+
+
+class MCPServerConfig(BaseModel):
+    url: str
+    # Servers with the same name are replicas of one server, tools are exposed as `{name}__{tool}`
+    name: Optional[str] = None
+    client: MCPClientType = MCPClientType.SDK
+    connect_timeout: float = 10.0
+    # Tool calls in flight per endpoint, further calls wait in its client. Each replica has its own limit
+    max_concurrent_calls: int = 4
+    # JSON-RPC batching of concurrent tool calls, CUSTOM client only. Batches are in MCP 2025-03-26 only (removed
+    # in 2025-06-18), so the server must accept them regardless of the negotiated version, as `mcp_server` does
+    batching: bool = False
+    # Co-located server, CUSTOM client only: HTTP over this Unix domain socket (URL host is ignored),
+    # or stdio of a subprocess started with `command`, e.g. ["python", "-m", "mcp_server.stdio"]
+    unix_socket: Optional[str] = None
+    command: Optional[list[str]] = None
@@ -0,0 +1,20 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class StepRecord(BaseModel):
+    """Timing of one step of an agent turn: an LLM call and the tool calls it requested"""
+    step: int
+    llm_seconds: float = 0.0
+    # From sending the request to the first content or tool call delta
+    ttft_seconds: Optional[float] = None
+    # Completion tokens over the time from the first to the last delta
+    tokens_per_second: Optional[float] = None
+    # From the first tool call delta to the end of the stream
+    tool_assembly_seconds: Optional[float] = None
+    tool_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tool_calls: list[str] = []
+    stop_reason: Optional[str] = None
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Optional
+
+TOOL_CATALOG_CACHE_PATH = os.getenv("AGENT_TOOL_CATALOG_CACHE", ".tool_catalog_cache.json")
+
+
+def catalog_hash(tools: list[dict[str, Any]]) -> str:
+    return hashlib.sha256(json.dumps(tools, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+class ToolCatalogCache:
+    """
+    On-disk cache of converted (DIAL format) tool catalogs, keyed by the URLs of the MCP server's replicas.
+    An entry is only used while the server reports the same `serverInfo` name and version.
+    """
+
+    def __init__(self, path: str = TOOL_CATALOG_CACHE_PATH):
+        self.path = path
+        self._entries: dict[str, dict[str, Any]] = self._load()
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable tool catalog cache {self.path}: {e}")
+            return {}
+
+    def _save(self) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str, server_info: dict[str, Any]) -> Optional[dict[str, Any]]:
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+        if entry["server_name"] != server_info.get("name") or entry["server_version"] != server_info.get("version"):
+            return None
+        if entry["hash"] != catalog_hash(entry["tools"]):
+            return None
+        return entry
+
+    def put(
+            self,
+            key: str,
+            server_info: dict[str, Any],
+            tools: list[dict[str, Any]],
+            tool_annotations: dict[str, dict[str, Any]]
+    ) -> bool:
+        """Store the catalog, returns True if it differs from the cached one"""
+        tools_hash = catalog_hash(tools)
+        previous = self._entries.get(key)
+        changed = not previous or previous["hash"] != tools_hash
+        self._entries[key] = {
+            "server_name": server_info.get("name"),
+            "server_version": server_info.get("version"),
+            "hash": tools_hash,
+            "tools": tools,
+            "annotations": tool_annotations,
+            "updated_at": time.time(),
+        }
+        self._save()
+        return changed
+
+    def invalidate(self, key: str) -> None:
+        if self._entries.pop(key, None):
+            self._save()
@@ -0,0 +1,203 @@
+import asyncio
+import time
+from typing import Any, Optional
+
+from agent.clients.custom_mcp_client import CustomMCPClient
+from agent.clients.mcp_client import MCPClient
+from agent.mcp_router import MCPRouter
+from agent.models.mcp_server_config import MCPServerConfig, MCPClientType
+from agent.tool_catalog_cache import ToolCatalogCache
+
+
+class ToolRegistry:
+    """
+    DIAL tool schemas of all connected MCP servers and the client that serves each tool.
+    `tools` and `tool_name_client_map` are updated in place, so holders of these references
+    (e.g. DialClient) see catalog refreshes.
+    """
+
+    def __init__(self, catalog_cache: Optional[ToolCatalogCache] = None):
+        self.tools: list[dict[str, Any]] = []
+        self.tool_name_client_map: dict[str, MCPRouter] = {}
+        self.clients: dict[str, MCPRouter] = {}
+        self.failures: dict[str, str] = {}
+        self.catalog_cache = catalog_cache
+        self._server_tools: dict[str, list[dict[str, Any]]] = {}
+        # server id -> catalog cache key, the URLs of its replicas
+        self._catalog_keys: dict[str, str] = {}
+        self._background_tasks: set[asyncio.Task] = set()
+
+    def register(
+            self,
+            server_id: str,
+            client: MCPRouter,
+            tools: list[dict[str, Any]],
+            catalog_key: Optional[str] = None
+    ) -> None:
+        self.clients[server_id] = client
+        self._server_tools[server_id] = tools
+        self._catalog_keys[server_id] = catalog_key or server_id
+        client.on_tools_list_changed = lambda: self._on_tools_list_changed(server_id)
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        tools = []
+        tool_name_client_map = {}
+        # Servers are kept in registration order, so on name collisions the earlier server wins deterministically
+        for server_id, server_tools in self._server_tools.items():
+            for tool in server_tools:
+                tool_name = tool.get("function", {}).get("name")
+                if tool_name in tool_name_client_map:
+                    print(f"Tool `{tool_name}` from {server_id} is skipped, it is already provided by another server")
+                    continue
+                tools.append(tool)
+                tool_name_client_map[tool_name] = self.clients[server_id]
+
+        self.tools[:] = tools
+        self.tool_name_client_map.clear()
+        self.tool_name_client_map.update(tool_name_client_map)
+
+    async def refresh(self, server_id: str) -> None:
+        """Re-fetch the catalog of the server, update the registry and the on-disk cache if it changed"""
+        client = self.clients[server_id]
+        try:
+            tools = await client.get_tools()
+        except Exception as e:
+            print(f"Unable to revalidate tool catalog of {server_id}: {e}")
+            return
+
+        if self.catalog_cache:
+            self.catalog_cache.put(self._catalog_keys[server_id], client.server_info, tools, client.tool_annotations)
+        if tools != self._server_tools.get(server_id):
+            print(f"Tool catalog of {server_id} changed, {len(tools)} tool(s)")
+            self._server_tools[server_id] = tools
+            self._rebuild()
+
+    def refresh_in_background(self, server_id: str) -> None:
+        task = asyncio.create_task(self.refresh(server_id))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _on_tools_list_changed(self, server_id: str) -> None:
+        print(f"Tool list of {server_id} changed on the server")
+        if self.catalog_cache:
+            self.catalog_cache.invalidate(self._catalog_keys[server_id])
+        self.refresh_in_background(server_id)
+
+    async def close(self) -> None:
+        """Close all clients, pending catalog revalidations are cancelled"""
+        for task in self._background_tasks:
+            task.cancel()
+        results = await asyncio.gather(*(client.close() for client in self.clients.values()), return_exceptions=True)
+        for server_id, result in zip(self.clients, results):
+            if isinstance(result, Exception):
+                print(f"Error while closing client of {server_id}: {result}")
+        self.clients.clear()
+
+
+async def _connect_endpoint(config: MCPServerConfig) -> MCPClient | CustomMCPClient:
+    if config.client == MCPClientType.CUSTOM:
+        client = CustomMCPClient(
+            mcp_server_url=config.url,
+            batching=config.batching,
+            unix_socket=config.unix_socket,
+            command=config.command,
+            max_concurrent_calls=config.max_concurrent_calls
+        )
+    else:
+        client = MCPClient(mcp_server_url=config.url, max_concurrent_calls=config.max_concurrent_calls)
+    try:
+        async with asyncio.timeout(config.connect_timeout):
+            await client.connect()
+    except BaseException:
+        await client.close()
+        raise
+    return client
+
+
+def _catalog_key(configs: list[MCPServerConfig]) -> str:
+    """Catalog cache key of a server: its replica URLs, servers that share a display name don't share entries"""
+    return " ".join(sorted({config.url for config in configs}))
+
+
+async def _connect_server(
+        server_id: str,
+        configs: list[MCPServerConfig],
+        catalog_cache: Optional[ToolCatalogCache],
+        failures: dict[str, str]
+) -> tuple[MCPRouter, list[dict[str, Any]], bool]:
+    """
+    Connect all replicas of one server, the catalog is fetched from one of them. The cached catalog
+    is checked against the `serverInfo` of the handshake, so a cache hit saves `tools/list` only.
+    """
+    results = await asyncio.gather(*(_connect_endpoint(config) for config in configs), return_exceptions=True)
+    clients = []
+    for config, result in zip(configs, results):
+        if isinstance(result, BaseException):
+            reason = "timed out" if isinstance(result, TimeoutError) else str(result)
+            failures[config.url] = reason
+            print(f"Unable to connect to MCP server {config.url}: {reason}")
+        else:
+            clients.append(result)
+    if not clients:
+        raise RuntimeError(f"No replica of {server_id} is reachable")
+
+    router = MCPRouter(clients, name=configs[0].name)
+    try:
+        if catalog_cache and (entry := catalog_cache.get(_catalog_key(configs), router.server_info)):
+            router.tool_annotations = entry["annotations"]
+            return router, entry["tools"], True
+
+        async with asyncio.timeout(max(config.connect_timeout for config in configs)):
+            tools = await router.get_tools()
+        if catalog_cache:
+            catalog_cache.put(_catalog_key(configs), router.server_info, tools, router.tool_annotations)
+    except BaseException:
+        await router.close()
+        raise
+    return router, tools, False
+
+
+async def connect_servers(
+        configs: list[MCPServerConfig],
+        catalog_cache: Optional[ToolCatalogCache] = None
+) -> ToolRegistry:
+    """
+    Connect to all MCP servers concurrently, each within its own timeout, and build the tool registry
+    in one pass. Configs with the same `name` are replicas of one server, served through one MCPRouter
+    and its tools are namespaced with the name. Servers that fail to connect are reported and skipped.
+    With `catalog_cache`, a server whose `serverInfo` matches its cached catalog skips `tools/list` at startup,
+    the catalog is revalidated in the background.
+    """
+    started = time.perf_counter()
+    servers: dict[str, list[MCPServerConfig]] = {}
+    for config in configs:
+        servers.setdefault(config.name or config.url, []).append(config)
+
+    registry = ToolRegistry(catalog_cache)
+    results = await asyncio.gather(
+        *(
+            _connect_server(server_id, replicas, catalog_cache, registry.failures)
+            for server_id, replicas in servers.items()
+        ),
+        return_exceptions=True
+    )
+
+    for server_id, result in zip(servers, results):
+        if isinstance(result, BaseException):
+            if server_id not in registry.failures:
+                registry.failures[server_id] = str(result)
+                print(f"Unable to connect to MCP server {server_id}: {result}")
+            continue
+
+        router, tools, from_cache = result
+        registry.register(server_id, router, tools, _catalog_key(servers[server_id]))
+        if from_cache:
+            registry.refresh_in_background(server_id)
+
+    endpoints = sum(len(router.endpoints) for router in registry.clients.values())
+    print(
+        f"Connected to {len(registry.clients)}/{len(servers)} MCP server(s) ({endpoints}/{len(configs)} endpoints), "
+        f"{len(registry.tools)} tool(s) in {time.perf_counter() - started:.2f}s"
+    )
+    return registry
@@ -0,0 +1,96 @@
+import json
+from collections import OrderedDict
+from typing import Any, Optional
+
+from agent.clients.custom_mcp_client import CustomMCPClient
+from agent.clients.mcp_client import MCPClient
+
+ERROR_PREFIXES = ("Error", "Tool execution error")
+
+
+def _canonicalize(value: Any) -> Any:
+    """Arguments that differ only in key order or explicit nulls are the same call"""
+    if isinstance(value, dict):
+        return {key: _canonicalize(item) for key, item in value.items() if item is not None}
+    if isinstance(value, list):
+        return [_canonicalize(item) for item in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _result_text(result: Any) -> Optional[str]:
+    """Text of a tool result: a string (custom client) or a list of MCP content items (SDK client)"""
+    if isinstance(result, str):
+        return result
+    if isinstance(result, list):
+        texts = [item.get("text") if isinstance(item, dict) else getattr(item, "text", None) for item in result]
+        return "".join(text for text in texts if isinstance(text, str))
+    return None
+
+
+class ToolResultCache:
+    """
+    Conversation-scoped memoization of read-only tool calls.
+
+    A tool is read-only when its MCP annotations declare `readOnlyHint` or it is in `read_only_tools`.
+    Any other tool is treated as a write and drops every cached result of the same server.
+    A write also bumps the server's generation: a read that started before it must not `put` its result.
+    """
+
+    def __init__(self, read_only_tools: Optional[set[str]] = None, max_entries: int = 128):
+        self.read_only_tools = read_only_tools or set()
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[MCPClient | CustomMCPClient, str, str], Any] = OrderedDict()
+        self._generations: dict[MCPClient | CustomMCPClient, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def is_read_only(self, client: MCPClient | CustomMCPClient, tool_name: str) -> bool:
+        if tool_name in self.read_only_tools:
+            return True
+        return client.tool_annotations.get(tool_name, {}).get("readOnlyHint") is True
+
+    @staticmethod
+    def _key(client: MCPClient | CustomMCPClient, tool_name: str, tool_args: dict[str, Any]):
+        return client, tool_name, json.dumps(_canonicalize(tool_args), sort_keys=True, separators=(",", ":"))
+
+    def get(self, client: MCPClient | CustomMCPClient, tool_name: str, tool_args: dict[str, Any]) -> Optional[Any]:
+        key = self._key(client, tool_name, tool_args)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def generation(self, client: MCPClient | CustomMCPClient) -> int:
+        """Capture before the call, pass to `put()`"""
+        return self._generations.get(client, 0)
+
+    def put(
+            self,
+            client: MCPClient | CustomMCPClient,
+            tool_name: str,
+            tool_args: dict[str, Any],
+            result: Any,
+            generation: Optional[int] = None
+    ) -> None:
+        if generation is not None and generation != self.generation(client):
+            # A write finished while the call was running, the result may predate it
+            return
+        # Don't pin transient failures for the rest of the conversation
+        text = _result_text(result)
+        if text is None or text.startswith(ERROR_PREFIXES):
+            return
+
+        key = self._key(client, tool_name, tool_args)
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, client: MCPClient | CustomMCPClient) -> None:
+        self._generations[client] = self.generation(client) + 1
+        for key in [key for key in self._entries if key[0] is client]:
+            del self._entries[key]
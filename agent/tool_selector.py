@@ -0,0 +1,127 @@
+import math
+import re
+from collections import Counter
+from typing import Any
+
+from agent.models.message import Message, Role
+
+_CAMEL_CASE = re.compile(r"([a-z0-9])([A-Z])")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    words = _WORD.findall(_CAMEL_CASE.sub(r"\1 \2", text).lower())
+    # Minimal stemming so that `users` matches `user`
+    return [word[:-1] if len(word) > 3 and word.endswith("s") else word for word in words]
+
+
+def _tool_name(tool: dict[str, Any]) -> str:
+    return tool.get("function", {}).get("name", "")
+
+
+def _tool_text(tool: dict[str, Any]) -> list[str]:
+    function = tool.get("function", {})
+    # Name tokens are counted twice, they are the most specific signal
+    tokens = tokenize(function.get("name", "")) * 2 + tokenize(function.get("description") or "")
+    for name, schema in (function.get("parameters") or {}).get("properties", {}).items():
+        tokens += tokenize(name)
+        if isinstance(schema, dict):
+            tokens += tokenize(schema.get("description") or "")
+    return tokens
+
+
+class ToolSelector:
+    """
+    Picks the tools to send with a completion request: the `top_k` tools ranked with BM25 over
+    tool names, descriptions and parameters against the latest user message, plus every tool
+    called during the last `recent_turns` turns.
+
+    With `recall_check` all tools are still sent, and the selector only records whether the
+    tools the model actually called would have been selected, to tune `top_k`.
+    """
+
+    def __init__(self, top_k: int = 8, recent_turns: int = 2, recall_check: bool = False, k1: float = 1.2, b: float = 0.75):
+        self.top_k = top_k
+        self.recent_turns = recent_turns
+        self.recall_check = recall_check
+        self.k1 = k1
+        self.b = b
+
+        self._index_key: tuple[str, ...] = ()
+        self._documents: list[Counter] = []
+        self._idf: dict[str, float] = {}
+        self._avg_length = 0.0
+
+        self.checked_calls = 0
+        self.missed_calls: Counter = Counter()
+
+    def _build_index(self, tools: list[dict[str, Any]]) -> None:
+        key = tuple(_tool_name(tool) for tool in tools)
+        if key == self._index_key:
+            return
+
+        self._index_key = key
+        self._documents = [Counter(_tool_text(tool)) for tool in tools]
+        self._avg_length = sum(sum(doc.values()) for doc in self._documents) / max(len(self._documents), 1)
+        document_frequency = Counter(token for doc in self._documents for token in doc)
+        n = len(self._documents)
+        self._idf = {
+            token: math.log(1 + (n - df + 0.5) / (df + 0.5)) for token, df in document_frequency.items()
+        }
+
+    def _score(self, doc: Counter, query: list[str]) -> float:
+        length = sum(doc.values())
+        score = 0.0
+        for token in query:
+            if tf := doc.get(token):
+                norm = tf + self.k1 * (1 - self.b + self.b * length / self._avg_length)
+                score += self._idf[token] * tf * (self.k1 + 1) / norm
+        return score
+
+    def _recent_tool_names(self, messages: list[Message]) -> set[str]:
+        names, turns = set(), 0
+        for message in reversed(messages):
+            if message.role == Role.USER:
+                turns += 1
+                if turns > self.recent_turns:
+                    break
+            for tool_call in message.tool_calls or []:
+                names.add(tool_call["function"]["name"])
+        return names
+
+    @staticmethod
+    def _query(messages: list[Message]) -> list[str]:
+        for message in reversed(messages):
+            if message.role == Role.USER and message.content:
+                return tokenize(message.content)
+        return []
+
+    def select(self, tools: list[dict[str, Any]], messages: list[Message]) -> list[dict[str, Any]]:
+        """Selected tools in their original order"""
+        if len(tools) <= self.top_k:
+            return tools
+
+        self._build_index(tools)
+        query = self._query(messages)
+        ranked = sorted(range(len(tools)), key=lambda i: self._score(self._documents[i], query), reverse=True)
+        selected = set(ranked[:self.top_k])
+
+        recent = self._recent_tool_names(messages)
+        selected.update(i for i, tool in enumerate(tools) if _tool_name(tool) in recent)
+        return [tool for i, tool in enumerate(tools) if i in selected]
+
+    def record_calls(self, selected: list[dict[str, Any]], tool_calls: list[dict[str, Any]]) -> None:
+        """Recall check: count model tool calls that the selection would have missed"""
+        selected_names = {_tool_name(tool) for tool in selected}
+        for tool_call in tool_calls:
+            self.checked_calls += 1
+            tool_name = tool_call["function"]["name"]
+            if tool_name not in selected_names:
+                self.missed_calls[tool_name] += 1
+                print(f"Tool selector recall miss: `{tool_name}` was not in the top {self.top_k}")
+
+    @property
+    def recall(self) -> float | None:
+        if not self.checked_calls:
+            return None
+        return 1 - sum(self.missed_calls.values()) / self.checked_calls
@@ -0,0 +1,118 @@
+"""
+Production entry point for the MCP server.
+
+    python -m mcp_server.launcher --port 8006 --workers 4
+    python -m mcp_server.launcher --uds /tmp/mcp.sock --workers 4
+
+With `--uds` the server listens on a Unix domain socket instead of TCP, for agents on the same host.
+
+Uses gunicorn (when installed) to supervise uvicorn workers with the app preloaded before fork,
+otherwise falls back to uvicorn's own multi-process supervisor. uvloop and httptools are used
+when available. `mcp_server/server.py`'s `__main__` block stays the single-process dev server.
+"""
+import argparse
+import importlib.util
+import os
+import secrets
+from typing import Optional
+
+import uvicorn
+
+APP = "mcp_server.server:app"
+SESSION_SECRET_PATH = os.getenv("MCP_SESSION_SECRET_PATH", ".mcp_session_secret")
+
+
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+
+def _load_session_secret(path: str) -> str:
+    """Secret generated on the first launch and reused afterwards, so signed session ids survive restarts"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            if secret := f.read().strip():
+                return secret
+    except FileNotFoundError:
+        pass
+
+    secret = secrets.token_hex(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(secret)
+    print(f"Generated MCP session secret in {path}")
+    return secret
+
+
+def _default_workers() -> int:
+    return int(os.getenv("MCP_WORKERS", os.cpu_count() or 1))
+
+
+def _run_gunicorn(host: str, port: int, workers: int, uds: Optional[str] = None) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    # Importing the app in the supervisor builds the tool registry once, workers inherit it on fork
+    from mcp_server.server import app, SHUTDOWN_DRAIN_TIMEOUT
+
+    class _Application(BaseApplication):
+
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    _Application({
+        "bind": f"unix:{uds}" if uds else f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "graceful_timeout": SHUTDOWN_DRAIN_TIMEOUT + 5,
+        "keepalive": 75,
+    }).run()
+
+
+def _run_uvicorn(host: str, port: int, workers: int, uds: Optional[str] = None) -> None:
+    uvicorn.run(
+        APP,
+        host=host,
+        port=port,
+        uds=uds,
+        workers=workers,
+        loop="uvloop" if _has_module("uvloop") else "asyncio",
+        http="httptools" if _has_module("httptools") else "h11",
+        log_level="info",
+        timeout_keep_alive=75,
+        timeout_graceful_shutdown=int(os.getenv("MCP_SHUTDOWN_DRAIN_TIMEOUT", "30")) + 5,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run MCP server with supervised workers")
+    parser.add_argument("--host", default=os.getenv("MCP_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", "8006")))
+    parser.add_argument("--workers", type=int, default=_default_workers())
+    parser.add_argument("--uds", default=os.getenv("MCP_UDS"), help="Unix domain socket path, overrides host and port")
+    args = parser.parse_args()
+
+    # Sessions live in worker memory, a shared secret lets every worker accept sessions created by another one,
+    # also after a restart. Must be set before the app is imported.
+    if not os.getenv("MCP_SESSION_SECRET"):
+        os.environ["MCP_SESSION_SECRET"] = _load_session_secret(SESSION_SECRET_PATH)
+
+    print(
+        f"Starting MCP server on {args.uds or f'{args.host}:{args.port}'} with {args.workers} worker(s), "
+        f"uvloop={_has_module('uvloop')}, httptools={_has_module('httptools')}, gunicorn={_has_module('gunicorn')}"
+    )
+    if _has_module("gunicorn"):
+        _run_gunicorn(args.host, args.port, args.workers, args.uds)
+    else:
+        _run_uvicorn(args.host, args.port, args.workers, args.uds)
+
+
+if __name__ == "__main__":
+    main()
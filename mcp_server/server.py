@@ -1,19 +1,38 @@
+import asyncio
 import json
+import os
+from contextlib import asynccontextmanager
 from typing import Optional
 
 import uvicorn
 from fastapi import FastAPI, Response, Header
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 
-from mcp_server.services.mcp_server import MCPServer
-from models.request import MCPRequest
-from models.response import MCPResponse, ErrorResponse
+from mcp_server.models.request import MCPRequest
+from mcp_server.models.response import MCPResponse, ErrorResponse
+from mcp_server.services.mcp_server import MCPServer, MCPSession
+from tracing.tracer import Tracer, SpanContext, TRACEPARENT_HEADER
 
 MCP_SESSION_ID_HEADER = "Mcp-Session-Id"
+SESSION_SNAPSHOT_PATH = os.getenv("MCP_SESSION_SNAPSHOT_PATH", ".mcp_sessions.json")
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("MCP_SHUTDOWN_DRAIN_TIMEOUT", "30"))
+
+tracer = Tracer("mcp-server")
+
+mcp_server = MCPServer(snapshot_path=SESSION_SNAPSHOT_PATH)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """Warm restore of sessions on startup, drain and snapshot on shutdown"""
+    await mcp_server.warm_up()
+    yield
+    await mcp_server.drain(SHUTDOWN_DRAIN_TIMEOUT)
+    mcp_server.snapshot_sessions(SESSION_SNAPSHOT_PATH)
+
 
 # FastAPI app
-app = FastAPI(title="MCP Tools Server", version="1.0.0")
-mcp_server = MCPServer()
+app = FastAPI(title="MCP Tools Server", version="1.0.0", lifespan=lifespan)
 
 
 def _validate_accept_header(accept_header: Optional[str]) -> bool:
@@ -43,12 +62,90 @@ async def _create_sse_stream(messages: list):
         yield event_data.encode('utf-8')
     yield b"data: [DONE]\n\n"
 
+async def _dispatch(request: MCPRequest, session: MCPSession, traceparent: Optional[str]) -> MCPResponse:
+    """Handle an operation request of a ready session"""
+    if request.method == "ping":
+        return MCPResponse(id=request.id, result={})
+    if request.method == "tools/list":
+        return mcp_server.handle_tools_list(request)
+    if request.method == "tools/call":
+        meta = (request.params or {}).get("_meta") or {}
+        parent = SpanContext.from_traceparent(meta.get(TRACEPARENT_HEADER) or traceparent)
+        with tracer.span("mcp.server.tools_call", parent=parent, session=session.session_id):
+            return await mcp_server.handle_tools_call(request, session.session_id)
+    return MCPResponse(
+        id=request.id,
+        error=ErrorResponse(
+            code=-32602,
+            message=f"Method '{request.method}' not found"
+        )
+    )
+
+
+async def _create_batch_sse_stream(rejected: list[MCPResponse], tasks: list[asyncio.Task]):
+    """SSE stream of batch responses in completion order, a slow call does not hold back the others"""
+    for message in rejected:
+        yield f"data: {json.dumps(message.dict(exclude_none=True))}\n\n".encode('utf-8')
+    for next_done in asyncio.as_completed(tasks):
+        message = await next_done
+        yield f"data: {json.dumps(message.dict(exclude_none=True))}\n\n".encode('utf-8')
+    yield b"data: [DONE]\n\n"
+
+
+async def _handle_batch(
+        requests: list[MCPRequest],
+        mcp_session_id: Optional[str],
+        traceparent: Optional[str]
+) -> Response:
+    """JSON-RPC batch (MCP 2025-03-26, accepted for every protocol version), requests of the batch are executed concurrently"""
+    if not requests:
+        error_response = MCPResponse(id="server-error", error=ErrorResponse(code=-32600, message="Empty batch"))
+        return Response(status_code=400, content=error_response.model_dump_json(), media_type="application/json")
+
+    session = mcp_server.get_session(mcp_session_id) if mcp_session_id else None
+    if not session:
+        return Response(
+            status_code=400,
+            content="No valid session ID provided"
+        )
+    if not session.ready_for_operation:
+        error_response = MCPResponse(id="server-error", error=ErrorResponse(code=-32600, message="Missing session ID"))
+        return Response(status_code=400, content=error_response.model_dump_json(), media_type="application/json")
+
+    rejected, tasks = [], []
+    for request in requests:
+        if request.id is None:
+            # Notifications get no response
+            continue
+        if request.method == "initialize":
+            rejected.append(MCPResponse(
+                id=request.id,
+                error=ErrorResponse(code=-32600, message="initialize must not be part of a batch")
+            ))
+            continue
+        tasks.append(asyncio.create_task(_dispatch(request, session, traceparent)))
+
+    if not rejected and not tasks:
+        return Response(status_code=202, headers={MCP_SESSION_ID_HEADER: session.session_id})
+
+    return StreamingResponse(
+        content=_create_batch_sse_stream(rejected, tasks),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            MCP_SESSION_ID_HEADER: session.session_id
+        }
+    )
+
+
 @app.post("/mcp")
 async def handle_mcp_request(
-        request: MCPRequest,
+        request: MCPRequest | list[MCPRequest],
         response: Response,
         accept: Optional[str] = Header(None),
-        mcp_session_id: Optional[str] = Header(None, alias=MCP_SESSION_ID_HEADER)
+        mcp_session_id: Optional[str] = Header(None, alias=MCP_SESSION_ID_HEADER),
+        traceparent: Optional[str] = Header(None, alias=TRACEPARENT_HEADER)
 ):
     """Single MCP endpoint handling all JSON-RPC requests with proper session management"""
     #TODO:
@@ -100,6 +197,8 @@ async def handle_mcp_request(
             content=error_response.model_dump_json(),
             media_type="application/json"
         )
+    if isinstance(request, list):
+        return await _handle_batch(request, mcp_session_id, traceparent)
     if request.method == "initialize":
         mcp_response, session_id = mcp_server.handle_initialize(request)
 
@@ -121,7 +220,7 @@ async def handle_mcp_request(
                 content="No valid session ID provided"
             )
         if request.method == "notifications/initialized":
-            session.ready_for_operation = True
+            await mcp_server.mark_ready(session)
             return Response(
                 status_code=202,
                 headers={MCP_SESSION_ID_HEADER: session.session_id}
@@ -140,18 +239,7 @@ async def handle_mcp_request(
                 media_type="application/json"
             )
 
-        if request.method == "tools/list":
-            mcp_response = mcp_server.handle_tools_list(request)
-        elif request.method == "tools/call":
-            mcp_response = await mcp_server.handle_tools_call(request)
-        else:
-            mcp_response = MCPResponse(
-                id=request.id,
-                error=ErrorResponse(
-                    code=-32602,
-                    message=f"Method '{request.method}' not found"
-                )
-            )
+        mcp_response = await _dispatch(request, session, traceparent)
 
     return StreamingResponse(
         content=_create_sse_stream([mcp_response]),
@@ -164,9 +252,29 @@ async def handle_mcp_request(
     )
 
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe: the worker is up and serving requests"""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: sessions restored, tools loaded and UMS reachable"""
+    readiness = await mcp_server.check_readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Server metrics, including the UMS circuit breaker state"""
+    return mcp_server.get_metrics()
+
+
 if __name__ == "__main__":
+    # Single-process dev server, `python -m mcp_server.server`. Production runs `python -m mcp_server.launcher`
     uvicorn.run(
-        "server:app",
+        "mcp_server.server:app",
         host="0.0.0.0",
         port=8006,
         reload=True,
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from mcp_server.models.response import MCPResponse
+
+
+class IdempotencyConflictError(Exception):
+    """The key was already used for a request with different arguments"""
+
+
+class _ExecutionCancelled(Exception):
+    """The first execution of a key was cancelled, a duplicate that waited for it executes the call itself"""
+
+
+class IdempotencyStore:
+    """
+    Bounded TTL store of completed tools/call responses.
+
+    A duplicate of a completed call gets the stored response back, a duplicate of a call that
+    is still running waits for the first execution instead of running the tool again (and takes over
+    when the first execution is cancelled).
+    A `fingerprint` of the arguments is kept with the key, reusing the key for other arguments is rejected.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires_at, fingerprint, response)
+        self._completed: OrderedDict[str, tuple[float, Optional[str], MCPResponse]] = OrderedDict()
+        # key -> (fingerprint, future)
+        self._in_flight: dict[str, tuple[Optional[str], asyncio.Future]] = {}
+
+        self.hits = 0
+        self.joined = 0
+        self.misses = 0
+
+    def _get_completed(self, key: str) -> tuple[Optional[str], MCPResponse] | None:
+        entry = self._completed.get(key)
+        if not entry:
+            return None
+
+        expires_at, fingerprint, response = entry
+        if expires_at < time.monotonic():
+            del self._completed[key]
+            return None
+        return fingerprint, response
+
+    @staticmethod
+    def _check_fingerprint(key: str, stored: Optional[str], fingerprint: Optional[str]) -> None:
+        if stored != fingerprint:
+            raise IdempotencyConflictError(f"Idempotency key {key} was already used with different arguments")
+
+    def _store(self, key: str, fingerprint: Optional[str], response: MCPResponse) -> None:
+        self._completed[key] = (time.monotonic() + self.ttl, fingerprint, response)
+        self._completed.move_to_end(key)
+        while len(self._completed) > self.max_entries:
+            self._completed.popitem(last=False)
+
+    async def run(
+            self,
+            key: str,
+            execute: Callable[[], Awaitable[MCPResponse]],
+            fingerprint: Optional[str] = None
+    ) -> MCPResponse:
+        """Execute once per key and replay the result for duplicates"""
+        if completed := self._get_completed(key):
+            self._check_fingerprint(key, completed[0], fingerprint)
+            self.hits += 1
+            return completed[1]
+
+        if in_flight := self._in_flight.get(key):
+            self._check_fingerprint(key, in_flight[0], fingerprint)
+            self.joined += 1
+            try:
+                return await asyncio.shield(in_flight[1])
+            except _ExecutionCancelled:
+                return await self.run(key, execute, fingerprint)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (fingerprint, future)
+        try:
+            response = await execute()
+        except asyncio.CancelledError:
+            # Cancelling the future would cancel the waiters too, although their requests are still alive
+            future.set_exception(_ExecutionCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters will receive the exception, don't report it as never retrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            # Failed executions are not replayed, so a retry gets a chance to succeed
+            if not (response.error or (response.result or {}).get("isError")):
+                self._store(key, fingerprint, response)
+            return response
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._completed),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "joined": self.joined,
+            "misses": self.misses,
+        }
@@ -1,14 +1,33 @@
 import asyncio
+import fcntl
+import hashlib
+import hmac
+import json
+import os
+import time
 import uuid
+from typing import Any
 
 from mcp_server.models.request import MCPRequest
 from mcp_server.models.response import MCPResponse, ErrorResponse
+from mcp_server.services.idempotency import IdempotencyStore, IdempotencyConflictError
+from mcp_server.tools.base import ToolError, current_idempotency_key
 from mcp_server.tools.users.create_user_tool import CreateUserTool
 from mcp_server.tools.users.delete_user_tool import DeleteUserTool
 from mcp_server.tools.users.get_user_by_id_tool import GetUserByIdTool
 from mcp_server.tools.users.search_users_tool import SearchUsersTool
 from mcp_server.tools.users.update_user_tool import UpdateUserTool
 from mcp_server.tools.users.user_client import UserClient
+from tracing.tracer import Tracer
+
+# Shared by all workers of a multi-process deployment, lets any worker accept sessions created by another one
+SESSION_SECRET = os.getenv("MCP_SESSION_SECRET")
+# Lifetime of a session, signed session ids carry their issue time and expire as well
+SESSION_TTL = float(os.getenv("MCP_SESSION_TTL", "86400"))
+# /readyz probes share one UMS health check for this long, a flapping UMS doesn't flip every probe
+UMS_HEALTH_CACHE_SECONDS = float(os.getenv("MCP_UMS_HEALTH_CACHE_SECONDS", "5"))
+
+tracer = Tracer("mcp-server")
 
 
 class MCPSession:
@@ -20,20 +39,51 @@ class MCPSession:
         self.created_at = asyncio.get_event_loop().time()
         self.last_activity = self.created_at
 
+    def to_dict(self) -> dict[str, Any]:
+        """Snapshot with loop-relative timestamps turned into ages, so they survive a restart"""
+        now = asyncio.get_event_loop().time()
+        return {
+            "id": self.session_id,
+            "ready": self.ready_for_operation,
+            "age": round(now - self.created_at, 3),
+            "idle": round(now - self.last_activity, 3),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], downtime: float = 0.0) -> 'MCPSession':
+        session = cls(data["id"])
+        session.ready_for_operation = data["ready"]
+        now = asyncio.get_event_loop().time()
+        session.created_at = now - data["age"] - downtime
+        session.last_activity = now - data["idle"] - downtime
+        return session
+
 
 class MCPServer:
 
-    def __init__(self):
+    def __init__(self, snapshot_path: str | None = None):
         self.protocol_version = "2024-11-05"
         self.server_info = {
             "name": "custom-ums-mcp-server",
             "version": "1.0.0"
         }
 
-        # Session management
+        # Session management, with signed session ids the snapshot also records handshakes for the other workers
         self.sessions: dict[str, MCPSession] = {}
+        self.snapshot_path = snapshot_path
+        self.warmed_up = False
+        self._ums_health: tuple[float, bool] | None = None
         self.tools = {}
+        self.idempotency_store = IdempotencyStore()
+        self.user_client = UserClient()
         self._register_tools()
+        # Tools never change after registration, build tools/list result once
+        self._tools_list = [tool.to_mcp_tool() for tool in self.tools.values()]
+
+        # In-flight tools/call tracking for graceful shutdown
+        self._in_flight_calls = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
 
     def _register_tools(self):
         """Register all available tools"""
@@ -41,13 +91,122 @@ class MCPServer:
         # 1. Crate UserClient
         # 2. Create list of tools: GetUserByIdTool, SearchUsersTool, CreateUserTool, UpdateUserTool, DeleteUserTool
         # 3. Iterate trough list and add them to `self.tools` dict where key is tool name and value is tool itself
-        user_client = UserClient()
+        user_client = self.user_client
         tools = [GetUserByIdTool(user_client), SearchUsersTool(user_client), CreateUserTool(user_client),
                  UpdateUserTool(user_client), DeleteUserTool(user_client)]
 
         for tool in tools:
             self.tools[tool.name] = tool
 
+    def get_metrics(self) -> dict[str, Any]:
+        """Collect server metrics"""
+        return {
+            "sessions": len(self.sessions),
+            "in_flight_tool_calls": self._in_flight_calls,
+            "tools": len(self.tools),
+            "ums_circuit_breaker": self.user_client.circuit_breaker.snapshot(),
+            "ums_retry_budget": {
+                "tokens": round(self.user_client.retry_budget.tokens, 2),
+                "exhausted": self.user_client.retry_budget.exhausted,
+            },
+            "ums_latency_p95": self.user_client.latency_tracker.percentile(0.95),
+            "idempotency_store": self.idempotency_store.stats(),
+        }
+
+    async def _ums_reachable(self) -> bool:
+        """UMS health, checked at most once per UMS_HEALTH_CACHE_SECONDS"""
+        if self._ums_health and time.monotonic() - self._ums_health[0] < UMS_HEALTH_CACHE_SECONDS:
+            return self._ums_health[1]
+        reachable = await self.user_client.health_check()
+        self._ums_health = (time.monotonic(), reachable)
+        return reachable
+
+    async def warm_up(self) -> None:
+        """Restore sessions and check UMS once before the first readiness probe"""
+        if self.snapshot_path:
+            self.restore_sessions(self.snapshot_path)
+        await self._ums_reachable()
+        self.warmed_up = True
+
+    async def check_readiness(self) -> dict[str, Any]:
+        """Ready when warm-up has finished, tools are loaded and UMS is reachable"""
+        ums_reachable = await self._ums_reachable()
+        checks = {
+            "warmed_up": self.warmed_up,
+            "tools": len(self._tools_list),
+            "ums_reachable": ums_reachable,
+            "ums_circuit": str(self.user_client.circuit_breaker.state),
+        }
+        return {"ready": self.warmed_up and bool(self._tools_list) and ums_reachable, "checks": checks}
+
+    async def drain(self, timeout: float = 30.0) -> bool:
+        """Wait for in-flight tool calls to finish, returns False if some are still running after timeout"""
+        if self._in_flight_calls:
+            print(f"Draining {self._in_flight_calls} in-flight tool call(s)...")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            print(f"Drain timed out with {self._in_flight_calls} tool call(s) still running")
+            return False
+
+    @staticmethod
+    def _read_snapshot(path: str) -> dict[str, Any] | None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Unable to read session snapshot {path}: {e}")
+            return None
+
+    def snapshot_sessions(self, path: str, max_idle: float = 3600.0) -> None:
+        """
+        Merge sessions into a compact JSON file, atomically replacing the previous snapshot. Every worker
+        of a multi-process deployment saves to the same file at shutdown, a lock keeps their merges apart.
+        """
+        total = self._merge_snapshot(path, [session.to_dict() for session in self.sessions.values()], max_idle)
+        print(f"Saved {len(self.sessions)} session(s) to {path}, {total} in total")
+
+    def _merge_snapshot(self, path: str, sessions_to_save: list[dict[str, Any]], max_idle: float = 3600.0) -> int:
+        with open(f"{path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            now = time.time()
+            sessions = {data["id"]: data for data in sessions_to_save}
+            if previous := self._read_snapshot(path):
+                elapsed = max(now - previous.get("saved_at", now), 0.0)
+                for data in previous.get("sessions", []):
+                    if data["id"] not in sessions and data["idle"] + elapsed <= max_idle:
+                        sessions[data["id"]] = {**data, "age": data["age"] + elapsed, "idle": data["idle"] + elapsed}
+
+            snapshot = {
+                "saved_at": now,
+                "protocol_version": self.protocol_version,
+                "sessions": list(sessions.values()),
+            }
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        return len(sessions)
+
+    def restore_sessions(self, path: str, max_idle: float = 3600.0) -> int:
+        """Restore sessions from snapshot, sessions idle for longer than `max_idle` are dropped"""
+        if not (snapshot := self._read_snapshot(path)):
+            return 0
+
+        downtime = max(time.time() - snapshot.get("saved_at", time.time()), 0.0)
+        restored = 0
+        for data in snapshot.get("sessions", []):
+            if data["idle"] + downtime > max_idle or data["id"] in self.sessions:
+                continue
+            self.sessions[data["id"]] = MCPSession.from_dict(data, downtime)
+            restored += 1
+
+        print(f"Restored {restored} session(s) from {path}")
+        return restored
+
     def _validate_protocol_version(self, client_version: str) -> str:
         """Validate and negotiate protocol version"""
         supported_versions = ["2024-11-05"]
@@ -55,13 +214,74 @@ class MCPServer:
             return client_version
         return self.protocol_version
 
+    @staticmethod
+    def _sign_session_id(payload: str) -> str:
+        return hmac.new(SESSION_SECRET.encode(), payload.encode(), hashlib.sha256).hexdigest()[:16]
+
+    def _new_session_id(self) -> str:
+        """uuid, with a shared secret followed by the issue time and the signature of both"""
+        session_id = str(uuid.uuid4()).replace("-", "")
+        if SESSION_SECRET:
+            session_id += f"{int(time.time()):08x}"
+            session_id += self._sign_session_id(session_id)
+        return session_id
+
+    def _session_issued_at(self, session_id: str) -> float | None:
+        """Issue time of a validly signed session id"""
+        if not SESSION_SECRET or len(session_id) != 56:
+            return None
+        if not hmac.compare_digest(session_id[40:], self._sign_session_id(session_id[:40])):
+            return None
+        try:
+            return float(int(session_id[32:40], 16))
+        except ValueError:
+            return None
+
+    def _handshake_completed(self, session_id: str) -> bool:
+        """Whether the snapshot shared by the workers records the session as ready"""
+        if not self.snapshot_path or not (snapshot := self._read_snapshot(self.snapshot_path)):
+            return False
+        return any(data["id"] == session_id and data["ready"] for data in snapshot.get("sessions", []))
+
+    def _adopt_session(self, session_id: str) -> MCPSession | None:
+        """
+        Accept a session created by another worker (or a previous process) if its signature is valid and it
+        has not expired. It is ready only if the shared snapshot records its completed handshake.
+        """
+        if (issued_at := self._session_issued_at(session_id)) is None:
+            return None
+        age = time.time() - issued_at
+        if age > SESSION_TTL:
+            return None
+
+        session = MCPSession(session_id)
+        session.created_at = asyncio.get_event_loop().time() - max(age, 0.0)
+        session.ready_for_operation = self._handshake_completed(session_id)
+        self.sessions[session_id] = session
+        return session
+
     def get_session(self, session_id: str) -> MCPSession | None:
-        """Get an existing session"""
-        session = self.sessions.get(session_id)
-        if session:
-            session.last_activity = asyncio.get_event_loop().time()
+        """Get an existing session, expired sessions are dropped"""
+        session = self.sessions.get(session_id) or self._adopt_session(session_id)
+        if not session:
+            return None
+
+        now = asyncio.get_event_loop().time()
+        if now - session.created_at > SESSION_TTL:
+            del self.sessions[session_id]
+            return None
+        if not session.ready_for_operation and SESSION_SECRET:
+            # notifications/initialized may have been handled by another worker since
+            session.ready_for_operation = self._handshake_completed(session_id)
+        session.last_activity = now
         return session
 
+    async def mark_ready(self, session: MCPSession) -> None:
+        """Complete the handshake, with signed sessions it is recorded for the other workers too"""
+        session.ready_for_operation = True
+        if SESSION_SECRET and self.snapshot_path:
+            await asyncio.to_thread(self._merge_snapshot, self.snapshot_path, [session.to_dict()])
+
     def handle_initialize(self, request: MCPRequest) -> tuple[MCPResponse, str]:
         """Handle initialization request with session creation"""
         # TODO:
@@ -82,7 +302,7 @@ class MCPServer:
         #             }
         # 5. Return created MCP response and `session_id`
 
-        session_id = str(uuid.uuid4()).replace("-", "")
+        session_id = self._new_session_id()
         mcp_session = MCPSession(session_id)
         self.sessions[session_id] = mcp_session
         protocol_version = request.params.get("protocolVersion") if request.params else self.protocol_version
@@ -100,14 +320,57 @@ class MCPServer:
         #       - id=request.id
         #       - result={"tools": tools_list}
         # 3. Return created MCP response
-        tools_list = [tool.to_mcp_tool() for tool in self.tools.values()]
-
         return MCPResponse(
             id=request.id,
-            result={"tools": tools_list}
+            result={"tools": self._tools_list}
         )
 
-    async def handle_tools_call(self, request: MCPRequest) -> MCPResponse:
+    @staticmethod
+    def _get_idempotency_key(request: MCPRequest, session_id: str | None) -> str | None:
+        """Explicit `_meta.idempotencyKey` wins, otherwise JSON-RPC id. Both are scoped to the session and tool"""
+        params = request.params or {}
+        meta = params.get("_meta") or {}
+        if explicit_key := meta.get("idempotencyKey"):
+            return f"key:{session_id}:{params.get('name')}:{explicit_key}"
+        if session_id and request.id is not None:
+            return f"session:{session_id}:{params.get('name')}:{request.id}"
+        return None
+
+    @staticmethod
+    def _get_fingerprint(request: MCPRequest) -> str:
+        arguments = (request.params or {}).get("arguments") or {}
+        return hashlib.sha256(json.dumps(arguments, sort_keys=True).encode("utf-8")).hexdigest()
+
+    async def handle_tools_call(self, request: MCPRequest, session_id: str | None = None) -> MCPResponse:
+        """Handle tools/call request, duplicates of an already executed call replay its response"""
+        self._in_flight_calls += 1
+        self._idle.clear()
+        idempotency_key = self._get_idempotency_key(request, session_id)
+        # Only a key supplied by the client reaches UMS, derived keys would make every write look retryable
+        client_key = ((request.params or {}).get("_meta") or {}).get("idempotencyKey")
+        key_token = current_idempotency_key.set(client_key)
+        try:
+            if not idempotency_key:
+                return await self._execute_tools_call(request)
+
+            try:
+                response = await self.idempotency_store.run(
+                    idempotency_key,
+                    lambda: self._execute_tools_call(request),
+                    self._get_fingerprint(request)
+                )
+            except IdempotencyConflictError as e:
+                return MCPResponse(id=request.id, error=ErrorResponse(code=-32602, message=str(e)))
+            if response.id != request.id:
+                response = response.model_copy(update={"id": request.id})
+            return response
+        finally:
+            current_idempotency_key.reset(key_token)
+            self._in_flight_calls -= 1
+            if not self._in_flight_calls:
+                self._idle.set()
+
+    async def _execute_tools_call(self, request: MCPRequest) -> MCPResponse:
         """Handle tools/call request with proper MCP-compliant response format"""
         # TODO:
         # 1. Check if `request.params` exists, if not return MCPResponse with error:
@@ -149,7 +412,8 @@ class MCPServer:
         tool = self.tools[tool_name]
 
         try:
-            result_text = await tool.execute(arguments)
+            with tracer.span("mcp.tool.execute", tool=tool_name):
+                result_text = await tool.execute(arguments)
             return MCPResponse(
                 id=request.id,
                 result={
@@ -161,6 +425,11 @@ class MCPServer:
                     ]
                 }
             )
+        except ToolError as tool_error:
+            return MCPResponse(
+                id=request.id,
+                result={"content": [{"type": "text", "text": str(tool_error)}], "isError": True}
+            )
         except Exception as tool_error:
             return MCPResponse(
                 id=request.id,
@@ -0,0 +1,144 @@
+"""
+stdio transport for the MCP server, for agents that launch it as a subprocess on the same host.
+
+    python -m mcp_server.stdio
+
+Newline-delimited JSON-RPC on stdin/stdout (one message or batch per line, a batch is answered with one array),
+one session per process.
+stdout carries protocol messages only, prints of the tools are redirected to stderr.
+"""
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Optional
+
+from mcp_server.models.request import MCPRequest
+from mcp_server.models.response import MCPResponse, ErrorResponse
+from mcp_server.services.mcp_server import MCPServer, MCPSession
+from tracing.tracer import Tracer, SpanContext, TRACEPARENT_HEADER
+
+# Tool results can be large, the default 64 KiB line limit of StreamReader is not enough
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+tracer = Tracer("mcp-server")
+
+
+class StdioServer:
+    """Serves one MCPServer session over a pair of byte streams, requests are handled concurrently"""
+
+    def __init__(self, mcp_server: MCPServer, writer: asyncio.StreamWriter):
+        self.mcp_server = mcp_server
+        self.writer = writer
+        self.session: Optional[MCPSession] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def _write(self, message: Any) -> None:
+        self.writer.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+        await self.writer.drain()
+
+    async def _handle(self, request: MCPRequest) -> Optional[MCPResponse]:
+        if request.method == "initialize":
+            response, session_id = self.mcp_server.handle_initialize(request)
+            self.session = self.mcp_server.get_session(session_id)
+            return response
+        if request.method == "notifications/initialized":
+            if self.session:
+                await self.mcp_server.mark_ready(self.session)
+            return None
+        if request.id is None:
+            return None
+        if not self.session or not self.session.ready_for_operation:
+            return MCPResponse(id=request.id, error=ErrorResponse(code=-32600, message="Missing session ID"))
+        if request.method == "ping":
+            return MCPResponse(id=request.id, result={})
+        if request.method == "tools/list":
+            return self.mcp_server.handle_tools_list(request)
+        if request.method == "tools/call":
+            meta = (request.params or {}).get("_meta") or {}
+            parent = SpanContext.from_traceparent(meta.get(TRACEPARENT_HEADER))
+            with tracer.span("mcp.server.tools_call", parent=parent, session=self.session.session_id):
+                return await self.mcp_server.handle_tools_call(request, self.session.session_id)
+        return MCPResponse(
+            id=request.id,
+            error=ErrorResponse(code=-32602, message=f"Method '{request.method}' not found")
+        )
+
+    async def _response(self, message: Any, in_batch: bool = False) -> Optional[dict[str, Any]]:
+        request_id = message.get("id") if isinstance(message, dict) else None
+        try:
+            request = MCPRequest.model_validate(message)
+            if in_batch and request.method == "initialize":
+                response = MCPResponse(
+                    id=request.id,
+                    error=ErrorResponse(code=-32600, message="initialize must not be part of a batch")
+                )
+            else:
+                response = await self._handle(request)
+        except Exception as e:
+            response = MCPResponse(id=request_id, error=ErrorResponse(code=-32600, message=f"Invalid request: {e}"))
+        if response and response.id is not None:
+            return response.model_dump(exclude_none=True)
+        return None
+
+    async def _respond(self, message: Any) -> None:
+        if response := await self._response(message):
+            await self._write(response)
+
+    async def _respond_batch(self, messages: list[Any]) -> None:
+        """One array with the responses of the batch members, nothing if they are all notifications"""
+        if not messages:
+            await self._write({"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Empty batch"}})
+            return
+        responses = await asyncio.gather(*(self._response(message, in_batch=True) for message in messages))
+        if responses := [response for response in responses if response]:
+            await self._write(responses)
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def serve(self, reader: asyncio.StreamReader) -> None:
+        """Read messages until EOF, then wait for the calls in flight"""
+        while line := await reader.readline():
+            if not line.strip():
+                continue
+            try:
+                payload = json.loads(line)
+            except json.JSONDecodeError as e:
+                await self._write({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": f"Parse error: {e}"}})
+                continue
+            if isinstance(payload, list):
+                self._spawn(self._respond_batch(payload))
+            elif isinstance(payload, dict) and payload.get("method") == "initialize":
+                # The handshake must complete before the requests that follow it
+                await self._respond(payload)
+            else:
+                self._spawn(self._respond(payload))
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def _main() -> None:
+    # Protocol output goes to the original stdout, everything printed afterwards lands on stderr
+    output = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    sys.stdout = sys.stderr
+
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=MAX_LINE_BYTES)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, output)
+    # Without buffering drain() returns once a message is handed to the pipe, like the flush of a blocking write
+    transport.set_write_buffer_limits(high=0)
+    writer = asyncio.StreamWriter(transport, protocol, None, loop)
+
+    try:
+        await StdioServer(MCPServer(), writer).serve(reader)
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -1,5 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+# Idempotency key supplied by the client for the tools/call being executed, write tools forward it to their backend
+current_idempotency_key: ContextVar[Optional[str]] = ContextVar("current_idempotency_key", default=None)
+
+
+class ToolError(Exception):
+    """Tool failure, its message is returned to the client as the result text with `isError`"""
 
 
 class BaseTool(ABC):
@@ -22,6 +30,11 @@ class BaseTool(ABC):
     def input_schema(self) -> Dict[str, Any]:
         pass
 
+    @property
+    def annotations(self) -> Optional[Dict[str, Any]]:
+        """MCP tool annotations (readOnlyHint, destructiveHint, idempotentHint, openWorldHint)"""
+        return None
+
     @abstractmethod
     async def execute(self, arguments: Dict[str, Any]) -> str:
         """Execute the tool with MCP-compliant arguments
@@ -37,8 +50,11 @@ class BaseTool(ABC):
 
     def to_mcp_tool(self) -> Dict[str, Any]:
         """Provides tools JSON Schema"""
-        return {
+        mcp_tool = {
             "name": self.name,
             "description": self.description,
             "inputSchema": self.input_schema
         }
+        if self.annotations:
+            mcp_tool["annotations"] = self.annotations
+        return mcp_tool
@@ -0,0 +1,160 @@
+import time
+from collections import deque
+from enum import StrEnum
+from typing import Any
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected without touching the upstream because the circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(
+            f"{name} is unavailable (circuit open), failing fast. Retry in {max(retry_after, 0.0):.0f}s"
+        )
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker over a rolling window of the latest calls. The caller decides what a failure is,
+    UserClient records connection errors, timeouts, 5xx and 429 responses as failures.
+
+    CLOSED    -> calls pass through; opens when the error rate or the slow call rate in the window
+                 reaches its threshold (once at least `min_calls` outcomes were recorded).
+    OPEN      -> calls are rejected with CircuitOpenError until `open_timeout` seconds have passed.
+    HALF_OPEN -> up to `half_open_max_calls` probes pass through; a healthy probe closes the circuit,
+                 a failed or slow one opens it again.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            window_size: int = 20,
+            min_calls: int = 5,
+            error_rate_threshold: float = 0.5,
+            slow_call_threshold: float = 2.0,
+            slow_call_rate_threshold: float = 0.5,
+            open_timeout: float = 30.0,
+            half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_timeout = open_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CircuitState.CLOSED
+        # (is_error, is_slow) outcomes of the latest calls
+        self._window: deque[tuple[bool, bool]] = deque(maxlen=window_size)
+        self._opened_at: float | None = None
+        self._half_open_in_flight = 0
+
+        self.total_calls = 0
+        self.failed_calls = 0
+        self.slow_calls = 0
+        self.rejected_calls = 0
+        self.state_transitions = 0
+
+    def before_call(self) -> None:
+        """Reserve a slot for the call or raise CircuitOpenError"""
+        if self.state == CircuitState.OPEN:
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.open_timeout:
+                self.rejected_calls += 1
+                raise CircuitOpenError(self.name, self.open_timeout - elapsed)
+            self._transition(CircuitState.HALF_OPEN)
+
+        if self.state == CircuitState.HALF_OPEN:
+            if self._half_open_in_flight >= self.half_open_max_calls:
+                self.rejected_calls += 1
+                raise CircuitOpenError(self.name, 0.0)
+            self._half_open_in_flight += 1
+
+    def release(self) -> None:
+        """Give back the slot of a call that was abandoned without an outcome"""
+        if self.state == CircuitState.HALF_OPEN:
+            self._half_open_in_flight = max(self._half_open_in_flight - 1, 0)
+
+    def record_success(self, duration: float) -> None:
+        self._record(is_error=False, duration=duration)
+
+    def record_failure(self, duration: float) -> None:
+        self._record(is_error=True, duration=duration)
+
+    def _record(self, is_error: bool, duration: float) -> None:
+        is_slow = duration >= self.slow_call_threshold
+        self.total_calls += 1
+        self.failed_calls += is_error
+        self.slow_calls += is_slow
+
+        if self.state == CircuitState.HALF_OPEN:
+            self._half_open_in_flight = max(self._half_open_in_flight - 1, 0)
+            if is_error or is_slow:
+                self._transition(CircuitState.OPEN)
+            else:
+                self._transition(CircuitState.CLOSED)
+            return
+
+        if self.state == CircuitState.OPEN:
+            # Late outcome of a call that started before the circuit opened
+            return
+
+        self._window.append((is_error, is_slow))
+        if len(self._window) < self.min_calls:
+            return
+
+        error_rate, slow_rate = self._rates()
+        if error_rate >= self.error_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            self._transition(CircuitState.OPEN)
+
+    def _rates(self) -> tuple[float, float]:
+        if not self._window:
+            return 0.0, 0.0
+        errors = sum(1 for is_error, _ in self._window if is_error)
+        slow = sum(1 for _, is_slow in self._window if is_slow)
+        return errors / len(self._window), slow / len(self._window)
+
+    def _transition(self, state: CircuitState) -> None:
+        if state == self.state:
+            return
+
+        print(f"Circuit breaker `{self.name}`: {self.state} -> {state}")
+        self.state = state
+        self.state_transitions += 1
+        self._half_open_in_flight = 0
+
+        if state == CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CircuitState.CLOSED:
+            self._opened_at = None
+            self._window.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Breaker state for the metrics endpoint"""
+        error_rate, slow_rate = self._rates()
+        retry_after = None
+        if self.state == CircuitState.OPEN:
+            retry_after = max(self.open_timeout - (time.monotonic() - self._opened_at), 0.0)
+
+        return {
+            "name": self.name,
+            "state": str(self.state),
+            "window_calls": len(self._window),
+            "error_rate": round(error_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "retry_after_seconds": retry_after,
+            "total_calls": self.total_calls,
+            "failed_calls": self.failed_calls,
+            "slow_calls": self.slow_calls,
+            "rejected_calls": self.rejected_calls,
+            "state_transitions": self.state_transitions,
+        }
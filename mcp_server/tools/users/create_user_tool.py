@@ -1,6 +1,7 @@
 from typing import Any
 
 from mcp_server.models.user_info import UserCreate
+from mcp_server.tools.base import ToolError, current_idempotency_key
 from mcp_server.tools.users.base import BaseUserServiceTool
 
 
@@ -16,6 +17,10 @@ class CreateUserTool(BaseUserServiceTool):
         #TODO: Provide description of this tool
         return 'Adds user'
 
+    @property
+    def annotations(self) -> dict[str, Any]:
+        return {"readOnlyHint": False, "destructiveHint": False, "idempotentHint": False, "openWorldHint": False}
+
     @property
     def input_schema(self) -> dict[str, Any]:
         #TODO: Provide tool params Schema. To do that you can create json schema from UserCreate pydentic model ` UserCreate.model_json_schema()`
@@ -27,6 +32,6 @@ class CreateUserTool(BaseUserServiceTool):
         # 2. Call user_client add user and return its results (it is async, don't forget to await)
         try:
             user_create = UserCreate.model_validate(arguments)
-            return await self._user_client.add_user(user_create)
+            return await self._user_client.add_user(user_create, current_idempotency_key.get())
         except Exception as e:
-            return f"Error while creating a new user: {str(e)}"
\ No newline at end of file
+            raise ToolError(f"Error while creating a new user: {str(e)}") from e
\ No newline at end of file
@@ -1,5 +1,6 @@
 from typing import Any
 
+from mcp_server.tools.base import ToolError, current_idempotency_key
 from mcp_server.tools.users.base import BaseUserServiceTool
 
 
@@ -15,6 +16,10 @@ class DeleteUserTool(BaseUserServiceTool):
         #TODO: Provide description of this tool
         return 'Deletes user by provided parameters'
 
+    @property
+    def annotations(self) -> dict[str, Any]:
+        return {"readOnlyHint": False, "destructiveHint": True, "idempotentHint": True, "openWorldHint": False}
+
     @property
     def input_schema(self) -> dict[str, Any]:
         #TODO:
@@ -36,6 +41,6 @@ class DeleteUserTool(BaseUserServiceTool):
         # 2. Call user_client delete_user and return its results (it is async, don't forget to await)
         try:
             delete_id = int(arguments.get('id'))
-            return await self._user_client.delete_user(delete_id)
+            return await self._user_client.delete_user(delete_id, current_idempotency_key.get())
         except Exception as e:
-            return f"Error while deleting user by id: {str(e)}"
\ No newline at end of file
+            raise ToolError(f"Error while deleting user by id: {str(e)}") from e
\ No newline at end of file
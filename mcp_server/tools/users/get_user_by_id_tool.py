@@ -1,5 +1,6 @@
 from typing import Any
 
+from mcp_server.tools.base import ToolError
 from mcp_server.tools.users.base import BaseUserServiceTool
 
 
@@ -15,6 +16,10 @@ class GetUserByIdTool(BaseUserServiceTool):
         #TODO: Provide description of this tool
         return "Gets user info by id"
 
+    @property
+    def annotations(self) -> dict[str, Any]:
+        return {"readOnlyHint": True, "idempotentHint": True, "openWorldHint": False}
+
     @property
     def input_schema(self) -> dict[str, Any]:
         #TODO:
@@ -38,4 +43,4 @@ class GetUserByIdTool(BaseUserServiceTool):
             get_id = int(arguments.get('id'))
             return await self._user_client.get_user(get_id)
         except Exception as e:
-            return f"Error while retrieving user by id: {str(e)}"
\ No newline at end of file
+            raise ToolError(f"Error while retrieving user by id: {str(e)}") from e
\ No newline at end of file
@@ -0,0 +1,61 @@
+import random
+from collections import deque
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.1, max_delay: float = 2.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before the given retry (1 for the first retry)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class RetryBudget:
+    """
+    Token bucket that caps retries to a fraction of regular traffic, so retries
+    can't multiply the load on an upstream that is already struggling.
+    Every request deposits `ratio` tokens, every retry withdraws one.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self.exhausted = 0
+
+    def deposit(self) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        self.exhausted += 1
+        return False
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+class LatencyTracker:
+    """Keeps the latest call durations to estimate latency percentiles"""
+
+    def __init__(self, window_size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window_size)
+
+    def record(self, duration: float) -> None:
+        self._samples.append(duration)
+
+    def percentile(self, p: float) -> float | None:
+        """Latency percentile (0 < p <= 1) or None until enough samples are collected"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
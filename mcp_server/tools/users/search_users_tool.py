@@ -1,5 +1,6 @@
 from typing import Any
 
+from mcp_server.tools.base import ToolError
 from mcp_server.tools.users.base import BaseUserServiceTool
 
 
@@ -15,6 +16,10 @@ class SearchUsersTool(BaseUserServiceTool):
         #TODO: Provide description of this tool
         return "Searches user by params name|surname|email|gender all params are optional"
 
+    @property
+    def annotations(self) -> dict[str, Any]:
+        return {"readOnlyHint": True, "idempotentHint": True, "openWorldHint": False}
+
     @property
     def input_schema(self) -> dict[str, Any]:
         #TODO:
@@ -52,4 +57,4 @@ class SearchUsersTool(BaseUserServiceTool):
         try:
             return await self._user_client.search_users(**arguments)
         except Exception as e:
-            return f"Error while searching user by id: {str(e)}"
\ No newline at end of file
+            raise ToolError(f"Error while searching user by id: {str(e)}") from e
\ No newline at end of file
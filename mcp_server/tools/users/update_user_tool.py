@@ -1,6 +1,7 @@
 from typing import Any
 
 from mcp_server.models.user_info import UserUpdate
+from mcp_server.tools.base import ToolError, current_idempotency_key
 from mcp_server.tools.users.base import BaseUserServiceTool
 
 
@@ -17,6 +18,10 @@ class UpdateUserTool(BaseUserServiceTool):
         #TODO: Provide description of this tool
         return 'Updates users by provided params'
 
+    @property
+    def annotations(self) -> dict[str, Any]:
+        return {"readOnlyHint": False, "destructiveHint": True, "idempotentHint": True, "openWorldHint": False}
+
     @property
     def input_schema(self) -> dict[str, Any]:
         #TODO:
@@ -43,7 +48,7 @@ class UpdateUserTool(BaseUserServiceTool):
         try:
             user_id = arguments["id"]
             user = UserUpdate.model_validate(arguments["new_info"])
-            return await self._user_client.update_user(user_id, user)
+            return await self._user_client.update_user(user_id, user, current_idempotency_key.get())
         except Exception as e:
-            return f"Error while creating a new user: {str(e)}"
+            raise ToolError(f"Error while updating user: {str(e)}") from e
 
@@ -1,14 +1,42 @@
+import asyncio
 import os
+import time
+from collections import OrderedDict
 from typing import Any, Optional
 
 import requests
 
 from mcp_server.models.user_info import UserUpdate, UserCreate
+from mcp_server.tools.users.circuit_breaker import CircuitBreaker, CircuitOpenError
+from mcp_server.tools.users.retry import RetryPolicy, RetryBudget, LatencyTracker
+from tracing.tracer import Tracer, inject_headers
 
 USER_SERVICE_ENDPOINT = os.getenv("USERS_MANAGEMENT_SERVICE_URL", "http://localhost:8041")
+USER_SERVICE_TIMEOUT = float(os.getenv("USERS_MANAGEMENT_SERVICE_TIMEOUT", "5"))
+USER_SERVICE_HEDGING = os.getenv("USERS_MANAGEMENT_SERVICE_HEDGING", "false").lower() == "true"
+# Set only when UMS deduplicates writes by `Idempotency-Key`, writes are never retried otherwise
+USER_SERVICE_IDEMPOTENT_WRITES = os.getenv("USERS_MANAGEMENT_SERVICE_IDEMPOTENT_WRITES", "false").lower() == "true"
+READ_CACHE_SIZE = 256
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+
+tracer = Tracer("mcp-server")
 
 class UserClient:
 
+    def __init__(self, hedge_reads: bool = USER_SERVICE_HEDGING, retry_writes: bool = USER_SERVICE_IDEMPOTENT_WRITES):
+        self.circuit_breaker = CircuitBreaker(
+            name="users-management-service",
+            slow_call_threshold=USER_SERVICE_TIMEOUT / 2,
+        )
+        self.retry_policy = RetryPolicy()
+        self.retry_budget = RetryBudget()
+        self.latency_tracker = LatencyTracker()
+        self.hedge_reads = hedge_reads
+        self.retry_writes = retry_writes
+        # Last successful read results, served while the circuit is open
+        self._read_cache: OrderedDict[str, str] = OrderedDict()
+
     def __user_to_string(self, user: dict[str, Any]):
         user_str = "```\n"
         for key, value in user.items():
@@ -25,14 +53,154 @@ class UserClient:
 
         return users_str
 
+    async def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send single HTTP request to UMS through the circuit breaker"""
+        self.circuit_breaker.before_call()
+
+        started = time.monotonic()
+        try:
+            with tracer.span("ums.http", method=method, url=url) as span:
+                kwargs["headers"] = inject_headers(dict(kwargs.get("headers") or {}))
+                response = await asyncio.to_thread(
+                    requests.request, method=method, url=url, timeout=USER_SERVICE_TIMEOUT, **kwargs
+                )
+                if span:
+                    span.set_attribute("status_code", response.status_code)
+        except asyncio.CancelledError:
+            # Lost a hedging race, the outcome is unknown
+            self.circuit_breaker.release()
+            raise
+        except requests.RequestException:
+            self.circuit_breaker.record_failure(time.monotonic() - started)
+            raise
+
+        duration = time.monotonic() - started
+        # Sustained throttling counts against UMS health like server errors, so the breaker backs callers off
+        if response.status_code >= 500 or response.status_code == 429:
+            self.circuit_breaker.record_failure(duration)
+        else:
+            self.circuit_breaker.record_success(duration)
+            self.latency_tracker.record(duration)
+        return response
+
+    async def _send_hedged(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Fire a second request if the first one is slower than p95, first successful answer wins.
+        Cancelling the loser does not stop its `requests` call in the worker thread: it still reaches UMS
+        and runs until it completes or hits USER_SERVICE_TIMEOUT, while the circuit breaker has already
+        released it without an outcome. Only reads are hedged, so the extra request has no side effects.
+        """
+        hedge_delay = self.latency_tracker.percentile(0.95)
+        primary = asyncio.create_task(self._send(method, url, **kwargs))
+        if hedge_delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        pending = {primary, asyncio.create_task(self._send(method, url, **kwargs))}
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    async def _send_with_retries(self, method: str, url: str, hedge: bool = False, **kwargs) -> requests.Response:
+        """
+        Send request that is safe to repeat. Connection errors, timeouts and retryable statuses are
+        retried with jittered exponential backoff while attempts and retry budget are left.
+        """
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            error: Exception | None = None
+            response: requests.Response | None = None
+            try:
+                if hedge:
+                    response = await self._send_hedged(method, url, **kwargs)
+                else:
+                    response = await self._send(method, url, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+
+            attempt += 1
+            if attempt >= self.retry_policy.max_attempts or not self.retry_budget.try_withdraw():
+                if error:
+                    raise error
+                return response
+
+            delay = self.retry_policy.backoff(attempt)
+            print(f"Retrying {method} {url} in {delay:.2f}s (attempt {attempt + 1})")
+            await asyncio.sleep(delay)
+
+    async def _send_write(self, method: str, url: str, idempotency_key: Optional[str] = None, **kwargs) -> requests.Response:
+        """
+        Writes are sent exactly once. They are retried only with a client supplied idempotency key
+        and when UMS is configured as deduplicating by it (`retry_writes`)
+        """
+        if not idempotency_key:
+            return await self._send(method, url, **kwargs)
+
+        kwargs["headers"] = {**kwargs.get("headers", {}), IDEMPOTENCY_KEY_HEADER: idempotency_key}
+        if not self.retry_writes:
+            return await self._send(method, url, **kwargs)
+        return await self._send_with_retries(method, url, **kwargs)
+
+    async def health_check(self) -> bool:
+        """Check that UMS is reachable, bypasses the circuit breaker and retries"""
+        try:
+            response = await asyncio.to_thread(
+                requests.get, url=f"{USER_SERVICE_ENDPOINT}/health", timeout=min(USER_SERVICE_TIMEOUT, 2.0)
+            )
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def _cache_read(self, key: str, value: str) -> None:
+        self._read_cache[key] = value
+        self._read_cache.move_to_end(key)
+        if len(self._read_cache) > READ_CACHE_SIZE:
+            self._read_cache.popitem(last=False)
+
+    def _invalidate_reads(self, user_id: Optional[int] = None) -> None:
+        """After a write any cached search may be stale, only the written user's entry otherwise"""
+        if user_id is not None:
+            self._read_cache.pop(f"user:{user_id}", None)
+        for key in [key for key in self._read_cache if key.startswith("search:")]:
+            del self._read_cache[key]
+
+    def _cached_read(self, key: str, error: CircuitOpenError) -> str:
+        if key in self._read_cache:
+            return f"(UMS is unavailable, showing cached data)\n{self._read_cache[key]}"
+        raise error
+
     async def get_user(self, user_id: int) -> str:
         headers = {"Content-Type": "application/json"}
+        cache_key = f"user:{user_id}"
 
-        response = requests.get(url=f"{USER_SERVICE_ENDPOINT}/v1/users/{user_id}", headers=headers)
+        try:
+            response = await self._send_with_retries(
+                "GET",
+                url=f"{USER_SERVICE_ENDPOINT}/v1/users/{user_id}",
+                hedge=self.hedge_reads,
+                headers=headers
+            )
+        except CircuitOpenError as e:
+            return self._cached_read(cache_key, e)
 
         if response.status_code == 200:
             data = response.json()
-            return self.__user_to_string(data)
+            user_str = self.__user_to_string(data)
+            self._cache_read(cache_key, user_str)
+            return user_str
 
         raise Exception(f"HTTP {response.status_code}: {response.text}")
 
@@ -54,50 +222,79 @@ class UserClient:
             params["email"] = email
         if gender:
             params["gender"] = gender
+        cache_key = f"search:{sorted(params.items())}"
 
-        response = requests.get(url=USER_SERVICE_ENDPOINT + "/v1/users/search", headers=headers, params=params)
+        try:
+            response = await self._send_with_retries(
+                "GET",
+                url=USER_SERVICE_ENDPOINT + "/v1/users/search",
+                hedge=self.hedge_reads,
+                headers=headers,
+                params=params
+            )
+        except CircuitOpenError as e:
+            return self._cached_read(cache_key, e)
 
         if response.status_code == 200:
             data = response.json()
             print(f"Get {len(data)} users successfully")
-            return self.__users_to_string(data)
+            users_str = self.__users_to_string(data)
+            self._cache_read(cache_key, users_str)
+            return users_str
 
         raise Exception(f"HTTP {response.status_code}: {response.text}")
 
-    async def add_user(self, user_create_model: UserCreate) -> str:
+    async def add_user(self, user_create_model: UserCreate, idempotency_key: Optional[str] = None) -> str:
         headers = {"Content-Type": "application/json"}
 
-        response = requests.post(
+        response = await self._send_write(
+            "POST",
             url=f"{USER_SERVICE_ENDPOINT}/v1/users",
+            idempotency_key=idempotency_key,
             headers=headers,
             json=user_create_model.model_dump()
         )
 
         if response.status_code == 201:
+            self._invalidate_reads()
             return f"User successfully added: {response.text}"
 
         raise Exception(f"HTTP {response.status_code}: {response.text}")
 
-    async def update_user(self, user_id: int, user_update_model: UserUpdate) -> str:
+    async def update_user(
+            self,
+            user_id: int,
+            user_update_model: UserUpdate,
+            idempotency_key: Optional[str] = None
+    ) -> str:
         headers = {"Content-Type": "application/json"}
 
-        response = requests.put(
+        response = await self._send_write(
+            "PUT",
             url=f"{USER_SERVICE_ENDPOINT}/v1/users/{user_id}",
+            idempotency_key=idempotency_key,
             headers=headers,
             json=user_update_model.model_dump()
         )
 
         if response.status_code == 201:
+            self._invalidate_reads(user_id)
             return f"User successfully updated: {response.text}"
 
         raise Exception(f"HTTP {response.status_code}: {response.text}")
 
-    async def delete_user(self, user_id: int) -> str:
+    async def delete_user(self, user_id: int, idempotency_key: Optional[str] = None) -> str:
         headers = {"Content-Type": "application/json"}
 
-        response = requests.delete(url=f"{USER_SERVICE_ENDPOINT}/v1/users/{user_id}", headers=headers)
+        response = await self._send_write(
+            "DELETE",
+            url=f"{USER_SERVICE_ENDPOINT}/v1/users/{user_id}",
+            idempotency_key=idempotency_key,
+            headers=headers
+        )
 
         if response.status_code == 204:
+            self._invalidate_reads(user_id)
             return "User successfully deleted"
 
         raise Exception(f"HTTP {response.status_code}: {response.text}")
@@ -0,0 +1,76 @@
+import pytest
+
+from mcp_server.tools.users import circuit_breaker
+from mcp_server.tools.users.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _breaker() -> CircuitBreaker:
+    return CircuitBreaker("ums", window_size=4, min_calls=4, slow_call_threshold=1.0, open_timeout=10.0)
+
+
+def _call(breaker: CircuitBreaker, failed: bool = False, duration: float = 0.1) -> None:
+    breaker.before_call()
+    if failed:
+        breaker.record_failure(duration)
+    else:
+        breaker.record_success(duration)
+
+
+def test_opens_on_error_rate_once_min_calls_are_recorded(clock):
+    breaker = _breaker()
+
+    for failed in (True, True, False):
+        _call(breaker, failed)
+    assert breaker.state == CircuitState.CLOSED
+    _call(breaker)
+
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.rejected_calls == 1
+
+
+def test_opens_on_slow_call_rate(clock):
+    breaker = _breaker()
+
+    for duration in (2.0, 0.1, 2.0, 0.1):
+        _call(breaker, duration=duration)
+
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_half_open_allows_one_probe_and_closes_on_success(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        _call(breaker, failed=True)
+
+    clock[0] += 10.0
+    breaker.before_call()
+    assert breaker.state == CircuitState.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.snapshot()["window_calls"] == 0
+
+
+def test_failed_probe_opens_again_and_abandoned_probe_frees_its_slot(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        _call(breaker, failed=True)
+
+    clock[0] += 10.0
+    breaker.before_call()
+    breaker.release()
+    _call(breaker, failed=True)
+
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.snapshot()["retry_after_seconds"] == 10.0
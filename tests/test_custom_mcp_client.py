@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from agent.clients.custom_mcp_client import CustomMCPClient
+
+
+async def _serve(not_found_body: str):
+    """MCP endpoint that answers requests of the first session with 404 and `not_found_body`"""
+    received, sessions = [], iter(f"session-{i}" for i in range(10))
+
+    async def mcp(request: web.Request) -> web.Response:
+        body = await request.json()
+        session_id = request.headers.get("mcp-session-id")
+        received.append((body["method"], session_id))
+        if body["method"] == "initialize":
+            result = {"protocolVersion": "2024-11-05", "capabilities": {}, "serverInfo": {"name": "fake"}}
+            return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": result},
+                                     headers={"Mcp-Session-Id": next(sessions)})
+        if "id" not in body:
+            return web.Response(status=202)
+        if session_id == "session-0":
+            return web.Response(status=404, text=not_found_body)
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": {"tools": []}})
+
+    app = web.Application()
+    app.router.add_post("/mcp", mcp)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/mcp", received
+
+
+def _list_tools(not_found_body: str):
+    async def main():
+        runner, url, received = await _serve(not_found_body)
+        try:
+            async with CustomMCPClient(url) as client:
+                client.recovery_backoff = 0
+                try:
+                    return await client.get_tools(), received
+                except RuntimeError as e:
+                    return e, received
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_404_of_an_expired_session_reinitializes_and_replays():
+    tools, received = _list_tools("Not Found: Invalid or expired session ID")
+
+    assert tools == []
+    assert [method for method, _ in received].count("initialize") == 2
+    assert received[-1] == ("tools/list", "session-1")
+
+
+def test_plain_404_is_not_treated_as_session_loss():
+    error, received = _list_tools("404: Not Found")
+
+    assert isinstance(error, RuntimeError) and "HTTP 404" in str(error)
+    assert [method for method, _ in received] == ["initialize", "notifications/initialized", "tools/list"]
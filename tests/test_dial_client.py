@@ -0,0 +1,113 @@
+import asyncio
+import functools
+
+from agent.clients.custom_mcp_client import CustomMCPClient
+from agent.clients.dial_client import DialClient
+from agent.mcp_router import MCPRouter
+from agent.models.message import Message, Role
+from agent.tool_result_cache import ToolResultCache
+
+
+class FakeMCPClient:
+    server_url = "fake://ums"
+    tool_annotations = {
+        "get_user": {"readOnlyHint": True},
+        "add_user": {"readOnlyHint": False},
+    }
+
+    def __init__(self, events: list[str]):
+        self.events = events
+
+    async def call_tool(self, tool_name, tool_args):
+        self.events.append(f"call {tool_name}")
+        return f"{tool_name} ok"
+
+
+def _tool_call(call_id: str, name: str, arguments: str) -> dict:
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": arguments}}
+
+
+def _client(events: list[str], responses: list[tuple[list[dict], list[dict]]]) -> DialClient:
+    """DialClient whose LLM streams `responses`: tool calls as seen while streaming and in the final message"""
+    mcp_client = FakeMCPClient(events)
+    dial_client = DialClient(
+        api_key="test",
+        endpoint="http://localhost",
+        tools=[],
+        tool_name_client_map={"get_user": mcp_client, "add_user": mcp_client},
+    )
+
+    async def stream_response(messages, on_tool_call=None, on_token=None, step=None, allow_tools=True):
+        streamed, final = responses.pop(0)
+        for tool_call in streamed:
+            if on_tool_call:
+                on_tool_call(tool_call)
+            await asyncio.sleep(0)
+        events.append("stream end")
+        return Message(role=Role.AI, content=None if final else "done", tool_calls=final or None)
+
+    dial_client._stream_response = stream_response
+    return dial_client
+
+
+def test_only_read_only_tools_are_dispatched_early():
+    events = []
+    calls = [_tool_call("1", "get_user", '{"id": 1}'), _tool_call("2", "add_user", '{"name": "John"}')]
+    dial_client = _client(events, [(calls, calls), ([], [])])
+
+    asyncio.run(dial_client.get_completion([Message(role=Role.USER, content="hi")], ToolResultCache()))
+
+    assert events.index("call get_user") < events.index("stream end")
+    assert events.index("call add_user") > events.index("stream end")
+    assert events.count("call get_user") == events.count("call add_user") == 1
+
+
+def test_whitespace_in_final_arguments_reuses_the_early_call():
+    events = []
+    streamed = [_tool_call("1", "get_user", '{"id": 1}')]
+    final = [_tool_call("1", "get_user", '{"id":1} ')]
+    dial_client = _client(events, [(streamed, final), ([], [])])
+
+    messages = [Message(role=Role.USER, content="hi")]
+    asyncio.run(dial_client.get_completion(messages, ToolResultCache()))
+
+    assert events.count("call get_user") == 1
+    assert [message.content for message in messages if message.role == Role.TOOL] == ["get_user ok"]
+
+
+def test_changed_arguments_are_called_again():
+    events = []
+    streamed = [_tool_call("1", "get_user", '{"id": 1}')]
+    final = [_tool_call("1", "get_user", '{"id": 12}')]
+    dial_client = _client(events, [(streamed, final), ([], [])])
+
+    asyncio.run(dial_client.get_completion([Message(role=Role.USER, content="hi")], ToolResultCache()))
+
+    assert events.count("call get_user") == 2
+
+
+def test_concurrency_is_limited_per_replica():
+    in_flight, peaks = {}, {}
+
+    async def send_request(client, method, params=None):
+        in_flight[client.server_url] = in_flight.get(client.server_url, 0) + 1
+        peaks[client.server_url] = max(peaks.get(client.server_url, 0), in_flight[client.server_url])
+        await asyncio.sleep(0.01)
+        in_flight[client.server_url] -= 1
+        return {"result": {"content": [{"type": "text", "text": "ok"}]}}
+
+    replicas = []
+    for url in ("http://a/mcp", "http://b/mcp"):
+        replica = CustomMCPClient(url, max_concurrent_calls=2)
+        replica.http_session = object()
+        replica._send_request = functools.partial(send_request, replica)
+        replicas.append(replica)
+    router = MCPRouter(replicas)
+    dial_client = DialClient(api_key="test", endpoint="http://localhost", tools=[], tool_name_client_map={"get_user": router})
+
+    ai_message = Message(role=Role.AI, tool_calls=[_tool_call(str(i), "get_user", "{}") for i in range(8)])
+    messages = []
+    asyncio.run(dial_client._call_tools(ai_message, messages))
+
+    assert [message.content for message in messages] == ["ok"] * 8
+    assert peaks == {"http://a/mcp": 2, "http://b/mcp": 2}
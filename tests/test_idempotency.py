@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from mcp_server.models.request import MCPRequest
+from mcp_server.models.response import MCPResponse
+from mcp_server.services.idempotency import IdempotencyStore, IdempotencyConflictError
+from mcp_server.services.mcp_server import MCPServer
+from mcp_server.tools.base import BaseTool, ToolError
+
+
+class CountingTool(BaseTool):
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+
+    @property
+    def name(self) -> str:
+        return "count"
+
+    @property
+    def description(self) -> str:
+        return "Counts calls"
+
+    @property
+    def input_schema(self):
+        return {"type": "object", "properties": {}}
+
+    async def execute(self, arguments):
+        self.calls += 1
+        if self.fail:
+            raise ToolError("Error while counting: unavailable")
+        return f"call {self.calls}"
+
+
+def _server(tool: CountingTool) -> MCPServer:
+    server = MCPServer()
+    server.tools[tool.name] = tool
+    return server
+
+
+def _call(request_id, arguments=None, key=None) -> MCPRequest:
+    params = {"name": "count", "arguments": arguments or {}}
+    if key:
+        params["_meta"] = {"idempotencyKey": key}
+    return MCPRequest(id=request_id, method="tools/call", params=params)
+
+
+def test_store_replays_and_joins():
+    store, calls = IdempotencyStore(), []
+
+    async def execute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return MCPResponse(id=1, result={"content": []})
+
+    async def main():
+        first, joined = await asyncio.gather(store.run("k", execute), store.run("k", execute))
+        replayed = await store.run("k", execute)
+        return first, joined, replayed
+
+    first, joined, replayed = asyncio.run(main())
+    assert len(calls) == 1
+    assert first is joined is replayed
+    assert (store.misses, store.joined, store.hits) == (1, 1, 1)
+
+
+def test_waiter_takes_over_a_cancelled_execution():
+    store, calls = IdempotencyStore(), []
+
+    async def execute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return MCPResponse(id=len(calls), result={"content": []})
+
+    async def main():
+        first = asyncio.create_task(store.run("k", execute))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(store.run("k", execute)) for _ in range(2)]
+        await asyncio.sleep(0)
+        first.cancel()
+        return await asyncio.gather(*waiters), first
+
+    responses, first = asyncio.run(main())
+    assert first.cancelled()
+    assert [response.id for response in responses] == [2, 2]
+    assert len(calls) == 2
+
+
+def test_store_rejects_key_reused_with_other_arguments():
+    store = IdempotencyStore()
+
+    async def execute():
+        return MCPResponse(id=1, result={"content": []})
+
+    async def main():
+        await store.run("k", execute, fingerprint="a")
+        await store.run("k", execute, fingerprint="b")
+
+    with pytest.raises(IdempotencyConflictError):
+        asyncio.run(main())
+
+
+def test_tool_failure_is_marked_and_not_replayed():
+    tool = CountingTool(fail=True)
+    server = _server(tool)
+
+    async def main():
+        return [await server.handle_tools_call(_call(i, key="same"), "session") for i in range(2)]
+
+    responses = asyncio.run(main())
+    assert tool.calls == 2
+    assert responses[0].result["isError"] is True
+    assert responses[0].result["content"][0]["text"] == "Error while counting: unavailable"
+
+
+def test_explicit_key_is_scoped_to_session():
+    tool = CountingTool()
+    server = _server(tool)
+
+    async def main():
+        a = await server.handle_tools_call(_call(1, key="same"), "session-a")
+        a_again = await server.handle_tools_call(_call(2, key="same"), "session-a")
+        b = await server.handle_tools_call(_call(3, key="same"), "session-b")
+        return a, a_again, b
+
+    a, a_again, b = asyncio.run(main())
+    assert a.result == a_again.result and a_again.id == 2
+    assert b.result["content"][0]["text"] == "call 2"
+    assert tool.calls == 2
+
+
+def test_explicit_key_reused_with_other_arguments_is_rejected():
+    server = _server(CountingTool())
+
+    async def main():
+        await server.handle_tools_call(_call(1, {"x": 1}, key="same"), "session")
+        return await server.handle_tools_call(_call(2, {"x": 2}, key="same"), "session")
+
+    response = asyncio.run(main())
+    assert response.error.code == -32602
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from agent.mcp_router import MCPRouter
+
+
+class FakeClient:
+
+    def __init__(self, url: str, healthy: bool = True):
+        self.server_url = url
+        self.server_info = {}
+        self.tool_annotations = {}
+        self.on_tools_list_changed = None
+        self.healthy = healthy
+        self.calls = 0
+        self.pings = 0
+
+    async def call_tool(self, tool_name, tool_args):
+        self.calls += 1
+        if not self.healthy:
+            raise RuntimeError("unavailable")
+        return self.server_url
+
+    async def ping(self):
+        self.pings += 1
+        if not self.healthy:
+            raise RuntimeError("unavailable")
+
+    async def close(self):
+        pass
+
+
+def test_idle_replicas_are_picked_by_latency():
+    fast, slow = FakeClient("fast"), FakeClient("slow")
+    router = MCPRouter([slow, fast])
+    router.endpoints[0].latency_ewma, router.endpoints[1].latency_ewma = 0.5, 0.1
+
+    async def main():
+        return [await router.call_tool("tool", {}) for _ in range(5)]
+
+    assert asyncio.run(main()) == ["fast"] * 5
+    assert slow.calls == 0
+
+
+def test_ejected_replica_returns_after_a_successful_probe():
+    flaky, stable = FakeClient("flaky", healthy=False), FakeClient("stable")
+    router = MCPRouter([flaky, stable], max_consecutive_failures=1, base_ejection_time=60.0, probe_interval=0.01)
+    router.endpoints[1].latency_ewma = 1.0
+
+    async def main():
+        try:
+            await router.call_tool("tool", {})
+        except RuntimeError:
+            pass
+        ejected = not router.endpoints[0].available(time.monotonic())
+        await asyncio.sleep(0.05)
+        still_ejected = not router.endpoints[0].available(time.monotonic())
+        flaky.healthy = True
+        await asyncio.sleep(0.05)
+        return ejected, still_ejected, await router.call_tool("tool", {})
+
+    ejected, still_ejected, picked = asyncio.run(main())
+    assert ejected and still_ejected
+    assert flaky.pings >= 2
+    assert picked == "flaky"
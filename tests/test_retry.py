@@ -0,0 +1,35 @@
+import pytest
+
+from mcp_server.tools.users.retry import RetryBudget, RetryPolicy
+
+
+def test_budget_allows_retries_for_a_fraction_of_requests():
+    budget = RetryBudget(ratio=0.5, max_tokens=2.0)
+
+    assert budget.try_withdraw() and budget.try_withdraw()
+    assert not budget.try_withdraw()
+    assert budget.exhausted == 1
+
+    budget.deposit()
+    assert not budget.try_withdraw()
+    budget.deposit()
+    assert budget.try_withdraw()
+
+
+def test_budget_is_capped():
+    budget = RetryBudget(ratio=1.0, max_tokens=3.0)
+
+    for _ in range(10):
+        budget.deposit()
+
+    assert budget.tokens == 3.0
+
+
+@pytest.mark.parametrize("attempt, cap", [(1, 0.2), (2, 0.4), (10, 2.0)])
+def test_backoff_is_jittered_below_the_exponential_cap(attempt, cap):
+    policy = RetryPolicy(base_delay=0.1, max_delay=2.0)
+
+    delays = [policy.backoff(attempt) for _ in range(200)]
+
+    assert all(0 <= delay <= cap for delay in delays)
+    assert len(set(delays)) > 1
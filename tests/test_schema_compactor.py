@@ -0,0 +1,91 @@
+from agent.clients.schema_compactor import compact_schema, DEDUPLICATE_MIN_CHARS
+
+
+def _refs(schema, found=None):
+    found = set() if found is None else found
+    if isinstance(schema, dict):
+        if "$ref" in schema:
+            found.add(schema["$ref"].rsplit("/", 1)[-1])
+        for value in schema.values():
+            _refs(value, found)
+    elif isinstance(schema, list):
+        for item in schema:
+            _refs(item, found)
+    return found
+
+
+def test_inlines_single_ref_and_strips_noise():
+    schema = {
+        "type": "object",
+        "title": "Request",
+        "properties": {
+            "address": {"$ref": "#/$defs/Address"},
+            "nickname": {"anyOf": [{"type": "string"}, {"type": "null"}], "default": None, "title": "Nickname"},
+        },
+        "$defs": {"Address": {"type": "object", "title": "Address", "properties": {"city": {"type": "string"}}}},
+    }
+    assert compact_schema(schema) == {
+        "type": "object",
+        "properties": {
+            "address": {"type": "object", "properties": {"city": {"type": "string"}}},
+            "nickname": {"type": "string"},
+        },
+    }
+
+
+def test_large_definition_used_twice_is_hoisted_once():
+    big = {"type": "object", "properties": {f"field_{i}": {"type": "string"} for i in range(20)}}
+    schema = {
+        "type": "object",
+        "properties": {"home": {"$ref": "#/$defs/Address"}, "work": {"$ref": "#/$defs/Address"}},
+        "$defs": {"Address": big},
+    }
+    compacted = compact_schema(schema)
+    assert len(str(big)) >= DEDUPLICATE_MIN_CHARS
+    assert compacted["properties"]["home"] == {"$ref": "#/$defs/Address"}
+    assert compacted["$defs"] == {"Address": big}
+
+
+def test_recursive_definition_keeps_ref_and_is_hoisted():
+    schema = {
+        "type": "object",
+        "properties": {"root": {"$ref": "#/$defs/Node"}},
+        "$defs": {
+            "Node": {
+                "type": "object",
+                "properties": {"children": {"type": "array", "items": {"$ref": "#/$defs/Node"}}},
+            }
+        },
+    }
+    compacted = compact_schema(schema)
+    assert _refs(compacted) <= set(compacted.get("$defs", {}))
+    assert compacted["$defs"]["Node"]["properties"]["children"]["items"] == {"$ref": "#/$defs/Node"}
+
+
+def test_mutually_recursive_definitions_have_no_dangling_refs():
+    schema = {
+        "type": "object",
+        "properties": {"a": {"$ref": "#/$defs/A"}, "b": {"$ref": "#/$defs/B"}},
+        "$defs": {
+            "A": {"type": "object", "properties": {"b": {"$ref": "#/$defs/B"}}},
+            "B": {"type": "object", "properties": {"a": {"$ref": "#/$defs/A"}}},
+        },
+    }
+    compacted = compact_schema(schema)
+    assert _refs(compacted) <= set(compacted.get("$defs", {}))
+
+
+def test_nested_descriptions_dropped_over_cap():
+    schema = {
+        "type": "object",
+        "properties": {
+            "user": {
+                "type": "object",
+                "description": "The user",
+                "properties": {"name": {"type": "string", "description": "x" * 200}},
+            }
+        },
+    }
+    compacted = compact_schema(schema, max_chars=100)
+    assert compacted["properties"]["user"]["description"] == "The user"
+    assert "description" not in compacted["properties"]["user"]["properties"]["name"]
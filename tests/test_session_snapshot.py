@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from mcp_server.models.request import MCPRequest
+from mcp_server.services import mcp_server as mcp_server_module
+from mcp_server.services.mcp_server import MCPServer
+
+
+def test_worker_snapshots_are_merged(tmp_path):
+    path = str(tmp_path / "sessions.json")
+
+    async def main():
+        workers = [MCPServer(), MCPServer()]
+        session_ids = [worker.handle_initialize(MCPRequest(id=1, method="initialize"))[1] for worker in workers]
+        for worker in workers:
+            worker.snapshot_sessions(path)
+
+        restarted = MCPServer()
+        restored = restarted.restore_sessions(path)
+        return session_ids, restored, restarted
+
+    session_ids, restored, restarted = asyncio.run(main())
+    assert restored == 2
+    assert set(session_ids) == set(restarted.sessions)
+
+
+def test_idle_sessions_are_not_merged(tmp_path):
+    path = str(tmp_path / "sessions.json")
+
+    async def main():
+        old = MCPServer()
+        old.handle_initialize(MCPRequest(id=1, method="initialize"))
+        old.snapshot_sessions(path)
+
+        current = MCPServer()
+        current.snapshot_sessions(path, max_idle=-1)
+        return current.restore_sessions(path)
+
+    assert asyncio.run(main()) == 0
+
+
+@pytest.fixture
+def signed_sessions(monkeypatch):
+    monkeypatch.setattr(mcp_server_module, "SESSION_SECRET", "secret")
+
+
+def test_adopted_session_is_ready_only_after_its_handshake(tmp_path, signed_sessions):
+    path = str(tmp_path / "sessions.json")
+
+    async def main():
+        first, second = MCPServer(snapshot_path=path), MCPServer(snapshot_path=path)
+        _, session_id = first.handle_initialize(MCPRequest(id=1, method="initialize"))
+
+        before = second.get_session(session_id).ready_for_operation
+        await first.mark_ready(first.get_session(session_id))
+        after = second.get_session(session_id).ready_for_operation
+        forged = second.get_session(session_id[:-1] + ("0" if session_id[-1] != "0" else "1"))
+        return before, after, forged
+
+    before, after, forged = asyncio.run(main())
+    assert (before, after, forged) == (False, True, None)
+
+
+def test_signed_session_expires(tmp_path, signed_sessions, monkeypatch):
+    async def main():
+        first, second = MCPServer(), MCPServer()
+        _, session_id = first.handle_initialize(MCPRequest(id=1, method="initialize"))
+        monkeypatch.setattr(mcp_server_module, "SESSION_TTL", -1.0)
+        return first.get_session(session_id), second.get_session(session_id), session_id in first.sessions
+
+    assert asyncio.run(main()) == (None, None, False)
+
+
+def test_readiness_waits_for_warm_up_and_caches_ums_health():
+    server = MCPServer()
+    checks = []
+
+    async def health_check():
+        checks.append(1)
+        return True
+
+    server.user_client.health_check = health_check
+
+    async def main():
+        before = await server.check_readiness()
+        await server.warm_up()
+        return before, [await server.check_readiness() for _ in range(3)]
+
+    before, after = asyncio.run(main())
+    assert before["ready"] is False and before["checks"]["warmed_up"] is False
+    assert all(readiness["ready"] for readiness in after)
+    assert len(checks) == 1
@@ -0,0 +1,52 @@
+import pytest
+
+from agent.clients.sse import SSEDecoder
+
+
+def _decode(*chunks: bytes) -> list:
+    decoder = SSEDecoder()
+    events = [event for chunk in chunks for event in decoder.feed(chunk)]
+    return events + decoder.finish()
+
+
+@pytest.mark.parametrize("newline", [b"\n", b"\r", b"\r\n"])
+def test_line_endings(newline):
+    stream = newline.join([b"event: message", b"id: 7", b"data: one", b"data: two", b"", b"data: three", b"", b""])
+
+    events = _decode(stream)
+
+    assert [(event.event, event.id, event.data) for event in events] == [
+        ("message", "7", "one\ntwo"),
+        ("message", "7", "three"),
+    ]
+
+
+def test_crlf_split_across_chunks_is_one_line_ending():
+    events = _decode(b"data: first\r", b"\n\r", b"\ndata: second\r\n\r\n")
+
+    assert [event.data for event in events] == ["first", "second"]
+
+
+def test_every_chunk_split_gives_the_same_events():
+    stream = 'data: {"text": "привет"}\r\n\r\n: ping\r\ndata: ok\r\n\r\n'.encode("utf-8")
+
+    for split in range(1, len(stream)):
+        events = _decode(stream[:split], stream[split:])
+        assert [event.data for event in events] == ['{"text": "привет"}', "ok"], split
+
+
+def test_utf8_split_byte_by_byte():
+    stream = "data: ✓ héllo\n\n".encode("utf-8")
+
+    events = _decode(*(stream[i:i + 1] for i in range(len(stream))))
+
+    assert [event.data for event in events] == ["✓ héllo"]
+
+
+def test_event_without_trailing_blank_line_is_flushed_by_finish():
+    decoder = SSEDecoder()
+
+    assert decoder.feed(b"retry: 1500\ndata: last\r") == []
+    events = decoder.finish()
+
+    assert [(event.data, event.retry) for event in events] == [("last", 1500)]
@@ -0,0 +1,47 @@
+import asyncio
+import json
+import sys
+
+
+async def _exchange(*lines) -> list:
+    """Responses of `python -m mcp_server.stdio` to the given lines, read until stdin is closed"""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "mcp_server.stdio",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    stdin = b"".join(json.dumps(line).encode("utf-8") + b"\n" for line in lines)
+    stdout, _ = await asyncio.wait_for(process.communicate(stdin), 30)
+    return [json.loads(line) for line in stdout.splitlines()]
+
+
+HANDSHAKE = [
+    {"jsonrpc": "2.0", "id": 0, "method": "initialize", "params": {"protocolVersion": "2024-11-05"}},
+    {"jsonrpc": "2.0", "method": "notifications/initialized"},
+]
+
+
+def test_batch_is_answered_with_one_array():
+    responses = asyncio.run(_exchange(*HANDSHAKE, [
+        {"jsonrpc": "2.0", "id": 1, "method": "ping"},
+        {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {}},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/list"},
+        {"jsonrpc": "2.0", "id": 3, "method": "initialize", "params": {}},
+    ]))
+
+    assert responses[0]["id"] == 0
+    batch = responses[1]
+    assert isinstance(batch, list) and len(responses) == 2
+    by_id = {response["id"]: response for response in batch}
+    assert set(by_id) == {1, 2, 3}
+    assert by_id[1]["result"] == {}
+    assert by_id[2]["result"]["tools"]
+    assert by_id[3]["error"]["code"] == -32600
+
+
+def test_notification_only_batch_gets_no_response():
+    responses = asyncio.run(_exchange(*HANDSHAKE, [{"jsonrpc": "2.0", "method": "notifications/cancelled"}], []))
+
+    assert responses[0]["id"] == 0
+    assert responses[1:] == [{"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Empty batch"}}]
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from agent.clients.tool_call_assembler import ToolCallAssembler
+
+
+def _delta(index: int, id=None, name=None, arguments=None):
+    function = SimpleNamespace(name=name, arguments=arguments) if name or arguments else None
+    return SimpleNamespace(index=index, id=id, type="function" if id else None, function=function)
+
+
+def test_call_is_reported_once_its_arguments_parse():
+    completed = []
+    assembler = ToolCallAssembler(on_complete=completed.append)
+
+    assembler.add(_delta(0, id="call_1", name="get_user", arguments='{"user_id": '))
+    assert completed == []
+    assembler.add(_delta(0, arguments="1}"))
+    assert [call["id"] for call in completed] == ["call_1"]
+    assert completed[0]["function"] == {"name": "get_user", "arguments": '{"user_id": 1}'}
+
+    assembler.add(_delta(0, arguments=" "))
+    assert len(completed) == 1
+
+
+def test_braces_inside_strings_do_not_complete_the_call():
+    completed = []
+    assembler = ToolCallAssembler(on_complete=completed.append)
+
+    assembler.add(_delta(0, id="call_1", name="search", arguments='{"name": "}'))
+    assert completed == []
+    assembler.add(_delta(0, arguments='"}'))
+    assert len(completed) == 1
+
+
+def test_next_index_completes_the_previous_call():
+    completed = []
+    assembler = ToolCallAssembler(on_complete=completed.append)
+
+    assembler.add(_delta(0, id="call_1", name="list_users"))
+    assembler.add(_delta(1, id="call_2", name="get_user", arguments='{"user_id"'))
+    assert [call["id"] for call in completed] == ["call_1"]
+
+    calls = assembler.finish()
+
+    assert [call["id"] for call in completed] == ["call_1", "call_2"]
+    assert [call["id"] for call in calls] == ["call_1", "call_2"]
+
+
+def test_call_without_id_or_name_is_not_reported():
+    completed = []
+    assembler = ToolCallAssembler(on_complete=completed.append)
+
+    assembler.add(_delta(0, arguments="{}"))
+
+    assert len(assembler.finish()) == 1
+    assert completed == []
@@ -0,0 +1,50 @@
+import asyncio
+
+from agent import tool_registry
+from agent.models.mcp_server_config import MCPServerConfig
+from agent.tool_catalog_cache import ToolCatalogCache
+from agent.tool_registry import connect_servers
+
+
+class FakeClient:
+
+    def __init__(self, url: str, tool_name: str):
+        self.server_url = url
+        self.server_info = {"name": "fake", "version": "1"}
+        self.tool_annotations = {}
+        self.on_tools_list_changed = None
+        self.tool_name = tool_name
+        self.tools_list_calls = 0
+
+    async def get_tools(self):
+        self.tools_list_calls += 1
+        return [{"type": "function", "function": {"name": self.tool_name, "parameters": {}}}]
+
+    async def close(self):
+        pass
+
+
+def test_catalog_cache_is_keyed_by_replica_urls(tmp_path, monkeypatch):
+    clients = []
+    tool_names = {"http://a/mcp": "from_a", "http://b/mcp": "from_b"}
+
+    async def connect_endpoint(config):
+        clients.append(FakeClient(config.url, tool_names[config.url]))
+        return clients[-1]
+
+    monkeypatch.setattr(tool_registry, "_connect_endpoint", connect_endpoint)
+    cache = ToolCatalogCache(str(tmp_path / "catalog.json"))
+
+    async def tools_of(url: str) -> list[str]:
+        registry = await connect_servers([MCPServerConfig(url=url, name="ums")], cache)
+        tools = [tool["function"]["name"] for tool in registry.tools]
+        await registry.close()
+        return tools
+
+    async def main():
+        return await tools_of("http://a/mcp"), await tools_of("http://b/mcp"), await tools_of("http://a/mcp")
+
+    a, b, a_again = asyncio.run(main())
+    assert (a, b, a_again) == (["ums__from_a"], ["ums__from_b"], ["ums__from_a"])
+    # The second connection to A starts from the cache, the revalidation is cancelled on close
+    assert [client.tools_list_calls for client in clients[:2]] == [1, 1]
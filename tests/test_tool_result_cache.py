@@ -0,0 +1,58 @@
+from mcp.types import TextContent
+
+from agent.tool_result_cache import ToolResultCache
+
+
+class FakeClient:
+    tool_annotations = {"get_user": {"readOnlyHint": True}}
+
+
+def test_hit_ignores_key_order_and_nulls():
+    cache, client = ToolResultCache(), FakeClient()
+    cache.put(client, "get_user", {"id": 1, "name": None}, "user 1")
+    assert cache.get(client, "get_user", {"id": 1.0}) == "user 1"
+
+
+def test_error_text_is_not_cached():
+    cache, client = ToolResultCache(), FakeClient()
+    cache.put(client, "get_user", {"id": 1}, "Error while retrieving user by id: unavailable (circuit open)")
+    assert cache.get(client, "get_user", {"id": 1}) is None
+
+
+def test_sdk_error_content_is_not_cached():
+    cache, client = ToolResultCache(), FakeClient()
+    content = [TextContent(type="text", text="Error while retrieving user by id: unavailable (circuit open)")]
+    cache.put(client, "get_user", {"id": 1}, content)
+    assert cache.get(client, "get_user", {"id": 1}) is None
+
+    ok = [TextContent(type="text", text="user 1")]
+    cache.put(client, "get_user", {"id": 1}, ok)
+    assert cache.get(client, "get_user", {"id": 1}) == ok
+
+
+def test_invalidate_drops_only_that_client():
+    cache, client, other = ToolResultCache(), FakeClient(), FakeClient()
+    cache.put(client, "get_user", {"id": 1}, "user 1")
+    cache.put(other, "get_user", {"id": 1}, "user 1")
+    cache.invalidate(client)
+    assert cache.get(client, "get_user", {"id": 1}) is None
+    assert cache.get(other, "get_user", {"id": 1}) == "user 1"
+
+
+def test_read_started_before_write_is_not_cached():
+    cache, client = ToolResultCache(), FakeClient()
+    generation = cache.generation(client)
+    cache.invalidate(client)
+    cache.put(client, "get_user", {"id": 1}, "user 1 before the write", generation)
+    assert cache.get(client, "get_user", {"id": 1}) is None
+
+    cache.put(client, "get_user", {"id": 1}, "user 1", cache.generation(client))
+    assert cache.get(client, "get_user", {"id": 1}) == "user 1"
+
+
+def test_lru_eviction():
+    cache, client = ToolResultCache(max_entries=2), FakeClient()
+    for i in range(3):
+        cache.put(client, "get_user", {"id": i}, f"user {i}")
+    assert cache.get(client, "get_user", {"id": 0}) is None
+    assert cache.get(client, "get_user", {"id": 2}) == "user 2"
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from mcp_server.models.request import MCPRequest
+from mcp_server.models.user_info import UserCreate
+from mcp_server.services.mcp_server import MCPServer
+from mcp_server.tools.users import user_client
+from mcp_server.tools.users.circuit_breaker import CircuitState
+from mcp_server.tools.users.user_client import IDEMPOTENCY_KEY_HEADER
+
+
+class FakeResponse:
+
+    def __init__(self, status_code: int, body=None):
+        self.status_code = status_code
+        self._body = body if body is not None else {}
+        self.text = str(self._body)
+
+    def json(self):
+        return self._body
+
+
+class FakeUMS:
+    """Replaces `requests.request`, answers with the queued responses and records the calls"""
+
+    def __init__(self, *responses: FakeResponse):
+        self.responses = list(responses)
+        self.calls = []
+
+    def __call__(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+
+
+@pytest.fixture
+def ums(monkeypatch):
+    def install(*responses: FakeResponse) -> FakeUMS:
+        fake = FakeUMS(*responses)
+        monkeypatch.setattr(user_client.requests, "request", fake)
+        return fake
+    return install
+
+
+NEW_USER = {"name": "John", "surname": "Doe", "email": "john@example.com", "about_me": "hi"}
+
+
+def _add_user_call(meta=None) -> MCPRequest:
+    params = {"name": "add_user", "arguments": NEW_USER}
+    if meta:
+        params["_meta"] = meta
+    return MCPRequest(id=7, method="tools/call", params=params)
+
+
+def test_write_is_retried_with_the_client_key_when_ums_deduplicates(ums):
+    fake = ums(FakeResponse(503), FakeResponse(201, {"id": 1}))
+    server = MCPServer()
+    server.user_client.retry_writes = True
+
+    response = asyncio.run(server.handle_tools_call(_add_user_call({"idempotencyKey": "k1"}), "session"))
+
+    assert "User successfully added" in response.result["content"][0]["text"]
+    assert [kwargs["headers"][IDEMPOTENCY_KEY_HEADER] for _, _, kwargs in fake.calls] == ["k1", "k1"]
+
+
+def test_write_is_sent_once_unless_ums_deduplicates(ums):
+    fake = ums(FakeResponse(503), FakeResponse(201, {"id": 1}))
+    server = MCPServer()
+
+    response = asyncio.run(server.handle_tools_call(_add_user_call({"idempotencyKey": "k1"}), "session"))
+
+    assert response.result["isError"] is True
+    assert len(fake.calls) == 1
+
+
+def test_derived_key_is_not_forwarded(ums):
+    fake = ums(FakeResponse(201, {"id": 1}))
+    server = MCPServer()
+    server.user_client.retry_writes = True
+
+    asyncio.run(server.handle_tools_call(_add_user_call(), "session"))
+
+    assert IDEMPOTENCY_KEY_HEADER not in fake.calls[0][2]["headers"]
+
+
+def test_write_without_key_is_not_retried(ums):
+    fake = ums(FakeResponse(503))
+    client = user_client.UserClient()
+    with pytest.raises(Exception, match="HTTP 503"):
+        asyncio.run(client.add_user(UserCreate.model_validate(NEW_USER)))
+    assert len(fake.calls) == 1
+
+
+def test_writes_drop_cached_searches(ums):
+    client = user_client.UserClient()
+    client._cache_read("search:[('name', 'John')]", "old search")
+    client._cache_read("user:1", "user 1")
+    client._cache_read("user:2", "user 2")
+
+    ums(FakeResponse(201, {"id": 3}))
+    asyncio.run(client.add_user(UserCreate.model_validate(NEW_USER)))
+    assert list(client._read_cache) == ["user:1", "user:2"]
+
+    client._cache_read("search:[]", "all users")
+    ums(FakeResponse(204))
+    asyncio.run(client.delete_user(1))
+    assert list(client._read_cache) == ["user:2"]
+
+
+def test_sustained_throttling_opens_the_circuit(ums):
+    fake = ums(FakeResponse(429))
+    client = user_client.UserClient()
+    client.retry_policy.max_attempts = 1
+
+    async def main():
+        for _ in range(6):
+            with pytest.raises(Exception):
+                await client.get_user(1)
+
+    asyncio.run(main())
+    assert client.circuit_breaker.state == CircuitState.OPEN
+    assert len(fake.calls) == client.circuit_breaker.min_calls
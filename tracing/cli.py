@@ -0,0 +1,102 @@
+"""
+Prints a critical-path breakdown of every traced agent turn.
+
+    python -m tracing.cli spans.jsonl [--trace <trace_id>] [--last N]
+"""
+import argparse
+import json
+from collections import defaultdict
+from typing import Any
+
+
+def _load_spans(path: str) -> dict[str, list[dict[str, Any]]]:
+    traces: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                traces[span["trace_id"]].append(span)
+    return traces
+
+
+def _duration_ms(span: dict[str, Any]) -> float:
+    return (span["end_ns"] - span["start_ns"]) / 1e6
+
+
+def _critical_path(span: dict[str, Any], children: dict[str, list[dict[str, Any]]]) -> list[dict[str, Any]]:
+    """
+    Walks back from the end of the span: the child that finished last is on the critical path,
+    then the child that finished last before that one started, and so on.
+    """
+    path = []
+    cursor = span["end_ns"]
+    for child in sorted(children.get(span["span_id"], []), key=lambda s: s["end_ns"], reverse=True):
+        if child["end_ns"] <= cursor:
+            path.append(child)
+            cursor = child["start_ns"]
+    path.reverse()
+    return path
+
+
+def _print_span(span: dict[str, Any], children: dict[str, list[dict[str, Any]]], total_ms: float, depth: int) -> None:
+    duration = _duration_ms(span)
+    critical_children = _critical_path(span, children)
+    self_ms = duration - sum(_duration_ms(child) for child in critical_children)
+    share = duration / total_ms * 100 if total_ms else 0
+    print(
+        f"{'  ' * depth}{span['name']:<{40 - 2 * depth}} {span['service']:<12} "
+        f"{duration:9.1f} ms {share:5.1f}%  self {self_ms:8.1f} ms"
+        f"{'  [error]' if span['status'] != 'ok' else ''}"
+    )
+    for child in critical_children:
+        _print_span(child, children, total_ms, depth + 1)
+
+
+def print_trace(spans: list[dict[str, Any]]) -> None:
+    span_ids = {span["span_id"] for span in spans}
+    children: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    roots = []
+    for span in spans:
+        if span["parent_id"] in span_ids:
+            children[span["parent_id"]].append(span)
+        else:
+            roots.append(span)
+
+    for root in sorted(roots, key=lambda s: s["start_ns"]):
+        total_ms = _duration_ms(root)
+        print(f"\nTrace {root['trace_id']} ({len(spans)} spans, {total_ms:.1f} ms)")
+        _print_span(root, children, total_ms, 0)
+
+        # Spans where a request enters a service: time spent in that hop including its downstream hops
+        by_id = {span["span_id"]: span for span in spans}
+        by_service: dict[str, float] = defaultdict(float)
+        for span in spans:
+            parent = by_id.get(span["parent_id"])
+            if not parent or parent["service"] != span["service"]:
+                by_service[span["service"]] += _duration_ms(span)
+        print("  inclusive time per hop: " + ", ".join(
+            f"{service}={ms:.1f} ms" for service, ms in sorted(by_service.items(), key=lambda item: -item[1])
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Critical-path breakdown of traced agent turns")
+    parser.add_argument("path", help="JSONL file written with TRACE_EXPORT=jsonl:<path>")
+    parser.add_argument("--trace", help="Only print the given trace id")
+    parser.add_argument("--last", type=int, default=10, help="Print the N most recent traces")
+    args = parser.parse_args()
+
+    traces = _load_spans(args.path)
+    if args.trace:
+        selected = [traces[args.trace]] if args.trace in traces else []
+    else:
+        selected = sorted(traces.values(), key=lambda spans: min(s["start_ns"] for s in spans))[-args.last:]
+
+    if not selected:
+        print("No traces found")
+    for spans in selected:
+        print_trace(spans)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+import requests
+
+TRACEPARENT_HEADER = "traceparent"
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+
+_current_span: ContextVar[Optional['Span']] = ContextVar("current_span", default=None)
+
+
+class SpanContext:
+    """Identifies a span across process boundaries (W3C trace-context)"""
+
+    def __init__(self, trace_id: str, span_id: str):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    def to_traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @classmethod
+    def from_traceparent(cls, traceparent: Optional[str]) -> Optional['SpanContext']:
+        if not traceparent:
+            return None
+        parts = traceparent.strip().split("-")
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        return cls(trace_id=parts[1], span_id=parts[2])
+
+
+class Span:
+
+    def __init__(self, name: str, service: str, parent: Optional[SpanContext], attributes: dict[str, Any]):
+        self.name = name
+        self.service = service
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    @property
+    def context(self) -> SpanContext:
+        return SpanContext(self.trace_id, self.span_id)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    """Doesn't export anything, used when tracing is not configured"""
+
+    enabled = False
+
+    def export(self, span: Span) -> None:
+        pass
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends finished spans to a JSONL file, one line per span"""
+
+    enabled = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), separators=(",", ":"), default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """Sends spans in batches to an OTLP/HTTP JSON endpoint (`{endpoint}/v1/traces`) from a background thread"""
+
+    enabled = True
+
+    def __init__(self, endpoint: str, batch_size: int = 64, flush_interval: float = 1.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue[Span] = queue.Queue(maxsize=10_000)
+        threading.Thread(target=self._run, name="otlp-exporter", daemon=True).start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            pass
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and (timeout := deadline - time.monotonic()) > 0:
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                requests.post(self.url, json=self._to_otlp(batch), timeout=5)
+            except requests.RequestException as e:
+                print(f"Unable to export {len(batch)} span(s) to {self.url}: {e}")
+
+    @staticmethod
+    def _to_otlp(spans: list[Span]) -> dict[str, Any]:
+        by_service: dict[str, list[dict[str, Any]]] = {}
+        for span in spans:
+            by_service.setdefault(span.service, []).append({
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "status": {"code": 1 if span.status == "ok" else 2},
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(value)}} for key, value in span.attributes.items()
+                ],
+            })
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+                    "scopeSpans": [{"scope": {"name": "tracing"}, "spans": service_spans}],
+                }
+                for service, service_spans in by_service.items()
+            ]
+        }
+
+
+def _create_exporter(config: str) -> SpanExporter:
+    """`jsonl:<path>` or `otlp:<endpoint>`, anything else disables tracing"""
+    kind, _, target = config.partition(":")
+    if kind == "jsonl" and target:
+        return JsonlSpanExporter(target)
+    if kind == "otlp" and target:
+        return OtlpHttpSpanExporter(target)
+    return SpanExporter()
+
+
+_exporter = _create_exporter(TRACE_EXPORT)
+
+
+class Tracer:
+
+    def __init__(self, service: str, exporter: Optional[SpanExporter] = None):
+        self.service = service
+        self.exporter = exporter
+
+    @property
+    def _active_exporter(self) -> SpanExporter:
+        return self.exporter or _exporter
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[SpanContext] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Record a span around the block, child of `parent` or of the current span"""
+        exporter = self._active_exporter
+        if not exporter.enabled:
+            yield None
+            return
+
+        if parent is None and (current := _current_span.get()):
+            parent = current.context
+        span = Span(name, self.service, parent, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set_attribute("error", repr(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            exporter.export(span)
+
+
+def current_traceparent() -> Optional[str]:
+    """traceparent of the current span to propagate in headers or JSON-RPC `_meta`"""
+    if span := _current_span.get():
+        return span.context.to_traceparent()
+    return None
+
+
+def inject_headers(headers: dict[str, str]) -> dict[str, str]:
+    if traceparent := current_traceparent():
+        headers[TRACEPARENT_HEADER] = traceparent
+    return headers
+
+
+def inject_meta(params: dict[str, Any]) -> dict[str, Any]:
+    if traceparent := current_traceparent():
+        params = {**params, "_meta": {**(params.get("_meta") or {}), TRACEPARENT_HEADER: traceparent}}
+    return params